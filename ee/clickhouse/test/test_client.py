@@ -48,6 +48,47 @@ class ClickhouseClientTestCase(TestCase, ClickhouseTestMixin):
         self.assertTrue(result.error)
         self.assertEqual(result.error_message, "Requesting team is not executing team")
 
+    @patch("posthog.clickhouse.client.execute_async.RESULTS_CHUNK_SIZE", 10)
+    def test_async_query_client_pages_results(self):
+        query = "SELECT number FROM numbers(25)"
+        team_id = 2
+        query_id = client.enqueue_execute_with_progress(team_id, query, bypass_celery=True)
+
+        result = client.get_status_or_results(team_id, query_id)
+        self.assertTrue(result.complete)
+        self.assertEqual(result.result_rows, 25)
+        self.assertEqual(result.result_chunks, 3)
+        self.assertEqual(result.results, [[number] for number in range(25)])
+
+        result = client.get_status_or_results(team_id, query_id, offset=8, limit=5)
+        self.assertEqual(result.results, [[number] for number in range(8, 13)])
+
+        result = client.get_status_or_results(team_id, query_id, offset=20, limit=10)
+        self.assertEqual(result.results, [[number] for number in range(20, 25)])
+
+    @patch("posthog.clickhouse.client.execute_async.RESULTS_CHUNK_SIZE", 10)
+    def test_results_writer_refreshes_ttl_of_chunks(self):
+        results_writer = client._ResultsWriter(self.redis_client, "query_id")
+        results_writer.add([[number] for number in range(25)])
+        results_writer.flush()
+        # As if the chunks had been written long before the query completed
+        for chunk in range(3):
+            self.redis_client.expire(client.generate_redis_results_chunk_key("query_id", chunk), 1)
+
+        results_writer.refresh_ttl()
+
+        for chunk in range(3):
+            ttl = self.redis_client.ttl(client.generate_redis_results_chunk_key("query_id", chunk))
+            self.assertEqual(ttl, client.REDIS_STATUS_TTL)
+
+    def test_async_query_client_with_column_types(self):
+        query = "SELECT 1 + 1 AS two"
+        team_id = 2
+        query_id = client.enqueue_execute_with_progress(team_id, query, with_column_types=True, bypass_celery=True)
+
+        result = client.get_status_or_results(team_id, query_id)
+        self.assertEqual(result.results, [[[2]], [["two", "UInt16"]]])
+
     @patch("posthog.clickhouse.client.execute_async.enqueue_clickhouse_execute_with_progress")
     def test_async_query_client_is_lazy(self, execute_sync_mock):
         query = "SELECT 4 + 4"
@@ -2896,6 +2896,8 @@ export enum ExporterFormat {
     CSV = 'text/csv',
     PDF = 'application/pdf',
     JSON = 'application/json',
+    PARQUET = 'application/vnd.apache.parquet',
+    ARROW = 'application/vnd.apache.arrow.stream',
 }
 
 /** Exporting directly from the browser to a file */
@@ -0,0 +1,330 @@
+import json
+import re
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from hogvm.python.execute import HogVMException, like, to_concat_arg
+from hogvm.python.operation import Operation, HOGQL_BYTECODE_IDENTIFIER
+
+# A value on the columnar stack is either a constant, an Arrow array with one value per row, or a plain list of
+# Python objects for columns Arrow can't type (e.g. JSON properties with mixed value types).
+Value = Union[Any, pa.Array, pa.ChunkedArray, List[Any]]
+
+ARROW_KERNEL_ERRORS = (pa.ArrowNotImplementedError, pa.ArrowInvalid, pa.ArrowTypeError)
+
+
+class _Columns:
+    """Resolves field chains against a record batch, parsing each JSON column at most once per evaluation."""
+
+    def __init__(self, batch: pa.RecordBatch):
+        self.batch = batch
+        self.names = set(batch.schema.names)
+        # Keyed by the part of the chain leading to the JSON column, which may be a field of a struct column
+        self._parsed_json: Dict[Tuple[Any, ...], List[Any]] = {}
+
+    def resolve(self, chain: Tuple[Any, ...]) -> Value:
+        flat_name = ".".join(str(key) for key in chain)
+        if flat_name in self.names:
+            return self.batch.column(flat_name)
+
+        head, rest = chain[0], list(chain[1:])
+        if head not in self.names:
+            return None
+
+        column = self.batch.column(head)
+        while rest and pa.types.is_struct(column.type) and column.type.get_field_index(rest[0]) >= 0:
+            column = pc.struct_field(column, [column.type.get_field_index(rest.pop(0))])
+        if not rest:
+            return column
+
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type) or pa.types.is_binary(column.type):
+            prefix = tuple(chain[: len(chain) - len(rest)])
+            values = [_get_nested(value, rest) for value in self._parse_json(prefix, column)]
+        else:
+            values = [_get_nested(value, rest) for value in column.to_pylist()]
+        return _to_array_or_list(values)
+
+    def _parse_json(self, prefix: Tuple[Any, ...], column: Value) -> List[Any]:
+        if prefix not in self._parsed_json:
+            self._parsed_json[prefix] = [_loads(value) for value in column.to_pylist()]
+        return self._parsed_json[prefix]
+
+
+def _loads(value: Any) -> Any:
+    # Like fields missing from the row, values that aren't JSON have no nested fields
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def _get_nested(obj: Any, chain: List[Any]) -> Any:
+    for key in chain:
+        if isinstance(obj, dict):
+            obj = obj.get(key, None)
+        elif isinstance(obj, (list, tuple)) and isinstance(key, int) and -len(obj) <= key < len(obj):
+            obj = obj[key]
+        else:
+            return None
+    return obj
+
+
+def _to_array_or_list(values: List[Any]) -> Value:
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        return values
+
+
+def _is_array(value: Value) -> bool:
+    return isinstance(value, (pa.Array, pa.ChunkedArray))
+
+
+def _to_pylist(value: Value, length: int) -> List[Any]:
+    if isinstance(value, list):
+        return value
+    if _is_array(value):
+        return value.to_pylist()
+    return [value] * length
+
+
+def _elementwise(function: Callable[..., Any], length: int, *operands: Value) -> Value:
+    """Evaluate `function` row by row with Python semantics. Rows where it fails evaluate to null."""
+
+    def apply(*args: Any) -> Any:
+        try:
+            return function(*args)
+        except (TypeError, ValueError, ArithmeticError, AttributeError, re.error):
+            return None
+
+    if not any(isinstance(operand, list) or _is_array(operand) for operand in operands):
+        return apply(*operands)
+    return [apply(*args) for args in zip(*[_to_pylist(operand, length) for operand in operands])]
+
+
+def _vectorized(kernel: Callable[..., Any], function: Callable[..., Any], length: int, *operands: Value) -> Value:
+    """Evaluate with an Arrow compute kernel when the operands allow it, otherwise fall back to `_elementwise`."""
+    if any(_is_array(operand) for operand in operands) and not any(isinstance(operand, list) for operand in operands):
+        try:
+            return kernel(*operands)
+        except ARROW_KERNEL_ERRORS:
+            pass
+    return _elementwise(function, length, *operands)
+
+
+def _is_string_array(value: Value) -> bool:
+    return _is_array(value) and (pa.types.is_string(value.type) or pa.types.is_large_string(value.type))
+
+
+def _truthy(value: Value, length: int) -> pa.BooleanArray:
+    """Python truthiness for every row, with nulls being falsy."""
+    if _is_array(value):
+        if pa.types.is_boolean(value.type):
+            result = pc.fill_null(value, False)
+        elif pa.types.is_integer(value.type) or pa.types.is_floating(value.type):
+            result = pc.fill_null(pc.not_equal(value, 0), False)
+        elif _is_string_array(value):
+            result = pc.fill_null(pc.not_equal(value, ""), False)
+        else:
+            result = pa.array([bool(item) for item in value.to_pylist()], type=pa.bool_())
+        return result.combine_chunks() if isinstance(result, pa.ChunkedArray) else result
+    return pa.array([bool(item) for item in _to_pylist(value, length)], type=pa.bool_())
+
+
+def _is_null(value: Value) -> Any:
+    return pc.is_null(value) if _is_array(value) else pa.scalar(value is None)
+
+
+def _equals(left: Value, right: Value) -> Any:
+    # HogQL treats null like any other value: `null == null` is true and `1 == null` is false
+    result = pc.fill_null(pc.equal(left, right), False)
+    return pc.or_(result, pc.and_(_is_null(left), _is_null(right)))
+
+
+def _like_pattern(pattern: str) -> str:
+    # HogVM's `like` is an unanchored search where only `%` is special, so escape SQL wildcards and wrap in `%`
+    return "%" + pattern.replace("\\", "\\\\").replace("_", "\\_") + "%"
+
+
+def _like(left: Value, right: Value, length: int, ignore_case=False, negate=False) -> Value:
+    flags = re.IGNORECASE if ignore_case else 0
+
+    def kernel(string, pattern):
+        if not isinstance(pattern, str) or not _is_string_array(string):
+            raise pa.ArrowNotImplementedError("Only constant patterns on string columns are vectorized")
+        result = pc.match_like(string, _like_pattern(pattern), ignore_case=ignore_case)
+        return pc.invert(result) if negate else result
+
+    return _vectorized(kernel, lambda string, pattern: like(string, pattern, flags) != negate, length, left, right)
+
+
+def _regex(left: Value, right: Value, length: int, ignore_case=False, negate=False) -> Value:
+    flags = re.IGNORECASE if ignore_case else 0
+
+    def kernel(string, pattern):
+        if not isinstance(pattern, str) or not _is_string_array(string):
+            raise pa.ArrowNotImplementedError("Only constant patterns on string columns are vectorized")
+        result = pc.match_substring_regex(string, pattern, ignore_case=ignore_case)
+        return pc.invert(result) if negate else result
+
+    return _vectorized(
+        kernel,
+        lambda string, pattern: bool(re.search(re.compile(pattern, flags), string)) != negate,
+        length,
+        left,
+        right,
+    )
+
+
+def _divide(left: Value, right: Value) -> Any:
+    return pc.divide_checked(pc.cast(left, pa.float64()) if _is_array(left) else float(left), right)
+
+
+def _concat(args: List[Value], length: int) -> Value:
+    def kernel(*values):
+        if not all(_is_string_array(value) or isinstance(value, str) or value is None for value in values):
+            raise pa.ArrowNotImplementedError("Only strings are vectorized in concat")
+        return pc.binary_join_element_wise(
+            *[pc.fill_null(value, "") if _is_array(value) else to_concat_arg(value) for value in values], ""
+        )
+
+    return _vectorized(kernel, lambda *values: "".join([to_concat_arg(value) for value in values]), length, *args)
+
+
+def _to_string(value: Any) -> str:
+    if value is True:
+        return "true"
+    elif value is False:
+        return "false"
+    elif value is None:
+        return "null"
+    return str(value)
+
+
+def _call(name: str, args: List[Value], length: int) -> Value:
+    if name == "concat":
+        return _concat(args, length)
+    elif name == "match":
+        return _regex(args[0], args[1], length)
+    elif name == "toString" or name == "toUUID":
+        if _is_string_array(args[0]):
+            return pc.fill_null(args[0], "null")
+        return _elementwise(_to_string, length, args[0])
+    elif name == "toInt":
+        return _elementwise(int, length, args[0])
+    elif name == "toFloat":
+        return _elementwise(float, length, args[0])
+    raise HogVMException(f"Unsupported function call: {name}")
+
+
+BINARY_OPERATIONS: Dict[Operation, Tuple[Callable[..., Any], Callable[[Any, Any], Any]]] = {
+    Operation.PLUS: (pc.add, lambda a, b: a + b),
+    Operation.MINUS: (pc.subtract, lambda a, b: a - b),
+    Operation.MULTIPLY: (pc.multiply, lambda a, b: a * b),
+    Operation.DIVIDE: (_divide, lambda a, b: a / b),
+    Operation.EQ: (_equals, lambda a, b: a == b),
+    Operation.NOT_EQ: (lambda a, b: pc.invert(_equals(a, b)), lambda a, b: a != b),
+    Operation.GT: (pc.greater, lambda a, b: a > b),
+    Operation.GT_EQ: (pc.greater_equal, lambda a, b: a >= b),
+    Operation.LT: (pc.less, lambda a, b: a < b),
+    Operation.LT_EQ: (pc.less_equal, lambda a, b: a <= b),
+}
+
+ELEMENTWISE_OPERATIONS: Dict[Operation, Callable[[Any, Any], Any]] = {
+    Operation.MOD: lambda a, b: a % b,
+    Operation.IN: lambda a, b: a in b,
+    Operation.NOT_IN: lambda a, b: a not in b,
+}
+
+PATTERN_OPERATIONS: Dict[Operation, Tuple[Callable[..., Value], bool, bool]] = {
+    Operation.LIKE: (_like, False, False),
+    Operation.ILIKE: (_like, True, False),
+    Operation.NOT_LIKE: (_like, False, True),
+    Operation.NOT_ILIKE: (_like, True, True),
+    Operation.REGEX: (_regex, False, False),
+    Operation.NOT_REGEX: (_regex, False, True),
+    Operation.IREGEX: (_regex, True, False),
+    Operation.NOT_IREGEX: (_regex, True, True),
+}
+
+
+def execute_bytecode_columnar(bytecode: List[Any], batch: Union[pa.RecordBatch, Dict[str, Any]]) -> pa.BooleanArray:
+    """
+    Evaluate bytecode against every row of a record batch (or a dict of equal length arrays) at once, and return a
+    boolean mask with one value per row. Useful for applying filters to a whole batch of exported events.
+
+    Comparisons, `like`, regex matching, arithmetic and boolean logic run as Arrow compute kernels. Anything else
+    falls back to Python semantics row by row. Unlike `execute_bytecode`, rows where an operation fails (e.g. comparing
+    `null` with `>`) evaluate to null instead of raising, and nulls count as false in the returned mask.
+
+    Fields are resolved against columns by their full dotted name first (e.g. `properties.$browser`), then by walking
+    into struct columns, and finally by parsing string columns as JSON (e.g. the `properties` of exported events).
+    """
+    if isinstance(batch, dict):
+        batch = pa.RecordBatch.from_pydict(batch)
+    columns = _Columns(batch)
+    length = batch.num_rows
+
+    try:
+        stack: List[Value] = []
+        iterator = iter(bytecode)
+        if next(iterator) != HOGQL_BYTECODE_IDENTIFIER:
+            raise HogVMException(f"Invalid bytecode. Must start with '{HOGQL_BYTECODE_IDENTIFIER}'")
+
+        while (symbol := next(iterator, None)) is not None:
+            match symbol:
+                case Operation.STRING | Operation.INTEGER | Operation.FLOAT:
+                    stack.append(next(iterator))
+                case Operation.TRUE:
+                    stack.append(True)
+                case Operation.FALSE:
+                    stack.append(False)
+                case Operation.NULL:
+                    stack.append(None)
+                case Operation.NOT:
+                    stack.append(pc.invert(_truthy(stack.pop(), length)))
+                case Operation.AND:
+                    values = [_truthy(stack.pop(), length) for _ in range(next(iterator))]
+                    result = values[0]
+                    for value in values[1:]:
+                        result = pc.and_(result, value)
+                    stack.append(result)
+                case Operation.OR:
+                    values = [_truthy(stack.pop(), length) for _ in range(next(iterator))]
+                    result = values[0]
+                    for value in values[1:]:
+                        result = pc.or_(result, value)
+                    stack.append(result)
+                case Operation.FIELD:
+                    chain = [stack.pop() for _ in range(next(iterator))]
+                    if any(isinstance(key, list) or _is_array(key) for key in chain):
+                        raise HogVMException("Only constant field chains are supported in columnar mode")
+                    stack.append(columns.resolve(tuple(chain)))
+                case Operation.CALL:
+                    name = next(iterator)
+                    args = [stack.pop() for _ in range(next(iterator))]
+                    stack.append(_call(name, args, length))
+                case _ if symbol in BINARY_OPERATIONS:
+                    kernel, function = BINARY_OPERATIONS[symbol]
+                    left, right = stack.pop(), stack.pop()
+                    stack.append(_vectorized(kernel, function, length, left, right))
+                case _ if symbol in ELEMENTWISE_OPERATIONS:
+                    left, right = stack.pop(), stack.pop()
+                    stack.append(_elementwise(ELEMENTWISE_OPERATIONS[symbol], length, left, right))
+                case _ if symbol in PATTERN_OPERATIONS:
+                    operation, ignore_case, negate = PATTERN_OPERATIONS[symbol]
+                    left, right = stack.pop(), stack.pop()
+                    stack.append(operation(left, right, length, ignore_case=ignore_case, negate=negate))
+                case _:
+                    raise HogVMException(f"Unexpected node while running bytecode: {symbol}")
+
+        if len(stack) > 1:
+            raise HogVMException("Invalid bytecode. More than one value left on stack")
+
+        return _truthy(stack.pop(), length)
+    except IndexError:
+        raise HogVMException("Unexpected end of bytecode")
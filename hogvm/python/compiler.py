@@ -0,0 +1,216 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+from hogvm.python.execute import HogVMException, get_nested_value, to_concat_arg
+from hogvm.python.operation import Operation, HOGQL_BYTECODE_IDENTIFIER
+
+Fields = Dict[str, Any]
+Closure = Callable[[Fields], Any]
+
+# Maximum number of distinct bytecode programs kept compiled in memory
+COMPILED_BYTECODE_CACHE_SIZE = 1024
+
+
+class _Node(NamedTuple):
+    closure: Closure
+    # Constant nodes know their value at compile time, which lets us pre-compile patterns and resolve field chains
+    is_constant: bool = False
+    value: Any = None
+
+
+class CompiledBytecode:
+    """A HogQL bytecode program compiled into a tree of Python closures. Behaves exactly like `execute_bytecode`."""
+
+    def __init__(self, bytecode: List[Any], closure: Closure):
+        self.bytecode = bytecode
+        self._closure = closure
+
+    def __call__(self, fields: Fields) -> Any:
+        try:
+            return self._closure(fields)
+        except IndexError:
+            # Mirror the interpreter, which can't tell a field lookup IndexError apart from running out of bytecode
+            raise HogVMException("Unexpected end of bytecode")
+
+
+def _constant(value: Any) -> _Node:
+    return _Node(lambda fields: value, True, value)
+
+
+def like_to_regex(pattern: str, flags=0) -> re.Pattern:
+    return re.compile(re.escape(pattern).replace("%", ".*"), flags)
+
+
+def _compile_like(left: _Node, right: _Node, flags=0, negate=False) -> _Node:
+    left_fn = left.closure
+    if right.is_constant:
+        pattern = like_to_regex(right.value, flags)
+        if negate:
+            return _Node(lambda fields: pattern.search(left_fn(fields)) is None)
+        return _Node(lambda fields: pattern.search(left_fn(fields)) is not None)
+
+    right_fn = right.closure
+    if negate:
+        return _Node(lambda fields: like_to_regex(right_fn(fields), flags).search(left_fn(fields)) is None)
+    return _Node(lambda fields: like_to_regex(right_fn(fields), flags).search(left_fn(fields)) is not None)
+
+
+def _compile_regex(left: _Node, right: _Node, flags=0, negate=False) -> _Node:
+    left_fn = left.closure
+    if right.is_constant:
+        pattern = re.compile(right.value, flags)
+        if negate:
+            return _Node(lambda fields: pattern.search(left_fn(fields)) is None)
+        return _Node(lambda fields: pattern.search(left_fn(fields)) is not None)
+
+    right_fn = right.closure
+    if negate:
+        return _Node(lambda fields: re.search(re.compile(right_fn(fields), flags), left_fn(fields)) is None)
+    return _Node(lambda fields: re.search(re.compile(right_fn(fields), flags), left_fn(fields)) is not None)
+
+
+def _compile_field(chain: List[_Node]) -> _Node:
+    if not all(node.is_constant for node in chain):
+        chain_fns = [node.closure for node in chain]
+        return _Node(lambda fields: get_nested_value(fields, [fn(fields) for fn in chain_fns]))
+
+    resolved = tuple(node.value for node in chain)
+    return _Node(lambda fields: get_nested_value(fields, resolved))
+
+
+def _to_string(value: Any) -> str:
+    if value is True:
+        return "true"
+    elif value is False:
+        return "false"
+    elif value is None:
+        return "null"
+    return str(value)
+
+
+def _to_number(cast: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def convert(value: Any) -> Any:
+        try:
+            return cast(value)
+        except ValueError:
+            return None
+
+    return convert
+
+
+def _compile_call(name: str, args: List[_Node]) -> _Node:
+    fns = [arg.closure for arg in args]
+    if name == "concat":
+        return _Node(lambda fields: "".join([to_concat_arg(fn(fields)) for fn in fns]))
+    elif name == "match":
+        return _compile_regex(args[0], args[1])
+    elif name == "toString" or name == "toUUID":
+        first = fns[0]
+        return _Node(lambda fields: _to_string(first(fields)))
+    elif name == "toInt" or name == "toFloat":
+        first = fns[0]
+        convert = _to_number(int if name == "toInt" else float)
+        return _Node(lambda fields: convert(first(fields)))
+    raise HogVMException(f"Unsupported function call: {name}")
+
+
+def _binary(operation: Callable[[Any, Any], Any]) -> Callable[[_Node, _Node], _Node]:
+    def build(left: _Node, right: _Node) -> _Node:
+        left_fn, right_fn = left.closure, right.closure
+        return _Node(lambda fields: operation(left_fn(fields), right_fn(fields)))
+
+    return build
+
+
+BINARY_OPERATIONS: Dict[Operation, Callable[[_Node, _Node], _Node]] = {
+    Operation.PLUS: _binary(lambda a, b: a + b),
+    Operation.MINUS: _binary(lambda a, b: a - b),
+    Operation.DIVIDE: _binary(lambda a, b: a / b),
+    Operation.MULTIPLY: _binary(lambda a, b: a * b),
+    Operation.MOD: _binary(lambda a, b: a % b),
+    Operation.EQ: _binary(lambda a, b: a == b),
+    Operation.NOT_EQ: _binary(lambda a, b: a != b),
+    Operation.GT: _binary(lambda a, b: a > b),
+    Operation.GT_EQ: _binary(lambda a, b: a >= b),
+    Operation.LT: _binary(lambda a, b: a < b),
+    Operation.LT_EQ: _binary(lambda a, b: a <= b),
+    Operation.IN: _binary(lambda a, b: a in b),
+    Operation.NOT_IN: _binary(lambda a, b: a not in b),
+    Operation.LIKE: lambda left, right: _compile_like(left, right),
+    Operation.ILIKE: lambda left, right: _compile_like(left, right, re.IGNORECASE),
+    Operation.NOT_LIKE: lambda left, right: _compile_like(left, right, negate=True),
+    Operation.NOT_ILIKE: lambda left, right: _compile_like(left, right, re.IGNORECASE, negate=True),
+    Operation.REGEX: lambda left, right: _compile_regex(left, right),
+    Operation.NOT_REGEX: lambda left, right: _compile_regex(left, right, negate=True),
+    Operation.IREGEX: lambda left, right: _compile_regex(left, right, re.IGNORECASE),
+    Operation.NOT_IREGEX: lambda left, right: _compile_regex(left, right, re.IGNORECASE, negate=True),
+}
+
+
+def _compile(bytecode: Tuple[Any, ...]) -> Closure:
+    try:
+        stack: List[_Node] = []
+        iterator = iter(bytecode)
+        if next(iterator) != HOGQL_BYTECODE_IDENTIFIER:
+            raise HogVMException(f"Invalid bytecode. Must start with '{HOGQL_BYTECODE_IDENTIFIER}'")
+
+        while (symbol := next(iterator, None)) is not None:
+            match symbol:
+                case Operation.STRING | Operation.INTEGER | Operation.FLOAT:
+                    stack.append(_constant(next(iterator)))
+                case Operation.TRUE:
+                    stack.append(_constant(True))
+                case Operation.FALSE:
+                    stack.append(_constant(False))
+                case Operation.NULL:
+                    stack.append(_constant(None))
+                case Operation.NOT:
+                    fn = stack.pop().closure
+                    stack.append(_Node(lambda fields, fn=fn: not fn(fields)))
+                case Operation.AND:
+                    fns = [stack.pop().closure for _ in range(next(iterator))]
+                    # Every operand is evaluated, like in the interpreter, so errors surface in the same cases
+                    stack.append(_Node(lambda fields, fns=fns: all([fn(fields) for fn in fns])))
+                case Operation.OR:
+                    fns = [stack.pop().closure for _ in range(next(iterator))]
+                    stack.append(_Node(lambda fields, fns=fns: any([fn(fields) for fn in fns])))
+                case Operation.FIELD:
+                    stack.append(_compile_field([stack.pop() for _ in range(next(iterator))]))
+                case Operation.CALL:
+                    name = next(iterator)
+                    args = [stack.pop() for _ in range(next(iterator))]
+                    stack.append(_compile_call(name, args))
+                case _ if symbol in BINARY_OPERATIONS:
+                    left = stack.pop()
+                    right = stack.pop()
+                    stack.append(BINARY_OPERATIONS[symbol](left, right))
+                case _:
+                    raise HogVMException(f"Unexpected node while running bytecode: {symbol}")
+
+        if len(stack) > 1:
+            raise HogVMException("Invalid bytecode. More than one value left on stack")
+
+        return stack.pop().closure
+    except IndexError:
+        raise HogVMException("Unexpected end of bytecode")
+
+
+@lru_cache(maxsize=COMPILED_BYTECODE_CACHE_SIZE)
+def _compile_cached(bytecode: Tuple[Any, ...]) -> CompiledBytecode:
+    return CompiledBytecode(list(bytecode), _compile(bytecode))
+
+
+def compile_bytecode(bytecode: List[Any]) -> CompiledBytecode:
+    """Compile bytecode into a reusable callable. Identical programs are compiled only once per process."""
+    return _compile_cached(tuple(bytecode))
+
+
+def execute_compiled(bytecode: List[Any], fields: Fields) -> Any:
+    return compile_bytecode(bytecode)(fields)
+
+
+def execute_many(bytecode: List[Any], iterable_of_fields: Iterable[Fields]) -> List[Any]:
+    """Evaluate the same bytecode against many field dicts, compiling it only once."""
+    program = compile_bytecode(bytecode)
+    return [program(fields) for fields in iterable_of_fields]
@@ -0,0 +1,103 @@
+import json
+
+import pyarrow as pa
+
+from hogvm.python.columnar import execute_bytecode_columnar
+from hogvm.python.execute import execute_bytecode
+from hogvm.python.operation import Operation as op, HOGQL_BYTECODE_IDENTIFIER as _H
+from posthog.hogql.bytecode import create_bytecode
+from posthog.hogql.parser import parse_expr
+from posthog.test.base import BaseTest
+
+ROWS = [
+    {"event": "$pageview", "properties": {"$browser": "Chrome", "$current_url": "https://posthog.com/pricing"}},
+    {"event": "$pageview", "properties": {"$browser": "Safari", "$current_url": "https://posthog.com/blog_post"}},
+    {"event": "$autocapture", "properties": {"$browser": "chrome", "count": 3}},
+    {"event": "$identify", "properties": {}},
+]
+
+
+class TestColumnarExecute(BaseTest):
+    def _mask(self, expr: str, batch) -> list:
+        return execute_bytecode_columnar(create_bytecode(parse_expr(expr)), batch).to_pylist()
+
+    def _assert_mask(self, expr: str, expected: list):
+        batch = pa.RecordBatch.from_pydict(
+            {
+                "event": [row["event"] for row in ROWS],
+                "properties": [json.dumps(row["properties"]) for row in ROWS],
+            }
+        )
+        self.assertEqual(self._mask(expr, batch), expected)
+
+    def test_filters_json_properties(self):
+        self._assert_mask("event = '$pageview'", [True, True, False, False])
+        self._assert_mask("event != '$pageview'", [False, False, True, True])
+        self._assert_mask("properties.$browser = 'Chrome'", [True, False, False, False])
+        self._assert_mask("properties.$browser ilike '%chrome%'", [True, False, True, False])
+        self._assert_mask("properties.$current_url like '%blog_%'", [False, True, False, False])
+        self._assert_mask("properties.$browser =~ '^S'", [False, True, False, False])
+        self._assert_mask("properties.$browser = null", [False, False, False, True])
+        self._assert_mask(
+            "event = '$pageview' and (properties.$browser = 'Safari' or properties.$browser = 'Chrome')",
+            [True, True, False, False],
+        )
+        self._assert_mask("not (event = '$pageview')", [False, False, True, True])
+        self._assert_mask("concat(event, '-', properties.$browser) = '$pageview-Chrome'", [True, False, False, False])
+        self._assert_mask("toString(properties.count) = '3'", [False, False, True, False])
+
+    def test_nulls_are_false(self):
+        batch = {"event": ["a", None, "c"], "value": [1, None, 10]}
+        self.assertEqual(self._mask("value > 5", batch), [False, False, True])
+        self.assertEqual(self._mask("event like '%'", batch), [True, False, True])
+        self.assertEqual(self._mask("value + 1 = 11", batch), [False, False, True])
+
+    def test_struct_and_flattened_columns(self):
+        batch = pa.RecordBatch.from_pydict(
+            {
+                "properties": [{"$browser": "Chrome"}, {"$browser": "Firefox"}],
+                "person.properties.email": ["a@posthog.com", "b@example.com"],
+            }
+        )
+        self.assertEqual(self._mask("properties.$browser = 'Firefox'", batch), [False, True])
+        self.assertEqual(self._mask("person.properties.email ilike '%@POSTHOG.com'", batch), [True, False])
+
+    def test_json_columns_in_structs_and_invalid_json(self):
+        batch = pa.RecordBatch.from_pydict(
+            {
+                "person": [
+                    {"properties": json.dumps({"email": "a@posthog.com"})},
+                    {"properties": json.dumps({"email": "b@example.com"})},
+                    {"properties": "not json"},
+                ],
+                "properties": ["not json", json.dumps({"$browser": "Chrome"}), None],
+            }
+        )
+        self.assertEqual(self._mask("person.properties.email ilike '%@posthog.com'", batch), [True, False, False])
+        self.assertEqual(self._mask("properties.$browser = 'Chrome'", batch), [False, True, False])
+        self.assertEqual(
+            self._mask("person.properties.email = 'b@example.com' and properties.$browser = 'Chrome'", batch),
+            [False, True, False],
+        )
+
+    def test_matches_row_by_row_execution(self):
+        rows = [{"event": "$pageview", "value": 3}, {"event": "$identify", "value": 10}]
+        batch = {"event": [row["event"] for row in rows], "value": [row["value"] for row in rows]}
+        for expr in ["event = '$pageview'", "value % 2 = 1", "value / 2 > 2", "'page' in event", "value * 2 - 1 = 5"]:
+            bytecode = create_bytecode(parse_expr(expr))
+            self.assertEqual(
+                execute_bytecode_columnar(bytecode, batch).to_pylist(),
+                [bool(execute_bytecode(bytecode, row)) for row in rows],
+            )
+
+    def test_constant_expressions_are_broadcast(self):
+        self.assertEqual(self._mask("1 + 2 = 3", {"event": ["a", "b"]}), [True, True])
+
+    def test_errors(self):
+        with self.assertRaises(Exception) as e:
+            execute_bytecode_columnar([_H, op.TRUE, op.CALL, "notAFunction", 1], {"event": ["a"]})
+        self.assertEqual(str(e.exception), "Unsupported function call: notAFunction")
+
+        with self.assertRaises(Exception) as e:
+            execute_bytecode_columnar([_H, op.TRUE, op.TRUE, op.NOT], {"event": ["a"]})
+        self.assertEqual(str(e.exception), "Invalid bytecode. More than one value left on stack")
@@ -0,0 +1,69 @@
+from typing import Any
+
+from hogvm.python.compiler import compile_bytecode, execute_many
+from hogvm.python.execute import execute_bytecode
+from hogvm.python.operation import Operation as op, HOGQL_BYTECODE_IDENTIFIER as _H
+from posthog.hogql.bytecode import create_bytecode
+from posthog.hogql.parser import parse_expr
+from posthog.test.base import BaseTest
+
+
+class TestBytecodeCompiler(BaseTest):
+    fields = {
+        "event": "$pageview",
+        "properties": {"foo": "bar", "$current_url": "https://posthog.com/pricing", "list": ["a", "b"]},
+    }
+
+    def _run(self, expr: str) -> Any:
+        bytecode = create_bytecode(parse_expr(expr))
+        compiled = compile_bytecode(bytecode)(self.fields)
+        self.assertEqual(compiled, execute_bytecode(bytecode, self.fields))
+        return compiled
+
+    def test_compiled_matches_interpreter(self):
+        self.assertEqual(self._run("1 + 2"), 3)
+        self.assertEqual(self._run("1 - 2"), -1)
+        self.assertEqual(self._run("3 / 2"), 1.5)
+        self.assertEqual(self._run("3 % 2"), 1)
+        self.assertEqual(self._run("1 or (0 and 1) or 2"), True)
+        self.assertEqual(self._run("not true"), False)
+        self.assertEqual(self._run("null"), None)
+        self.assertEqual(self._run("1 != null"), True)
+        self.assertEqual(self._run("'baa' like '%a%'"), True)
+        self.assertEqual(self._run("'baa' ilike '%A%'"), True)
+        self.assertEqual(self._run("'a' not ilike 'b'"), True)
+        self.assertEqual(self._run("'a' in 'car'"), True)
+        self.assertEqual(self._run("'a' not in 'car'"), False)
+        self.assertEqual(self._run("'test' =~ 'e.*'"), True)
+        self.assertEqual(self._run("'test' !~* 'EST'"), False)
+        self.assertEqual(self._run("match('test', '^e.*')"), False)
+        self.assertEqual(self._run("properties.bla"), None)
+        self.assertEqual(self._run("properties.foo"), "bar")
+        self.assertEqual(self._run("event = '$pageview' and properties.$current_url like '%pricing%'"), True)
+        self.assertEqual(self._run("concat(properties.foo, 1, NULL, true)"), "bar1true")
+        self.assertEqual(self._run("toString(null)"), "null")
+        self.assertEqual(self._run("toInt('bla')"), None)
+        self.assertEqual(self._run("toFloat('1.2')"), 1.2)
+        self.assertEqual(self._run("properties.foo like concat('%', 'a', '%')"), True)
+
+    def test_compiled_programs_are_cached(self):
+        bytecode = create_bytecode(parse_expr("properties.foo = 'bar'"))
+        self.assertIs(compile_bytecode(bytecode), compile_bytecode(list(bytecode)))
+
+    def test_execute_many(self):
+        bytecode = create_bytecode(parse_expr("properties.foo = 'bar'"))
+        results = execute_many(bytecode, [{"properties": {"foo": "bar"}}, {"properties": {"foo": "baz"}}])
+        self.assertEqual(results, [True, False])
+
+    def test_errors(self):
+        with self.assertRaises(Exception) as e:
+            compile_bytecode([_H, op.TRUE, op.CALL, "notAFunction", 1])
+        self.assertEqual(str(e.exception), "Unsupported function call: notAFunction")
+
+        with self.assertRaises(Exception) as e:
+            compile_bytecode([_H, op.CALL, "notAFunction", 1])
+        self.assertEqual(str(e.exception), "Unexpected end of bytecode")
+
+        with self.assertRaises(Exception) as e:
+            compile_bytecode([_H, op.TRUE, op.TRUE, op.NOT])
+        self.assertEqual(str(e.exception), "Invalid bytecode. More than one value left on stack")
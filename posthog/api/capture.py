@@ -1,7 +1,6 @@
 import hashlib
 import json
 import re
-import time
 from datetime import datetime
 from typing import Any, Dict, Iterator, List, Optional, Tuple
 
@@ -13,7 +12,7 @@ from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from kafka.errors import KafkaError, MessageSizeTooLargeError
 from kafka.producer.future import FutureRecordMetadata
-from prometheus_client import Counter
+from prometheus_client import Counter, Histogram
 from rest_framework import status
 from sentry_sdk import configure_scope
 from sentry_sdk.api import capture_exception, start_span
@@ -23,7 +22,9 @@ from token_bucket import Limiter, MemoryStorage
 from posthog.api.utils import get_data, get_token, safe_clickhouse_string
 from posthog.exceptions import generate_exception_response
 from posthog.kafka_client.client import (
+    KafkaMessage,
     KafkaProducer,
+    _KafkaProducer,
     sessionRecordingKafkaProducer,
 )
 from posthog.kafka_client.topics import (
@@ -85,6 +86,13 @@ TOKEN_SHAPE_INVALID_COUNTER = Counter(
     labelnames=["reason"],
 )
 
+KAFKA_STAGE_LATENCY_HISTOGRAM = Histogram(
+    "capture_kafka_stage_duration_seconds",
+    "Time spent producing a batch of events to Kafka and waiting for the acks, per stage.",
+    labelnames=["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf")),
+)
+
 # This is a heuristic of ids we have seen used as anonymous. As they frequently
 # have significantly more traffic than non-anonymous distinct_ids, and likely
 # don't refer to the same underlying person we prefer to partition them randomly
@@ -152,6 +160,12 @@ def _kafka_topic(event_name: str, data: Dict) -> str:
             return settings.KAFKA_EVENTS_PLUGIN_INGESTION_TOPIC
 
 
+def _kafka_producer(event_name: str) -> _KafkaProducer:
+    if event_name in SESSION_RECORDING_DEDICATED_KAFKA_EVENTS:
+        return sessionRecordingKafkaProducer()
+    return KafkaProducer()
+
+
 def log_event(data: Dict, event_name: str, partition_key: Optional[str]):
     kafka_topic = _kafka_topic(event_name, data)
 
@@ -159,10 +173,7 @@ def log_event(data: Dict, event_name: str, partition_key: Optional[str]):
 
     # TODO: Handle Kafka being unavailable with exponential backoff retries
     try:
-        if event_name in SESSION_RECORDING_DEDICATED_KAFKA_EVENTS:
-            producer = sessionRecordingKafkaProducer()
-        else:
-            producer = KafkaProducer()
+        producer = _kafka_producer(event_name)
 
         future = producer.produce(topic=kafka_topic, data=data, key=partition_key)
         statsd.incr("posthog_cloud_plugin_server_ingestion")
@@ -388,84 +399,92 @@ def get_event(request):
 
     futures: List[FutureRecordMetadata] = []
 
-    with start_span(op="kafka.produce") as span:
+    with start_span(op="kafka.produce") as span, KAFKA_STAGE_LATENCY_HISTOGRAM.labels(stage="produce").time():
         span.set_tag("event.count", len(processed_events))
-        for event, event_uuid, distinct_id in processed_events:
-            try:
-                futures.append(capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid, token))
-            except Exception as exc:
-                capture_exception(exc, {"data": data})
-                statsd.incr("posthog_cloud_raw_endpoint_failure", tags={"endpoint": "capture"})
-                logger.error("kafka_produce_failure", exc_info=exc)
-                return cors_response(
-                    request,
-                    generate_exception_response(
-                        "capture",
-                        "Unable to store event. Please try again. If you are the owner of this app you can check the logs for further details.",
-                        code="server_error",
-                        type="server_error",
-                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    ),
-                )
-
-    with start_span(op="kafka.wait"):
+        try:
+            futures = capture_batch(processed_events, ip, site_url, now, sent_at, token)
+        except Exception as exc:
+            capture_exception(exc, {"data": data})
+            statsd.incr("posthog_cloud_raw_endpoint_failure", tags={"endpoint": "capture"})
+            logger.error("kafka_produce_failure", exc_info=exc)
+            return cors_response(
+                request,
+                generate_exception_response(
+                    "capture",
+                    "Unable to store event. Please try again. If you are the owner of this app you can check the logs for further details.",
+                    code="server_error",
+                    type="server_error",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                ),
+            )
+
+    # Replay events go to their own topic (and possibly their own cluster), so we produce them before waiting for the
+    # acks of the other events, which lets both sets of messages be in flight at the same time.
+    replay_futures = produce_replay_events(replay_events, data, ip, site_url, now, sent_at, token)
+
+    with start_span(op="kafka.wait") as span, KAFKA_STAGE_LATENCY_HISTOGRAM.labels(stage="wait").time():
         span.set_tag("future.count", len(futures))
-        start_time = time.monotonic()
-        for future in futures:
-            try:
-                future.get(timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS - (time.monotonic() - start_time))
-            except KafkaError as exc:
-                # TODO: distinguish between retriable errors and non-retriable
-                # errors, and set Retry-After header accordingly.
-                # TODO: return 400 error for non-retriable errors that require the
-                # client to change their request.
-
-                logger.error(
-                    "kafka_produce_failure",
-                    exc_info=exc,
-                    name=exc.__class__.__name__,
-                    # data could be large, so we don't always want to include it,
-                    # but we do want to include it for some errors to aid debugging
-                    data=data if isinstance(exc, MessageSizeTooLargeError) else None,
-                )
-                return cors_response(
-                    request,
-                    generate_exception_response(
-                        "capture",
-                        "Unable to store some events. Please try again. If you are the owner of this app you can check the logs for further details.",
-                        code="server_error",
-                        type="server_error",
-                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    ),
-                )
+        try:
+            _KafkaProducer.wait_for_futures(futures, timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS)
+        except KafkaError as exc:
+            # TODO: distinguish between retriable errors and non-retriable
+            # errors, and set Retry-After header accordingly.
+            # TODO: return 400 error for non-retriable errors that require the
+            # client to change their request.
+
+            logger.error(
+                "kafka_produce_failure",
+                exc_info=exc,
+                name=exc.__class__.__name__,
+                # data could be large, so we don't always want to include it,
+                # but we do want to include it for some errors to aid debugging
+                data=data if isinstance(exc, MessageSizeTooLargeError) else None,
+            )
+            return cors_response(
+                request,
+                generate_exception_response(
+                    "capture",
+                    "Unable to store some events. Please try again. If you are the owner of this app you can check the logs for further details.",
+                    code="server_error",
+                    type="server_error",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                ),
+            )
 
     try:
-        if replay_events:
+        with KAFKA_STAGE_LATENCY_HISTOGRAM.labels(stage="replay_wait").time():
+            _KafkaProducer.wait_for_futures(replay_futures, timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS)
+    except Exception as exc:
+        capture_exception(exc, {"data": data})
+        logger.error("kafka_session_recording_produce_failure", exc_info=exc)
+
+    statsd.incr("posthog_cloud_raw_endpoint_success", tags={"endpoint": "capture"})
+    return cors_response(request, JsonResponse({"status": 1}))
+
+
+def produce_replay_events(
+    replay_events: List[Any], data: Any, ip, site_url, now, sent_at, token
+) -> List[FutureRecordMetadata]:
+    # We want to be super careful with our new ingestion flow for now so the whole thing is separated
+    # This is mostly a copy of the flow for other events except we only log, we don't error out
+    try:
+        if not replay_events:
+            return []
+
+        with KAFKA_STAGE_LATENCY_HISTOGRAM.labels(stage="replay_produce").time():
             # The new flow we only enable if the dedicated kafka is enabled
             alternative_replay_events = preprocess_replay_events_for_blob_ingestion(
                 replay_events, settings.SESSION_RECORDING_KAFKA_MAX_REQUEST_SIZE_BYTES
             )
+            if not alternative_replay_events:
+                return []
 
-            futures = []
-
-            # We want to be super careful with our new ingestion flow for now so the whole thing is separated
-            # This is mostly a copy of above except we only log, we don't error out
-            if alternative_replay_events:
-                processed_events = list(preprocess_events(alternative_replay_events))
-                for event, event_uuid, distinct_id in processed_events:
-                    futures.append(capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid, token))
-
-                start_time = time.monotonic()
-                for future in futures:
-                    future.get(timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS - (time.monotonic() - start_time))
-
+            processed_events = list(preprocess_events(alternative_replay_events))
+            return capture_batch(processed_events, ip, site_url, now, sent_at, token)
     except Exception as exc:
         capture_exception(exc, {"data": data})
         logger.error("kafka_session_recording_produce_failure", exc_info=exc)
-        pass
-
-    statsd.incr("posthog_cloud_raw_endpoint_success", tags={"endpoint": "capture"})
-    return cors_response(request, JsonResponse({"status": 1}))
+        return []
 
 
 def preprocess_events(events: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], UUIDT, str]]:
@@ -503,6 +522,43 @@ def parse_event(event):
 
 
 def capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid=None, token=None):
+    parsed_event, kafka_partition_key = _prepare_kafka_event(
+        event, distinct_id, ip, site_url, now, sent_at, event_uuid, token
+    )
+    return log_event(parsed_event, event["event"], partition_key=kafka_partition_key)
+
+
+def capture_batch(
+    processed_events: List[Tuple[Dict[str, Any], UUIDT, str]], ip, site_url, now, sent_at, token
+) -> List[FutureRecordMetadata]:
+    """
+    Produce a batch of preprocessed events, grouped per producer, without waiting for acks in between. Wait for
+    the returned futures with `_KafkaProducer.wait_for_futures`.
+    """
+    messages_per_producer: Dict[_KafkaProducer, List[KafkaMessage]] = {}
+    for event, event_uuid, distinct_id in processed_events:
+        parsed_event, kafka_partition_key = _prepare_kafka_event(
+            event, distinct_id, ip, site_url, now, sent_at, event_uuid, token
+        )
+        messages_per_producer.setdefault(_kafka_producer(event["event"]), []).append(
+            KafkaMessage(topic=_kafka_topic(event["event"], parsed_event), data=parsed_event, key=kafka_partition_key)
+        )
+
+    futures: List[FutureRecordMetadata] = []
+    for producer, messages in messages_per_producer.items():
+        try:
+            futures.extend(producer.produce_batch(messages))
+        except Exception as e:
+            statsd.incr("capture_endpoint_log_event_error")
+            logger.exception("Failed to produce events to Kafka with error")
+            raise e
+        statsd.incr("posthog_cloud_plugin_server_ingestion", len(messages))
+    return futures
+
+
+def _prepare_kafka_event(
+    event, distinct_id, ip, site_url, now, sent_at, event_uuid=None, token=None
+) -> Tuple[Dict, Optional[str]]:
     if event_uuid is None:
         event_uuid = UUIDT()
 
@@ -524,7 +580,7 @@ def capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid=
 
     if event["event"] in SESSION_RECORDING_EVENT_NAMES:
         kafka_partition_key = event["properties"]["$session_id"]
-        return log_event(parsed_event, event["event"], partition_key=kafka_partition_key)
+        return parsed_event, kafka_partition_key
 
     candidate_partition_key = f"{token}:{distinct_id}"
 
@@ -535,7 +591,7 @@ def capture_internal(event, distinct_id, ip, site_url, now, sent_at, event_uuid=
     ):
         kafka_partition_key = hashlib.sha256(candidate_partition_key.encode()).hexdigest()
 
-    return log_event(parsed_event, event["event"], partition_key=kafka_partition_key)
+    return parsed_event, kafka_partition_key
 
 
 def is_randomly_partitioned(candidate_partition_key: str) -> bool:
@@ -16,10 +16,16 @@ from rest_framework.utils.serializer_helpers import ReturnDict
 
 from posthog.api.dashboards.dashboard_template_json_schema_parser import DashboardTemplateCreationJSONSchemaParser
 from posthog.api.forbid_destroy_model import ForbidDestroyModel
-from posthog.api.insight import InsightSerializer, InsightViewSet
+from posthog.api.insight import INSIGHT_REFRESH_INITIATED_COUNTER, InsightSerializer, InsightViewSet
 from posthog.api.routing import StructuredViewSetMixin
 from posthog.api.shared import UserBasicSerializer
 from posthog.api.tagged_item import TaggedItemSerializerMixin, TaggedItemViewSetMixin
+from posthog.caching.fetch_from_cache import (
+    InsightResult,
+    prefetch_cached_insight_results,
+    synchronously_update_tiles_cache,
+)
+from posthog.caching.insights_api import should_refresh_insight
 from posthog.constants import AvailableFeature
 from posthog.event_usage import report_user_action
 from posthog.helpers import create_dashboard_from_template
@@ -31,6 +37,7 @@ from posthog.models.team.team import check_is_feature_available_for_team
 from posthog.models.user import User
 from posthog.permissions import ProjectMembershipNecessaryPermissions, TeamMemberAccessPermission
 from posthog.user_permissions import UserPermissionsSerializerMixin
+from posthog.utils import refresh_requested_by_client
 
 logger = structlog.get_logger(__name__)
 
@@ -356,6 +363,9 @@ class DashboardSerializer(DashboardBasicSerializer):
             )
         )
         self.user_permissions.set_preloaded_dashboard_tiles(list(tiles))
+        if refresh_requested_by_client(self.context["request"]):
+            self.context.update({"refreshed_insight_results": self._refresh_tiles(dashboard, tiles)})
+        self.context.update({"prefetched_insight_results": prefetch_cached_insight_results(tiles)})
 
         for tile in tiles:
             self.context.update({"dashboard_tile": tile})
@@ -368,6 +378,22 @@ class DashboardSerializer(DashboardBasicSerializer):
 
         return serialized_tiles
 
+    def _refresh_tiles(self, dashboard: Dashboard, tiles: QuerySet) -> Dict[int, InsightResult]:
+        """Calculates all tiles in need of a refresh at once, rather than one by one as they're serialized."""
+        is_shared = self.context.get("is_shared", False)
+        tiles_to_refresh = []
+        for tile in tiles:
+            if tile.insight is None or tile.deleted:
+                continue
+            refresh_insight_now, refresh_frequency = should_refresh_insight(
+                tile.insight, tile, request=self.context["request"], is_shared=is_shared
+            )
+            if refresh_insight_now:
+                INSIGHT_REFRESH_INITIATED_COUNTER.labels(is_shared=is_shared).inc()
+                tiles_to_refresh.append((tile, refresh_frequency))
+
+        return synchronously_update_tiles_cache(dashboard, tiles_to_refresh)
+
     def validate(self, data):
         if data.get("use_dashboard", None) and data.get("use_template", None):
             raise serializers.ValidationError("`use_dashboard` and `use_template` cannot be used together")
@@ -23,7 +23,7 @@ from posthog.api.utils import get_project_id, get_token
 from posthog.exceptions import RequestParsingError, generate_exception_response
 from posthog.logging.timing import timed
 from posthog.models import Team, User
-from posthog.models.feature_flag import get_all_feature_flags
+from posthog.models.feature_flag import get_all_feature_flags, get_feature_flags_for_distinct_ids
 from posthog.models.utils import execute_with_timeout
 from posthog.plugins.site import get_decide_site_apps
 from posthog.utils import get_ip_address, label_for_team_id_to_track, load_data_from_request
@@ -243,15 +243,9 @@ def get_decide(request: HttpRequest):
             # `test_decide_doesnt_error_out_when_database_is_down`
             # which ensures that decide doesn't error out when the database is down
 
-            if feature_flags:
-                # Billing analytics for decide requests with feature flags
-                # Don't count if all requests are for survey targeting flags only.
-                if not all(flag.startswith(SURVEY_TARGETING_FLAG_PREFIX) for flag in feature_flags.keys()):
-
-                    # Sample no. of decide requests with feature flags
-                    if settings.DECIDE_BILLING_SAMPLING_RATE and random() < settings.DECIDE_BILLING_SAMPLING_RATE:
-                        count = int(1 / settings.DECIDE_BILLING_SAMPLING_RATE)
-                        increment_request_count(team.pk, count)
+            # Billing analytics for decide requests with feature flags
+            if is_billable(feature_flags):
+                increment_sampled_request_count(team.pk)
 
         else:
             # no auth provided
@@ -268,3 +262,121 @@ def get_decide(request: HttpRequest):
 
     statsd.incr(f"posthog_cloud_raw_endpoint_success", tags={"endpoint": "decide"})
     return cors_response(request, JsonResponse(response))
+
+
+def is_billable(feature_flags: Optional[Dict[str, Any]]) -> bool:
+    # Don't count if all requests are for survey targeting flags only.
+    return bool(feature_flags) and not all(
+        flag.startswith(SURVEY_TARGETING_FLAG_PREFIX) for flag in feature_flags.keys()
+    )
+
+
+def increment_sampled_request_count(team_id: int, request_count: int = 1) -> None:
+    # Sample no. of decide requests with feature flags
+    if not settings.DECIDE_BILLING_SAMPLING_RATE:
+        return
+    sampled_count = sum(1 for _ in range(request_count) if random() < settings.DECIDE_BILLING_SAMPLING_RATE)
+    if sampled_count:
+        increment_request_count(team_id, sampled_count * int(1 / settings.DECIDE_BILLING_SAMPLING_RATE))
+
+
+@csrf_exempt
+@timed("posthog_cloud_decide_batch_endpoint")
+def get_decide_batch(request: HttpRequest):
+    """
+    Evaluates all flags for many distinct_ids at once, for server-side libraries that would otherwise call /decide
+    once per user. `groups`, `person_properties` and `group_properties` apply to all `distinct_ids`.
+    """
+    if request.method == "OPTIONS":
+        return cors_response(request, JsonResponse({"status": 1}))
+
+    if request.method != "POST":
+        return cors_response(
+            request,
+            generate_exception_response(
+                "decide_batch",
+                "Batch decide only supports POST requests.",
+                code="method_not_allowed",
+                status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
+            ),
+        )
+
+    try:
+        data = load_data_from_request(request)
+    except RequestParsingError as error:
+        capture_exception(error)
+        return cors_response(
+            request,
+            generate_exception_response("decide_batch", f"Malformed request data: {error}", code="malformed_data"),
+        )
+
+    team = Team.objects.get_team_from_cache_or_token(get_token(data, request))
+    if team is None:
+        return cors_response(
+            request,
+            generate_exception_response(
+                "decide_batch",
+                "Project API key invalid. You can find your project API key in PostHog project settings.",
+                code="invalid_api_key",
+                type="authentication_error",
+                status_code=status.HTTP_401_UNAUTHORIZED,
+            ),
+        )
+
+    structlog.contextvars.bind_contextvars(team_id=team.id)
+
+    distinct_ids = data.get("distinct_ids")
+    if not isinstance(distinct_ids, list) or len(distinct_ids) == 0:
+        return cors_response(
+            request,
+            generate_exception_response(
+                "decide_batch",
+                "Batch decide requires a non-empty list of distinct_ids.",
+                code="missing_distinct_ids",
+                attr="distinct_ids",
+            ),
+        )
+    if len(distinct_ids) > settings.DECIDE_BATCH_MAX_DISTINCT_IDS:
+        return cors_response(
+            request,
+            generate_exception_response(
+                "decide_batch",
+                f"Batch decide accepts at most {settings.DECIDE_BATCH_MAX_DISTINCT_IDS} distinct_ids per request.",
+                code="too_many_distinct_ids",
+                attr="distinct_ids",
+            ),
+        )
+
+    for attr in ("groups", "person_properties", "group_properties"):
+        if not isinstance(data.get(attr) or {}, dict):
+            return cors_response(
+                request,
+                generate_exception_response(
+                    "decide_batch",
+                    f"Malformed request data: {attr} must be an object.",
+                    code="malformed_data",
+                    attr=attr,
+                ),
+            )
+
+    # Preserve the order, but evaluate every distinct_id only once
+    distinct_ids = list(dict.fromkeys(str(distinct_id) for distinct_id in distinct_ids))
+    feature_flags, errors = get_feature_flags_for_distinct_ids(
+        team.pk,
+        distinct_ids,
+        data.get("groups") or {},
+        property_value_overrides=data.get("person_properties") or {},
+        group_property_value_overrides=data.get("group_properties") or {},
+    )
+
+    FLAG_EVALUATION_COUNTER.labels(
+        team_id=label_for_team_id_to_track(team.pk), errors_computing=errors, has_hash_key_override=False
+    ).inc(len(distinct_ids))
+
+    # Bill like the equivalent number of /decide requests
+    billable_count = sum(1 for flags in feature_flags.values() if is_billable(flags))
+    if billable_count:
+        increment_sampled_request_count(team.pk, billable_count)
+
+    statsd.incr(f"posthog_cloud_raw_endpoint_success", tags={"endpoint": "decide_batch"})
+    return cors_response(request, JsonResponse({"featureFlags": feature_flags, "errorsWhileComputingFlags": errors}))
@@ -21,6 +21,8 @@ from posthog.models.activity_logging.activity_log import Change, Detail, log_act
 from posthog.models.exported_asset import ExportedAsset, get_content_response
 from posthog.permissions import ProjectMembershipNecessaryPermissions, TeamMemberAccessPermission
 from posthog.tasks import exporter
+from posthog.tasks.exports.arrow_exporter import COLUMNAR_EXPORT_FORMATS
+from posthog.tasks.exports.csv_exporter import can_stream_query
 
 logger = structlog.get_logger(__name__)
 
@@ -42,8 +44,9 @@ class ExportedAssetSerializer(serializers.ModelSerializer):
             "export_context",
             "filename",
             "expires_after",
+            "exported_rows",
         ]
-        read_only_fields = ["id", "created_at", "has_content", "filename"]
+        read_only_fields = ["id", "created_at", "has_content", "filename", "exported_rows"]
 
     def validate(self, data: Dict) -> Dict:
         if not data.get("export_format"):
@@ -58,6 +61,11 @@ class ExportedAssetSerializer(serializers.ModelSerializer):
         if data.get("insight") and data["insight"].team.id != self.context["team_id"]:
             raise ValidationError({"insight": ["This insight does not belong to your team."]})
 
+        if data["export_format"] in COLUMNAR_EXPORT_FORMATS:
+            source = (data.get("export_context") or {}).get("source")
+            if not source or not can_stream_query(source):
+                raise ValidationError({"export_format": ["This format is only supported for exports of queries."]})
+
         data["expires_after"] = data.get("expires_after", (now() + SIX_MONTHS).date())
 
         data["team_id"] = self.context["team_id"]
@@ -223,6 +223,12 @@ class InsightSerializer(InsightBasicSerializer, UserPermissionsSerializerMixin):
     """,
     )
     is_cached = serializers.SerializerMethodField(read_only=True)
+    is_stale = serializers.SerializerMethodField(
+        read_only=True,
+        help_text="""
+    Whether the cached results are older than the refresh frequency. Fresh results are being calculated in the background.
+    """,
+    )
     created_by = UserBasicSerializer(read_only=True)
     last_modified_by = UserBasicSerializer(read_only=True)
     effective_restriction_level = serializers.SerializerMethodField()
@@ -276,6 +282,7 @@ class InsightSerializer(InsightBasicSerializer, UserPermissionsSerializerMixin):
             "effective_privilege_level",
             "timezone",
             "is_cached",
+            "is_stale",
         ]
         read_only_fields = (
             "created_at",
@@ -290,6 +297,7 @@ class InsightSerializer(InsightBasicSerializer, UserPermissionsSerializerMixin):
             "timezone",
             "refreshing",
             "is_cached",
+            "is_stale",
         )
 
     def create(self, validated_data: Dict, *args: Any, **kwargs: Any) -> Insight:
@@ -463,6 +471,9 @@ class InsightSerializer(InsightBasicSerializer, UserPermissionsSerializerMixin):
     def get_is_cached(self, insight: Insight):
         return self.insight_result(insight).is_cached
 
+    def get_is_stale(self, insight: Insight):
+        return self.insight_result(insight).is_stale
+
     def get_effective_restriction_level(self, insight: Insight) -> Dashboard.RestrictionLevel:
         if self.context.get("is_shared"):
             return Dashboard.RestrictionLevel.ONLY_COLLABORATORS_CAN_EDIT
@@ -503,6 +514,11 @@ class InsightSerializer(InsightBasicSerializer, UserPermissionsSerializerMixin):
         dashboard_tile = self.dashboard_tile_from_context(insight, dashboard)
         target = insight if dashboard is None else dashboard_tile
 
+        # Dashboards loaded with `refresh=true` calculate all their tiles in need of a refresh at once
+        refreshed = self.context.get("refreshed_insight_results", {}).get(dashboard_tile.pk) if dashboard_tile else None
+        if refreshed is not None:
+            return refreshed
+
         is_shared = self.context.get("is_shared", False)
         refresh_insight_now, refresh_frequency = should_refresh_insight(
             insight, dashboard_tile, request=self.context["request"], is_shared=is_shared
@@ -511,8 +527,13 @@ class InsightSerializer(InsightBasicSerializer, UserPermissionsSerializerMixin):
             INSIGHT_REFRESH_INITIATED_COUNTER.labels(is_shared=is_shared).inc()
             return synchronously_update_cache(insight, dashboard, refresh_frequency)
 
+        # Dashboards read the cached results of all their tiles at once
+        prefetched = (
+            self.context.get("prefetched_insight_results", {}).get(dashboard_tile.pk) if dashboard_tile else None
+        )
+
         # :TODO: Clear up if tile can be null or not
-        return fetch_cached_insight_result(target or insight, refresh_frequency)
+        return fetch_cached_insight_result(target or insight, refresh_frequency, prefetched)
 
     @lru_cache(maxsize=1)  # each serializer instance should only deal with one insight/tile combo
     def dashboard_tile_from_context(self, insight: Insight, dashboard: Optional[Dashboard]) -> Optional[DashboardTile]:
@@ -1,8 +1,9 @@
 import json
 import re
-from typing import Dict, Optional, cast, Any, List
+import tempfile
+from typing import IO, Dict, Optional, cast, Any, List
 
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter
 from pydantic import BaseModel
@@ -18,6 +19,7 @@ from sentry_sdk import capture_exception
 from posthog import schema
 from posthog.api.documentation import extend_schema
 from posthog.api.routing import StructuredViewSetMixin
+from posthog.clickhouse.client.connection import Workload
 from posthog.clickhouse.query_tagging import tag_queries
 from posthog.errors import ExposedCHQueryError
 from posthog.hogql import ast
@@ -26,10 +28,11 @@ from posthog.hogql.database.database import create_hogql_database, serialize_dat
 from posthog.hogql.errors import HogQLException
 from posthog.hogql.metadata import get_hogql_metadata
 from posthog.hogql.modifiers import create_default_modifiers_for_team
-from posthog.hogql.query import execute_hogql_query
+from posthog.hogql.query import execute_hogql_query, stream_hogql_query_as_arrow
 
 from posthog.hogql_queries.query_runner import get_query_runner
-from posthog.models import Team
+from posthog.models import ExportedAsset, Team
+from posthog.models.exported_asset import FILE_EXTENSIONS
 from posthog.models.user import User
 from posthog.permissions import ProjectMembershipNecessaryPermissions, TeamMemberAccessPermission
 from posthog.queries.time_to_see_data.serializers import SessionEventsQuerySerializer, SessionsQuerySerializer
@@ -50,6 +53,11 @@ QUERY_WITH_RUNNER_NO_CACHE = [
     "EventsQuery",
     "PersonsQuery",
 ]
+# Formats HogQL query results can be returned in as a file, instead of as JSON
+QUERY_OUTPUT_FORMATS = {
+    "parquet": ExportedAsset.ExportFormat.PARQUET,
+    "arrow": ExportedAsset.ExportFormat.ARROW,
+}
 
 
 class QueryThrottle(TeamRateThrottle):
@@ -119,8 +127,11 @@ class QueryViewSet(StructuredViewSetMixin, viewsets.ViewSet):
         request_json = request.data
         query_json = request_json.get("query")
         self._tag_client_query_id(request_json.get("client_query_id"))
+        output_format = request_json.get("output_format")
         # allow lists as well as dicts in response with safe=False
         try:
+            if output_format:
+                return self._file_response(query_json, output_format)
             return JsonResponse(process_query(self.team, query_json, request=request), safe=False)
         except HogQLException as e:
             raise ValidationError(str(e))
@@ -157,6 +168,16 @@ class QueryViewSet(StructuredViewSetMixin, viewsets.ViewSet):
                 )
         return
 
+    def _file_response(self, query_json: Dict, output_format: str) -> FileResponse:
+        if output_format not in QUERY_OUTPUT_FORMATS:
+            raise ValidationError(
+                {"output_format": [f"Must be one of: {', '.join(QUERY_OUTPUT_FORMATS)}."]}, code="invalid"
+            )
+        export_format = QUERY_OUTPUT_FORMATS[output_format]
+        file = process_query_as_file(self.team, query_json, export_format)
+        filename = f"query.{FILE_EXTENSIONS[export_format]}"
+        return FileResponse(file, as_attachment=True, filename=filename, content_type=export_format)
+
     def _tag_client_query_id(self, query_id: str | None):
         if query_id is not None:
             tag_queries(client_query_id=query_id)
@@ -187,6 +208,41 @@ class QueryViewSet(StructuredViewSetMixin, viewsets.ViewSet):
         return query
 
 
+def process_query_as_file(team: Team, query_json: Dict, export_format: str) -> IO[bytes]:
+    """
+    Writes the results of a HogQL query into a temporary file in a columnar export format, straight from the Arrow
+    record batches ClickHouse returns. Like JSON results, they are capped at MAX_SELECT_RETURNED_ROWS rows.
+    """
+    from posthog.tasks.exports.arrow_exporter import write_record_batches
+
+    if query_json.get("kind") != "HogQLQuery":
+        raise ValidationError({"output_format": ["Only HogQL queries can be returned as a file."]}, code="invalid")
+
+    tag_queries(query=query_json)
+    hogql_query = HogQLQuery.model_validate(query_json)
+    values = (
+        {key: ast.Constant(value=value) for key, value in hogql_query.values.items()} if hogql_query.values else None
+    )
+    file = tempfile.TemporaryFile()
+    try:
+        with stream_hogql_query_as_arrow(
+            query_type="HogQLQuery",
+            query=hogql_query.query,
+            team=team,
+            filters=hogql_query.filters,
+            modifiers=hogql_query.modifiers,
+            placeholders=values,
+            workload=Workload.ONLINE,
+            limit_top_select=True,
+        ) as (names, reader):
+            write_record_batches(reader, file, export_format, names)
+    except Exception:
+        file.close()
+        raise
+    file.seek(0)
+    return file
+
+
 def _unwrap_pydantic(response: Any) -> Dict | List:
     if isinstance(response, list):
         return [_unwrap_pydantic(item) for item in response]
@@ -612,6 +612,20 @@ class TestCapture(BaseTest):
             },
         )
 
+    @patch("posthog.kafka_client.client._KafkaProducer.wait_for_futures")
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_batch_produces_all_events_before_waiting_for_acks(self, kafka_produce, wait_for_futures):
+        events = [{"type": "capture", "event": f"event {index}", "distinct_id": "2"} for index in range(3)]
+        response = self.client.post(
+            "/batch/", data={"api_key": self.team.api_token, "batch": events}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(kafka_produce.call_count, 3)
+        # one wait for the events, one (empty) wait for replay events
+        self.assertEqual(len(wait_for_futures.call_args_list[0].args[0]), 3)
+        self.assertEqual(wait_for_futures.call_args_list[1].args[0], [])
+
     @patch("posthog.kafka_client.client._KafkaProducer.produce")
     def test_batch_with_invalid_event(self, kafka_produce):
         data = [
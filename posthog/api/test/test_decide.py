@@ -10,6 +10,7 @@ from django.core.cache import cache
 from django.db import connection, connections
 from django.test import TransactionTestCase, TestCase
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from freezegun import freeze_time
 import pytest
@@ -2183,6 +2184,163 @@ class TestDecide(BaseTest, QueryMatchingTest):
             self.assertEqual(client.hgetall(f"posthog:decide_requests:{self.team.pk}"), {})
 
 
+@patch("posthog.models.feature_flag.flag_matching.postgres_healthcheck.is_connected", return_value=True)
+class TestDecideBatch(BaseTest, QueryMatchingTest):
+    def setUp(self, *args):
+        cache.clear()
+        super().setUp()
+        self.client = Client(enforce_csrf_checks=True)
+
+    def _post_decide_batch(self, distinct_ids, token=None, **kwargs):
+        return self.client.post(
+            "/decide/batch/",
+            json.dumps({"token": token or self.team.api_token, "distinct_ids": distinct_ids, **kwargs}),
+            content_type="application/json",
+        )
+
+    def test_flags_for_many_distinct_ids(self, *args):
+        for index in range(5):
+            Person.objects.create(
+                team=self.team,
+                distinct_ids=[f"person_{index}"],
+                properties={"email": f"{index}@{'posthog.com' if index % 2 else 'example.com'}"},
+            )
+        FeatureFlag.objects.create(
+            team=self.team,
+            key="posthog-only",
+            created_by=self.user,
+            filters={
+                "groups": [
+                    {
+                        "properties": [
+                            {"key": "email", "value": "posthog.com", "operator": "icontains", "type": "person"}
+                        ]
+                    }
+                ]
+            },
+        )
+        FeatureFlag.objects.create(
+            team=self.team,
+            key="variants",
+            created_by=self.user,
+            filters={
+                "groups": [{"properties": [], "rollout_percentage": 100}],
+                "multivariate": {
+                    "variants": [
+                        {"key": "first-variant", "rollout_percentage": 50},
+                        {"key": "second-variant", "rollout_percentage": 50},
+                    ]
+                },
+            },
+        )
+        distinct_ids = [f"person_{index}" for index in range(5)] + ["not_ingested"]
+
+        self._post_decide_batch(distinct_ids[:1])
+        with CaptureQueriesContext(connection) as single_distinct_id_queries:
+            self._post_decide_batch(distinct_ids[:1])
+        # The number of queries doesn't depend on the number of distinct_ids
+        with self.assertNumQueries(len(single_distinct_id_queries)):
+            response = self._post_decide_batch(distinct_ids)
+
+        self.assertEqual(response.status_code, 200)
+        response_data = response.json()
+        self.assertFalse(response_data["errorsWhileComputingFlags"])
+        self.assertEqual(list(response_data["featureFlags"].keys()), distinct_ids)
+        self.assertEqual(
+            [flags["posthog-only"] for flags in response_data["featureFlags"].values()],
+            [False, True, False, True, False, False],
+        )
+
+        # Same values as /decide
+        for distinct_id in distinct_ids:
+            single = self.client.post(
+                "/decide/?v=3",
+                json.dumps({"token": self.team.api_token, "distinct_id": distinct_id}),
+                content_type="application/json",
+            ).json()
+            self.assertEqual(single["featureFlags"], response_data["featureFlags"][distinct_id])
+
+    def test_hash_key_overrides(self, *args):
+        person = Person.objects.create(team=self.team, distinct_ids=["example_id", "anonymous_id"])
+        Person.objects.create(team=self.team, distinct_ids=["other_id"])
+        FeatureFlag.objects.create(
+            team=self.team,
+            key="continuity",
+            created_by=self.user,
+            ensure_experience_continuity=True,
+            filters={
+                "groups": [{"properties": [], "rollout_percentage": 100}],
+                "multivariate": {
+                    "variants": [
+                        {"key": "first-variant", "rollout_percentage": 50},
+                        {"key": "second-variant", "rollout_percentage": 50},
+                    ]
+                },
+            },
+        )
+        FeatureFlagHashKeyOverride.objects.create(
+            team=self.team, person=person, feature_flag_key="continuity", hash_key="anonymous_id"
+        )
+
+        response = self._post_decide_batch(["example_id", "other_id"]).json()
+
+        # The override makes `example_id` hash like `anonymous_id`
+        expected = self._post_decide_batch(["anonymous_id"]).json()["featureFlags"]["anonymous_id"]["continuity"]
+        self.assertEqual(response["featureFlags"]["example_id"]["continuity"], expected)
+
+    def test_validation(self, *args):
+        response = self._post_decide_batch([])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["code"], "missing_distinct_ids")
+
+        with self.settings(DECIDE_BATCH_MAX_DISTINCT_IDS=2):
+            response = self._post_decide_batch(["1", "2", "3"])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["code"], "too_many_distinct_ids")
+
+        response = self._post_decide_batch(["1"], token="invalid")
+        self.assertEqual(response.status_code, 401)
+
+        response = self._post_decide_batch(["1"], groups=["organization"])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["code"], "malformed_data")
+        self.assertEqual(response.json()["attr"], "groups")
+
+    def test_rate_limits_count_every_distinct_id(self, *args):
+        with self.settings(DECIDE_RATE_LIMIT_ENABLED="y", DECIDE_BUCKET_REPLENISH_RATE=0.01, DECIDE_BUCKET_CAPACITY=3):
+            self.client.logout()
+            response = self._post_decide_batch(["1", "2"])
+            self.assertEqual(response.status_code, 200)
+
+            response = self._post_decide_batch(["1", "2"])
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.json()["code"], "rate_limit_exceeded")
+
+            # /decide shares the same bucket
+            response = self.client.post(
+                "/decide/?v=3",
+                json.dumps({"token": self.team.api_token, "distinct_id": "1"}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self._post_decide_batch(["1"]).status_code, 429)
+
+    @patch("posthog.models.feature_flag.flag_analytics.CACHE_BUCKET_SIZE", 10)
+    def test_decide_analytics_count_distinct_ids_with_non_survey_targeting_flags(self, *args):
+        FeatureFlag.objects.create(
+            team=self.team, rollout_percentage=50, key="survey-targeting-random", created_by=self.user
+        )
+
+        with self.settings(DECIDE_BILLING_SAMPLING_RATE=1), freeze_time("2022-05-07 12:23:07"):
+            self._post_decide_batch(["1", "2", "3"])
+            client = redis.get_client()
+            self.assertEqual(client.hgetall(f"posthog:decide_requests:{self.team.pk}"), {})
+
+            FeatureFlag.objects.create(team=self.team, rollout_percentage=50, key="beta-feature", created_by=self.user)
+            self._post_decide_batch(["1", "2", "3"])
+            self.assertEqual(client.hgetall(f"posthog:decide_requests:{self.team.pk}"), {b"165192618": b"3"})
+
+
 class TestDatabaseCheckForDecide(BaseTest, QueryMatchingTest):
     """
     Tests that the database check for decide works as expected.
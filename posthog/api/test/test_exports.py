@@ -77,6 +77,7 @@ class TestExports(APIBaseTest):
             "has_content": False,
             "insight": None,
             "export_context": None,
+            "exported_rows": None,
             # without an expiry being set at creation, the default is 6 months
             "expires_after": (now() + timedelta(weeks=26))
             .replace(hour=0, minute=0, second=0, microsecond=0)
@@ -108,6 +109,7 @@ class TestExports(APIBaseTest):
             "has_content": False,
             "insight": None,
             "export_context": None,
+            "exported_rows": None,
             "expires_after": one_week_from_now.isoformat() + "Z",
         }
 
@@ -151,6 +153,7 @@ class TestExports(APIBaseTest):
                 "has_content": False,
                 "dashboard": None,
                 "export_context": None,
+                "exported_rows": None,
                 "expires_after": (now() + timedelta(weeks=26))
                 .replace(hour=0, minute=0, second=0, microsecond=0)
                 .isoformat()
@@ -214,6 +217,27 @@ class TestExports(APIBaseTest):
             },
         )
 
+    @patch("posthog.api.exports.exporter")
+    def test_errors_if_columnar_format_without_query(self, mock_exporter_task) -> None:
+        response = self.client.post(
+            f"/api/projects/{self.team.id}/exports",
+            {
+                "export_format": "application/vnd.apache.parquet",
+                "export_context": {"path": f"/api/projects/{self.team.id}/events"},
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            {
+                "attr": "export_format",
+                "code": "invalid_input",
+                "detail": "This format is only supported for exports of queries.",
+                "type": "validation_error",
+            },
+        )
+        mock_exporter_task.export_asset.delay.assert_not_called()
+
     @patch("posthog.api.exports.exporter")
     def test_will_respond_even_if_task_timesout(self, mock_exporter_task) -> None:
         mock_exporter_task.export_asset.delay.return_value.get.side_effect = celery.exceptions.TimeoutError("timed out")
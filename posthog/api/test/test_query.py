@@ -1,7 +1,10 @@
+import io
 import json
 from unittest.mock import patch
 from urllib.parse import quote
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 from freezegun import freeze_time
 from rest_framework import status
 
@@ -541,3 +544,54 @@ class TestQuery(ClickhouseTestMixin, APIBaseTest):
             )
 
         self.assertEqual(response.get("results", [])[0][0], 20)
+
+    def test_full_hogql_query_as_parquet(self):
+        with freeze_time("2020-01-10 12:00:00"):
+            _create_event(team=self.team, event="sign up", distinct_id="2", properties={"key": "test_val1"})
+        with freeze_time("2020-01-10 12:11:00"):
+            _create_event(team=self.team, event="sign out", distinct_id="2", properties={"key": "test_val2"})
+        flush_persons_and_events()
+
+        query = HogQLQuery(query="select event, properties.key from events order by timestamp")
+        response = self.client.post(
+            f"/api/projects/{self.team.id}/query/", {"query": query.dict(), "output_format": "parquet"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.parquet")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="query.parquet"')
+        table = pq.read_table(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(table.column_names, ["event", "properties.key"])
+        self.assertEqual(table.to_pylist()[1], {"event": "sign out", "properties.key": "test_val2"})
+
+    def test_full_hogql_query_as_arrow(self):
+        random_uuid = str(UUIDT())
+        for _ in range(3):
+            _create_event(team=self.team, event="sign up", distinct_id=random_uuid)
+        flush_persons_and_events()
+
+        query = HogQLQuery(
+            query="select count() from events where distinct_id = {random_uuid}", values={"random_uuid": random_uuid}
+        )
+        response = self.client.post(
+            f"/api/projects/{self.team.id}/query/", {"query": query.dict(), "output_format": "arrow"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.arrow.stream")
+        table = pa.ipc.open_stream(b"".join(response.streaming_content)).read_all()
+        self.assertEqual(table.to_pydict(), {"count()": [3]})
+
+    def test_unsupported_output_format(self):
+        query = HogQLQuery(query="select 1")
+        response = self.client.post(
+            f"/api/projects/{self.team.id}/query/", {"query": query.dict(), "output_format": "xml"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["attr"], "output_format")
+
+        query_json = EventsQuery(select=["event"]).dict()
+        response = self.client.post(
+            f"/api/projects/{self.team.id}/query/", {"query": query_json, "output_format": "arrow"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
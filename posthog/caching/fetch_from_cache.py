@@ -1,15 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union, cast
 
+from django.conf import settings
+from django.db import connections
 from django.utils.timezone import now
 from prometheus_client import Counter
 
 from posthog.caching.calculate_results import calculate_cache_key, calculate_result_by_insight
 from posthog.caching.insight_cache import update_cached_state
+from posthog.caching.stale_while_revalidate import finish_background_refresh, queue_background_refresh
+from posthog.clickhouse.client.connection import concurrent_query_worker, team_connections_limit
+from posthog.clickhouse.query_tagging import get_query_tags, tag_queries
 from posthog.models import DashboardTile, Insight
 from posthog.models.dashboard import Dashboard
-from posthog.utils import get_safe_cache
+from posthog.models.instance_setting import get_instance_setting
+from posthog.utils import get_safe_cache, get_safe_cache_many
+
+# Results older than this aren't served as stale while they're refreshed in the background, same as queries
+INSIGHT_MAX_STALENESS = timedelta(hours=1)
 
 insight_cache_read_counter = Counter(
     "posthog_cloud_insight_cache_read", "A read from the redis insight cache", labelnames=["result"]
@@ -24,6 +34,8 @@ class InsightResult:
     is_cached: bool
     timezone: Optional[str]
     next_allowed_client_refresh: Optional[datetime] = None
+    # Whether the result is older than the refresh frequency, and is being refreshed in the background
+    is_stale: bool = False
 
 
 @dataclass(frozen=True)
@@ -36,19 +48,46 @@ class NothingInCacheResult(InsightResult):
     next_allowed_client_refresh: Optional[datetime] = None
 
 
-def fetch_cached_insight_result(target: Union[Insight, DashboardTile], refresh_frequency: timedelta) -> InsightResult:
+@dataclass(frozen=True)
+class PrefetchedInsightResult:
+    cache_key: Optional[str]
+    # None if nothing was cached
+    cached_result: Optional[Dict[str, Any]]
+
+
+def prefetch_cached_insight_results(tiles: Iterable[DashboardTile]) -> Dict[int, PrefetchedInsightResult]:
     """
-    Returns cached value for this insight.
+    Reads the cached values of all insight tiles of a dashboard in a single round trip, keyed by tile id.
+
+    Pass these to `fetch_cached_insight_result`, instead of reading the cache once per tile.
+    """
+    cache_keys = {tile.pk: calculate_cache_key(tile) for tile in tiles if tile.insight_id is not None}
+    cached_results = get_safe_cache_many([cache_key for cache_key in cache_keys.values() if cache_key is not None])
+    return {
+        tile_id: PrefetchedInsightResult(
+            cache_key=cache_key, cached_result=cached_results.get(cache_key) if cache_key else None
+        )
+        for tile_id, cache_key in cache_keys.items()
+    }
+
+
+def fetch_cached_insight_result(
+    target: Union[Insight, DashboardTile],
+    refresh_frequency: timedelta,
+    prefetched: Optional[PrefetchedInsightResult] = None,
+) -> InsightResult:
+    """
+    Returns cached value for this insight, or the prefetched value if given.
 
     InsightResult.result will be None if value was not found in cache.
     """
 
-    cache_key = calculate_cache_key(target)
+    cache_key = prefetched.cache_key if prefetched is not None else calculate_cache_key(target)
 
     if cache_key is None:
         return NothingInCacheResult(cache_key=None)
 
-    cached_result = get_safe_cache(cache_key)
+    cached_result = prefetched.cached_result if prefetched is not None else get_safe_cache(cache_key)
 
     if cached_result is None:
         insight_cache_read_counter.labels("cache_miss").inc()
@@ -60,6 +99,14 @@ def fetch_cached_insight_result(target: Union[Insight, DashboardTile], refresh_f
             cached_result.get("next_allowed_client_refresh") or last_refresh + refresh_frequency
         )
 
+        is_stale = False
+        if (
+            settings.STALE_WHILE_REVALIDATE_ENABLED
+            and last_refresh
+            and last_refresh + refresh_frequency <= now() < last_refresh + INSIGHT_MAX_STALENESS
+        ):
+            is_stale = _queue_insight_refresh(target, cache_key)
+
         return InsightResult(
             result=cached_result.get("result"),
             last_refresh=last_refresh,
@@ -68,9 +115,35 @@ def fetch_cached_insight_result(target: Union[Insight, DashboardTile], refresh_f
             # :TODO: This is only populated in some code paths writing to cache
             timezone=cached_result.get("timezone"),
             next_allowed_client_refresh=next_allowed_client_refresh,
+            is_stale=is_stale,
         )
 
 
+def _queue_insight_refresh(target: Union[Insight, DashboardTile], cache_key: str) -> bool:
+    """Refresh a stale insight result in the background. Returns whether the result is being refreshed."""
+    from posthog.celery import refresh_insight_cache_task
+
+    insight = target if isinstance(target, Insight) else target.insight
+    if insight is None:
+        return False
+    dashboard_id = target.dashboard_id if isinstance(target, DashboardTile) else None
+
+    queue_background_refresh(
+        "insight", cache_key, lambda: refresh_insight_cache_task.delay(insight.pk, dashboard_id, cache_key)
+    )
+    return True
+
+
+def refresh_insight_cache(insight_id: int, dashboard_id: Optional[int], cache_key: str) -> None:
+    """Calculate an insight again and cache the result, after a stale result of it was served."""
+    try:
+        insight = Insight.objects.get(pk=insight_id)
+        dashboard = Dashboard.objects.get(pk=dashboard_id) if dashboard_id is not None else None
+        synchronously_update_cache(insight, dashboard)
+    finally:
+        finish_background_refresh(cache_key)
+
+
 def synchronously_update_cache(
     insight: Insight, dashboard: Optional[Dashboard], refresh_frequency: Optional[timedelta] = None
 ) -> InsightResult:
@@ -98,3 +171,44 @@ def synchronously_update_cache(
         timezone=insight.team.timezone,
         next_allowed_client_refresh=next_allowed_client_refresh,
     )
+
+
+def synchronously_update_tiles_cache(
+    dashboard: Dashboard, tiles: List[Tuple[DashboardTile, timedelta]]
+) -> Dict[int, InsightResult]:
+    """
+    Calculates the insights of many tiles of a dashboard concurrently, and returns their results keyed by tile id.
+
+    Tiles are given with their refresh frequency. Refreshing a dashboard then takes about as long as its slowest tile,
+    rather than the sum of all tiles.
+    """
+    max_workers = _max_tile_refresh_workers(dashboard.team_id)
+    if not settings.DASHBOARD_PARALLEL_REFRESH_ENABLED or max_workers <= 1 or len(tiles) <= 1:
+        return {
+            tile.pk: synchronously_update_cache(cast(Insight, tile.insight), dashboard, refresh_frequency)
+            for tile, refresh_frequency in tiles
+        }
+
+    query_tags = get_query_tags()
+
+    def update_tile_cache(tile: DashboardTile, refresh_frequency: timedelta) -> InsightResult:
+        tag_queries(**query_tags)
+        try:
+            with concurrent_query_worker():
+                return synchronously_update_cache(cast(Insight, tile.insight), dashboard, refresh_frequency)
+        finally:
+            # Threads of the pool open their own database connections
+            connections.close_all()
+
+    results: Dict[int, InsightResult] = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dashboard-refresh") as executor:
+        futures = {
+            executor.submit(update_tile_cache, tile, refresh_frequency): tile for tile, refresh_frequency in tiles
+        }
+        for future in as_completed(futures):
+            results[futures[future].pk] = future.result()
+    return results
+
+
+def _max_tile_refresh_workers(team_id: int) -> int:
+    return team_connections_limit(team_id, get_instance_setting("PARALLEL_DASHBOARD_ITEM_CACHE"))
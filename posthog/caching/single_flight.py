@@ -0,0 +1,105 @@
+"""
+Coalesce concurrent calculations of the same result across processes.
+
+When a popular result expires, every request for it would otherwise recalculate it at the same time. With
+`single_flight`, one process calculates the result under a redis lock, and the others wait for it to announce
+that it's done, then read the result it stored, e.g. from the cache.
+"""
+from typing import Callable, Optional, TypeVar
+
+import structlog
+from prometheus_client import Counter
+from redis.exceptions import LockError, RedisError
+
+from posthog.redis import get_client
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+# How long a calculation can hold the lock, in case the process calculating it dies
+SINGLE_FLIGHT_LOCK_TIMEOUT = 3 * 60
+# How long to wait for another process before calculating the result ourselves
+SINGLE_FLIGHT_WAIT_TIMEOUT = 60
+# How often waiting processes check for the result, in case they missed the announcement
+SINGLE_FLIGHT_POLL_INTERVAL = 1.0
+
+SINGLE_FLIGHT_WAIT_COUNTER = Counter(
+    "posthog_single_flight_wait_total",
+    "Calculations that waited for the same calculation in another process, and whether they got its result.",
+    labelnames=["name", "outcome"],
+)
+
+
+def _lock_key(key: str) -> str:
+    return f"single_flight_lock:{key}"
+
+
+def _channel(key: str) -> str:
+    return f"single_flight_done:{key}"
+
+
+def single_flight(
+    name: str,
+    key: str,
+    calculate: Callable[[], T],
+    get_result: Callable[[], Optional[T]],
+    wait_timeout: Optional[float] = None,
+) -> T:
+    """
+    Calculate a result once for all processes asking for `key` at the same time.
+
+    `calculate` must store its result where `get_result` can read it. `get_result` returns None until a result
+    newer than the one the caller already had is available. Callers that wait for longer than `wait_timeout`,
+    or find no result after the calculation finished (e.g. because it failed), calculate the result themselves.
+    """
+    if wait_timeout is None:
+        wait_timeout = SINGLE_FLIGHT_WAIT_TIMEOUT
+    try:
+        redis = get_client()
+        lock = redis.lock(_lock_key(key), timeout=SINGLE_FLIGHT_LOCK_TIMEOUT)
+        acquired = lock.acquire(blocking=False)
+    except RedisError:
+        logger.exception("single_flight_lock_failed", name=name)
+        return calculate()
+
+    if acquired:
+        try:
+            return calculate()
+        finally:
+            try:
+                lock.release()
+                redis.publish(_channel(key), "done")
+            except (LockError, RedisError):
+                logger.exception("single_flight_release_failed", name=name)
+
+    result = _wait_for_result(redis, key, get_result, wait_timeout)
+    if result is not None:
+        SINGLE_FLIGHT_WAIT_COUNTER.labels(name=name, outcome="coalesced").inc()
+        return result
+
+    SINGLE_FLIGHT_WAIT_COUNTER.labels(name=name, outcome="timeout").inc()
+    return calculate()
+
+
+def _wait_for_result(redis, key: str, get_result: Callable[[], Optional[T]], wait_timeout: float) -> Optional[T]:
+    pubsub = redis.pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(_channel(key))
+        # The calculation might have finished before we subscribed
+        result = get_result()
+        waited = 0.0
+        while result is None and waited < wait_timeout:
+            poll_interval = min(SINGLE_FLIGHT_POLL_INTERVAL, wait_timeout - waited)
+            message = pubsub.get_message(timeout=poll_interval)
+            waited += poll_interval
+            result = get_result()
+            if message is not None:
+                # The calculation is done. If there's still no result, it failed.
+                break
+        return result
+    except RedisError:
+        logger.exception("single_flight_wait_failed")
+        return get_result()
+    finally:
+        pubsub.close()
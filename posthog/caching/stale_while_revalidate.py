@@ -0,0 +1,51 @@
+"""
+Serve stale cached results right away, and refresh them in the background.
+
+Refreshing a stale result on the request thread makes the request as slow as the query. Instead, callers return
+the stale result, marked as such, and queue a refresh with `queue_background_refresh`. Refreshes are deduplicated
+per cache key, so a popular stale result is only recalculated once.
+"""
+from typing import Callable
+
+import structlog
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+
+from posthog.redis import get_client
+
+logger = structlog.get_logger(__name__)
+
+# How long a queued refresh blocks other refreshes of the same result, in case the refresh never runs
+BACKGROUND_REFRESH_DEDUPLICATION_TTL = 10 * 60
+
+STALE_RESULT_SERVED_COUNTER = Counter(
+    "posthog_stale_result_served_total",
+    "Stale cached results served while refreshing them in the background, and whether this queued the refresh.",
+    labelnames=["kind", "refresh_queued"],
+)
+
+
+def _queued_key(cache_key: str) -> str:
+    return f"background_refresh_queued:{cache_key}"
+
+
+def queue_background_refresh(kind: str, cache_key: str, queue_refresh: Callable[[], None]) -> bool:
+    """Call `queue_refresh` unless a refresh of the same result is already queued. Returns whether it was called."""
+    try:
+        queued = bool(get_client().set(_queued_key(cache_key), 1, nx=True, ex=BACKGROUND_REFRESH_DEDUPLICATION_TTL))
+    except RedisError:
+        logger.exception("background_refresh_deduplication_failed", kind=kind)
+        queued = False
+
+    if queued:
+        queue_refresh()
+    STALE_RESULT_SERVED_COUNTER.labels(kind=kind, refresh_queued=queued).inc()
+    return queued
+
+
+def finish_background_refresh(cache_key: str) -> None:
+    """Allow queueing refreshes of this result again. Call this once the queued refresh ran, or failed."""
+    try:
+        get_client().delete(_queued_key(cache_key))
+    except RedisError:
+        logger.exception("background_refresh_deduplication_failed")
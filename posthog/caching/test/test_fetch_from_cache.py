@@ -1,5 +1,8 @@
+import threading
 from datetime import timedelta
+from unittest.mock import patch
 
+from django.test import override_settings
 from django.utils.timezone import now
 from freezegun import freeze_time
 
@@ -7,7 +10,9 @@ from posthog.caching.fetch_from_cache import (
     InsightResult,
     NothingInCacheResult,
     fetch_cached_insight_result,
+    prefetch_cached_insight_results,
     synchronously_update_cache,
+    synchronously_update_tiles_cache,
 )
 from posthog.decorators import CacheType
 from posthog.models import Insight
@@ -85,6 +90,23 @@ class TestFetchFromCache(ClickhouseTestMixin, BaseTest):
             next_allowed_client_refresh=cached_result.next_allowed_client_refresh,
         )
 
+    @override_settings(STALE_WHILE_REVALIDATE_ENABLED=True)
+    @patch("posthog.caching.fetch_from_cache.queue_background_refresh")
+    def test_fetch_stale_insight_result_up_to_max_staleness(self, queue_background_refresh):
+        synchronously_update_cache(self.insight, self.dashboard, timedelta(minutes=3))
+
+        with freeze_time("2012-01-14T03:31:34.000Z"):
+            stale_result = fetch_cached_insight_result(self.dashboard_tile, timedelta(minutes=3))
+        assert stale_result.is_stale
+        queue_background_refresh.assert_called_once()
+
+        queue_background_refresh.reset_mock()
+        with freeze_time("2012-01-14T05:21:34.000Z"):
+            too_stale_result = fetch_cached_insight_result(self.dashboard_tile, timedelta(minutes=3))
+        assert not too_stale_result.is_stale
+        assert too_stale_result.result == stale_result.result
+        queue_background_refresh.assert_not_called()
+
     def test_fetch_nothing_yet_cached(self):
         from_cache_result = fetch_cached_insight_result(self.dashboard_tile, timedelta(minutes=3))
 
@@ -101,3 +123,57 @@ class TestFetchFromCache(ClickhouseTestMixin, BaseTest):
         assert isinstance(from_cache_result, NothingInCacheResult)
         assert from_cache_result.result is None
         assert from_cache_result.cache_key is None
+
+    def test_fetch_prefetched_insight_results(self):
+        other_insight, _, _ = _create_insight(self.team, {"events": [{"id": "$pageview"}], "properties": []}, {})
+        other_tile = self.dashboard.tiles.create(insight=other_insight)
+        cached_result = synchronously_update_cache(self.insight, self.dashboard, timedelta(minutes=3))
+
+        prefetched = prefetch_cached_insight_results([self.dashboard_tile, other_tile])
+
+        with patch("posthog.caching.fetch_from_cache.get_safe_cache") as get_safe_cache:
+            from_cache_result = fetch_cached_insight_result(
+                self.dashboard_tile, timedelta(minutes=3), prefetched[self.dashboard_tile.pk]
+            )
+            nothing_cached_result = fetch_cached_insight_result(
+                other_tile, timedelta(minutes=3), prefetched[other_tile.pk]
+            )
+
+        get_safe_cache.assert_not_called()
+        assert from_cache_result.result == cached_result.result
+        assert from_cache_result.cache_key == cached_result.cache_key
+        assert from_cache_result.is_cached
+        assert isinstance(nothing_cached_result, NothingInCacheResult)
+        assert nothing_cached_result.cache_key is not None
+
+    def test_synchronously_update_tiles_cache(self):
+        other_insight, _, _ = _create_insight(self.team, {"events": [{"id": "$pageview"}], "properties": []}, {})
+        other_tile = self.dashboard.tiles.create(insight=other_insight)
+
+        results = synchronously_update_tiles_cache(
+            self.dashboard, [(self.dashboard_tile, timedelta(minutes=3)), (other_tile, timedelta(minutes=3))]
+        )
+
+        assert set(results.keys()) == {self.dashboard_tile.pk, other_tile.pk}
+        assert results[self.dashboard_tile.pk].cache_key == self.dashboard_tile.caching_state.cache_key
+        assert results[other_tile.pk].cache_key == other_tile.caching_state.cache_key
+        assert not results[other_tile.pk].is_cached
+
+    @override_settings(DASHBOARD_PARALLEL_REFRESH_ENABLED=True)
+    def test_synchronously_update_tiles_cache_in_parallel(self):
+        other_insight, _, _ = _create_insight(self.team, {"events": [{"id": "$pageview"}], "properties": []}, {})
+        other_tile = self.dashboard.tiles.create(insight=other_insight)
+        # Both tiles have to be calculated at the same time to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def update_cache(insight, dashboard, refresh_frequency):
+            barrier.wait()
+            return NothingInCacheResult(cache_key=f"cache_{insight.pk}")
+
+        with patch("posthog.caching.fetch_from_cache.synchronously_update_cache", side_effect=update_cache):
+            results = synchronously_update_tiles_cache(
+                self.dashboard, [(self.dashboard_tile, timedelta(minutes=3)), (other_tile, timedelta(minutes=3))]
+            )
+
+        assert results[self.dashboard_tile.pk].cache_key == f"cache_{self.insight.pk}"
+        assert results[other_tile.pk].cache_key == f"cache_{other_insight.pk}"
@@ -1,7 +1,7 @@
 import os
 import time
 from random import randrange
-from typing import Optional
+from typing import Any, Dict, Optional
 from uuid import UUID
 
 from celery import Celery
@@ -800,6 +800,20 @@ def update_cache_task(caching_state_id: UUID):
     update_cache(caching_state_id)
 
 
+@app.task(ignore_result=True)
+def refresh_query_cache_task(team_id: int, query: Dict[str, Any]):
+    from posthog.hogql_queries.query_runner import refresh_query_cache
+
+    refresh_query_cache(team_id, query)
+
+
+@app.task(ignore_result=True)
+def refresh_insight_cache_task(insight_id: int, dashboard_id: Optional[int], cache_key: str):
+    from posthog.caching.fetch_from_cache import refresh_insight_cache
+
+    refresh_insight_cache(insight_id, dashboard_id, cache_key)
+
+
 @app.task(ignore_result=True)
 def sync_insight_caching_state(team_id: int, insight_id: Optional[int] = None, dashboard_tile_id: Optional[int] = None):
     from posthog.caching.insight_caching_state import sync_insight_caching_state
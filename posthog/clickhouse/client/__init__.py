@@ -1,8 +1,10 @@
-from posthog.clickhouse.client.execute import query_with_columns, sync_execute
+from posthog.clickhouse.client.execute import query_with_columns, stream_execute, stream_execute_arrow, sync_execute
 from posthog.clickhouse.client.execute_async import execute_with_progress
 
 __all__ = [
     "sync_execute",
     "query_with_columns",
+    "stream_execute",
+    "stream_execute_arrow",
     "execute_with_progress",
 ]
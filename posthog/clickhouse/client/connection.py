@@ -1,6 +1,8 @@
+import threading
 from contextlib import contextmanager
 from enum import Enum
 from functools import lru_cache
+from typing import Tuple
 
 from clickhouse_driver import Client as SyncClient
 from clickhouse_pool import ChPool
@@ -40,6 +42,56 @@ def get_pool(workload: Workload, team_id=None, readonly=False):
     return make_ch_pool()
 
 
+def get_http_connection(workload: Workload, team_id=None, readonly=False) -> Tuple[str, str, str]:
+    """
+    Like `get_pool`, but for ClickHouse's HTTP interface. Returns its URL, and the user and password to connect with.
+    """
+    url = settings.CLICKHOUSE_HTTP_URL
+    user, password = settings.CLICKHOUSE_USER, settings.CLICKHOUSE_PASSWORD
+
+    if team_id is not None and str(team_id) in settings.CLICKHOUSE_PER_TEAM_SETTINGS:
+        team_settings = settings.CLICKHOUSE_PER_TEAM_SETTINGS[str(team_id)]
+        if "host" in team_settings:
+            protocol, port = ("https", 8443) if settings.CLICKHOUSE_SECURE else ("http", 8123)
+            url = f"{protocol}://{team_settings['host']}:{port}/"
+        return url, team_settings.get("user", user), team_settings.get("password", password)
+
+    if readonly and settings.READONLY_CLICKHOUSE_USER is not None and settings.READONLY_CLICKHOUSE_PASSWORD:
+        return url, settings.READONLY_CLICKHOUSE_USER, settings.READONLY_CLICKHOUSE_PASSWORD
+
+    if workload == Workload.OFFLINE or workload == Workload.DEFAULT and _default_workload == Workload.OFFLINE:
+        url = settings.CLICKHOUSE_OFFLINE_HTTP_URL
+
+    return url, user, password
+
+
+_concurrent_query_worker = threading.local()
+
+
+@contextmanager
+def concurrent_query_worker():
+    """Marks the current thread as a worker of a pool running queries concurrently, e.g. the tiles of a dashboard."""
+    _concurrent_query_worker.active = True
+    try:
+        yield
+    finally:
+        _concurrent_query_worker.active = False
+
+
+def team_connections_limit(team_id: int, max_connections: int) -> int:
+    """
+    Caps `max_connections` for teams with their own ClickHouse settings, which can't run more queries at a time than
+    their connection pool allows. Workers of a concurrent pool already take one of those connections each, so they
+    run their own queries one at a time.
+    """
+    if getattr(_concurrent_query_worker, "active", False):
+        return 1
+    team_connections_max = settings.CLICKHOUSE_PER_TEAM_SETTINGS.get(str(team_id), {}).get("connections_max")
+    if team_connections_max is not None:
+        return min(max_connections, int(team_connections_max))
+    return max_connections
+
+
 def default_client():
     """
     Return a bare bones client for use in places where we are only interested in general ClickHouse state
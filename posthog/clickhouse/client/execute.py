@@ -1,29 +1,42 @@
 import json
 import threading
 import types
+from collections import namedtuple
 from contextlib import contextmanager
 from functools import lru_cache
+from itertools import islice
 from time import perf_counter
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+import requests
 import sqlparse
 from clickhouse_driver import Client as SyncClient
+from clickhouse_driver.errors import ServerException
 from django.conf import settings as app_settings
 from statshog.defaults.django import statsd
 
-from posthog.clickhouse.client.connection import Workload, get_pool
+from posthog.clickhouse.client.connection import Workload, get_http_connection, get_pool
 from posthog.clickhouse.client.escape import substitute_params
 from posthog.clickhouse.query_tagging import get_query_tag_value, get_query_tags
 from posthog.errors import wrap_query_error
 from posthog.settings import TEST
 from posthog.utils import generate_short_id, patchable
 
+if TYPE_CHECKING:
+    import pyarrow
+
 InsertParams = Union[list, tuple, types.GeneratorType]
 NonInsertParams = Dict[str, Any]
 QueryArgs = Optional[Union[InsertParams, NonInsertParams]]
 
 thread_local_storage = threading.local()
 
+# Rows handed out at a time by `stream_execute`
+STREAM_EXECUTE_BLOCK_SIZE = 10_000
+
+# What starts a comment, according to sqlparse
+SQL_COMMENT_MARKERS = ("--", "/*", "# ")
+
 # As of CH 22.8 - more algorithms have been added on newer versions
 CLICKHOUSE_SUPPORTED_JOIN_ALGORITHMS = [
     "default",
@@ -77,21 +90,14 @@ def sync_execute(
     readonly=False,
 ):
     if TEST and flush:
-        try:
-            from posthog.test.base import flush_persons_and_events
-
-            flush_persons_and_events()
-        except ModuleNotFoundError:  # when we run plugin server tests it tries to run above, ignore
-            pass
+        _flush_persons_and_events()
 
     with get_pool(workload, team_id, readonly).get_client() as client:
         start_time = perf_counter()
 
         prepared_sql, prepared_args, tags = _prepare_query(client=client, query=query, args=args, workload=workload)
         query_id = validated_client_query_id()
-        core_settings = {**default_settings(), **(settings or {})}
-        tags["query_settings"] = core_settings
-        settings = {**core_settings, "log_comment": json.dumps(tags, separators=(",", ":"))}
+        settings = _query_settings(settings, tags)
         try:
             result = client.execute(
                 prepared_sql,
@@ -106,16 +112,185 @@ def sync_execute(
 
             raise err
         finally:
-            execution_time = perf_counter() - start_time
+            _record_execution_time("clickhouse_sync_execution_time", perf_counter() - start_time)
+    return result
 
-            statsd.timing("clickhouse_sync_execution_time", execution_time * 1000.0)
 
-            if query_counter := getattr(thread_local_storage, "query_counter", None):
-                query_counter.total_query_time += execution_time
+class StreamedQueryResult:
+    """
+    Rows of a query, read from ClickHouse as they arrive. Iterating over it yields blocks of up to `block_size` rows.
+    """
+
+    def __init__(self, columns: List[Tuple[str, str]], rows: Iterator[tuple], block_size: int, named_rows: bool):
+        # Names and types of the columns
+        self.columns = columns
+        self.block_size = block_size
+        self.finished = False
+        self._rows: Iterator = rows
+        if named_rows:
+            row_type = namedtuple("Row", [name for name, _type in columns], rename=True)  # type: ignore
+            self._rows = map(row_type._make, rows)
+
+    def __iter__(self) -> Iterator[List]:
+        while block := list(islice(self._rows, self.block_size)):
+            yield block
+        self.finished = True
+
+
+@contextmanager
+def stream_execute(
+    query,
+    args=None,
+    settings=None,
+    flush=True,
+    *,
+    block_size: Optional[int] = None,
+    named_rows=False,
+    workload: Workload = Workload.DEFAULT,
+    team_id: Optional[int] = None,
+    readonly=False,
+) -> Iterator[StreamedQueryResult]:
+    """
+    Like `sync_execute`, but reads rows lazily, so that memory use is bounded by the block size rather than the
+    number of rows. With `named_rows`, rows are named tuples with the column names as fields.
+
+        with stream_execute(query, args, team_id=team.pk) as result:
+            for block in result:
+                ...
+
+    The connection is held until the context exits. Leaving early drops the rest of the result.
+    """
+    if block_size is None:
+        block_size = STREAM_EXECUTE_BLOCK_SIZE
+    if TEST and flush:
+        _flush_persons_and_events()
+
+    with get_pool(workload, team_id, readonly).get_client() as client:
+        start_time = perf_counter()
+
+        prepared_sql, prepared_args, tags = _prepare_query(client=client, query=query, args=args, workload=workload)
+        query_id = validated_client_query_id()
+        settings = _query_settings(settings, tags)
+        result: Optional[StreamedQueryResult] = None
+        try:
+            rows = _wrap_stream_errors(
+                client.execute_iter(
+                    prepared_sql,
+                    params=prepared_args,
+                    settings=settings,
+                    with_column_types=True,
+                    query_id=query_id,
+                )
+            )
+            # The column types come first, before any rows
+            columns = next(rows, [])
+            result = StreamedQueryResult(columns, rows, block_size, named_rows)
+            yield result
+        finally:
+            if result is None or not result.finished:
+                # :TRICKY: The rest of the result would be read by the next query on this connection
+                client.disconnect()
+            _record_execution_time("clickhouse_stream_execution_time", perf_counter() - start_time)
 
-            if app_settings.SHELL_PLUS_PRINT_SQL:
-                print("Execution time: %.6fs" % (execution_time,))  # noqa T201
-    return result
+
+@contextmanager
+def stream_execute_arrow(
+    query,
+    args=None,
+    settings=None,
+    flush=True,
+    *,
+    workload: Workload = Workload.DEFAULT,
+    team_id: Optional[int] = None,
+    readonly=False,
+) -> Iterator["pyarrow.RecordBatchReader"]:
+    """
+    Like `stream_execute`, but reads the result over ClickHouse's HTTP interface in the ArrowStream format. The
+    record batches hold the columns as ClickHouse sent them, without converting any values into Python objects.
+
+        with stream_execute_arrow(query, args, team_id=team.pk) as reader:
+            for batch in reader:
+                ...
+    """
+    import pyarrow as pa
+
+    if TEST and flush:
+        _flush_persons_and_events()
+
+    url, user, password = get_http_connection(workload, team_id, readonly)
+    prepared_sql, _, tags = _prepare_query(client=None, query=query, args=args, workload=workload)
+    params = {"database": app_settings.CLICKHOUSE_DATABASE, "query_id": validated_client_query_id()}
+    # Strings would otherwise be sent as binary columns
+    settings = {"output_format_arrow_string_as_string": 1, **(settings or {})}
+    for key, value in _query_settings(settings, tags).items():
+        params[key] = int(value) if isinstance(value, bool) else value
+
+    start_time = perf_counter()
+    try:
+        with requests.post(
+            url,
+            params=params,
+            headers={"X-ClickHouse-User": user, "X-ClickHouse-Key": password},
+            data=f"{prepared_sql} FORMAT ArrowStream".encode("utf-8"),
+            stream=True,
+            verify=app_settings.CLICKHOUSE_CA or app_settings.CLICKHOUSE_VERIFY,
+        ) as response:
+            with _wrap_arrow_errors():
+                if response.status_code != 200:
+                    code = response.headers.get("X-ClickHouse-Exception-Code")
+                    raise ServerException(response.text, code=int(code) if code else None)
+                reader = pa.ipc.open_stream(pa.PythonFile(response.raw, mode="r"))
+            with reader:
+                # Errors while reading the batches are wrapped and counted too, like those of the response
+                yield pa.RecordBatchReader.from_batches(reader.schema, _wrap_stream_errors(reader))
+    finally:
+        _record_execution_time("clickhouse_stream_execution_time", perf_counter() - start_time)
+
+
+@contextmanager
+def _wrap_arrow_errors():
+    try:
+        yield
+    except Exception as err:
+        err = wrap_query_error(err)
+        statsd.incr("clickhouse_stream_execution_failure", tags={"failed": True, "reason": type(err).__name__})
+
+        raise err
+
+
+def _wrap_stream_errors(rows: Iterable) -> Iterator:
+    try:
+        yield from rows
+    except Exception as err:
+        err = wrap_query_error(err)
+        statsd.incr("clickhouse_stream_execution_failure", tags={"failed": True, "reason": type(err).__name__})
+
+        raise err
+
+
+def _flush_persons_and_events():
+    try:
+        from posthog.test.base import flush_persons_and_events
+
+        flush_persons_and_events()
+    except ModuleNotFoundError:  # when we run plugin server tests it tries to run above, ignore
+        pass
+
+
+def _query_settings(settings: Optional[Dict], tags: Dict) -> Dict:
+    core_settings = {**default_settings(), **(settings or {})}
+    tags["query_settings"] = core_settings
+    return {**core_settings, "log_comment": json.dumps(tags, separators=(",", ":"))}
+
+
+def _record_execution_time(metric: str, execution_time: float):
+    statsd.timing(metric, execution_time * 1000.0)
+
+    if query_counter := getattr(thread_local_storage, "query_counter", None):
+        query_counter.total_query_time += execution_time
+
+    if app_settings.SHELL_PLUS_PRINT_SQL:
+        print("Execution time: %.6fs" % (execution_time,))  # noqa T201
 
 
 def query_with_columns(
@@ -147,7 +322,7 @@ def query_with_columns(
 
 
 @patchable
-def _prepare_query(client: SyncClient, query: str, args: QueryArgs, workload: Workload = Workload.DEFAULT):
+def _prepare_query(client: Optional[SyncClient], query: str, args: QueryArgs, workload: Workload = Workload.DEFAULT):
     """
     Given a string query with placeholders we do one of two things:
 
@@ -187,7 +362,7 @@ def _prepare_query(client: SyncClient, query: str, args: QueryArgs, workload: Wo
         rendered_sql = substitute_params(query, args)
         prepared_args = None
 
-    formatted_sql = sqlparse.format(rendered_sql, strip_comments=True)
+    formatted_sql = strip_comments(rendered_sql)
     annotated_sql, tags = _annotate_tagged_query(formatted_sql, workload)
 
     if app_settings.SHELL_PLUS_PRINT_SQL:
@@ -197,6 +372,20 @@ def _prepare_query(client: SyncClient, query: str, args: QueryArgs, workload: Wo
     return annotated_sql, prepared_args, tags
 
 
+def strip_comments(sql: str) -> str:
+    """
+    Removes comments from a query.
+
+    Parsing with sqlparse is slow for large queries, like those of funnels or printed by HogQL. Most queries have no
+    comments at all, and are returned as is. Queries with comments go through `sqlparse.format(sql,
+    strip_comments=True)`, which also removes trailing whitespace from lines and turns CRLF line breaks into LF.
+    Either way, ClickHouse runs the same query.
+    """
+    if not any(marker in sql for marker in SQL_COMMENT_MARKERS):
+        return sql
+    return sqlparse.format(sql, strip_comments=True)
+
+
 def _annotate_tagged_query(query, workload):
     """
     Adds in a /* */ so we can look in clickhouses `system.query_log`
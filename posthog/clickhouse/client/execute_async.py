@@ -1,32 +1,27 @@
 import hashlib
 import json
 import time
+import zlib
 from dataclasses import asdict as dataclass_asdict
 from dataclasses import dataclass
 from time import perf_counter
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 from posthog import celery
-from clickhouse_driver import Client as SyncClient
 from django.conf import settings as app_settings
 from statshog.defaults.django import statsd
 
 from posthog import redis
 from posthog.celery import enqueue_clickhouse_execute_with_progress
-from posthog.clickhouse.client.execute import _prepare_query
+from posthog.clickhouse.client.connection import Workload, get_pool
+from posthog.clickhouse.client.execute import _prepare_query, _query_settings
 from posthog.errors import wrap_query_error
-from posthog.settings import (
-    CLICKHOUSE_CA,
-    CLICKHOUSE_DATABASE,
-    CLICKHOUSE_HOST,
-    CLICKHOUSE_PASSWORD,
-    CLICKHOUSE_SECURE,
-    CLICKHOUSE_USER,
-    CLICKHOUSE_VERIFY,
-)
 
 REDIS_STATUS_TTL = 600  # 10 minutes
 
+# Results are stored in compressed chunks of this many rows, so they can be read a page at a time
+RESULTS_CHUNK_SIZE = 1000
+
 
 @dataclass
 class QueryStatus:
@@ -40,6 +35,12 @@ class QueryStatus:
     start_time: Optional[float] = None
     end_time: Optional[float] = None
     task_id: Optional[str] = None
+    # Results are stored separately from the status, see `get_status_or_results`
+    result_rows: int = 0
+    result_chunks: int = 0
+    result_chunk_size: int = RESULTS_CHUNK_SIZE
+    # Only set if the query was executed `with_column_types`
+    columns: Optional[List] = None
 
 
 def generate_redis_results_key(query_id):
@@ -48,100 +49,122 @@ def generate_redis_results_key(query_id):
     return key
 
 
+def generate_redis_results_chunk_key(query_id, chunk_index: int):
+    return f"{generate_redis_results_key(query_id)}:results:{chunk_index}"
+
+
+class _ResultsWriter:
+    """Writes result rows to redis in compressed chunks, as they arrive."""
+
+    def __init__(self, redis_client, query_id):
+        self.redis_client = redis_client
+        self.query_id = query_id
+        self.rows = 0
+        self.chunks = 0
+        self._pending: List = []
+
+    def add(self, rows: List):
+        self._pending.extend(rows)
+        while len(self._pending) >= RESULTS_CHUNK_SIZE:
+            self._write(self._pending[:RESULTS_CHUNK_SIZE])
+            del self._pending[:RESULTS_CHUNK_SIZE]
+
+    def flush(self):
+        if self._pending:
+            self._write(self._pending)
+            self._pending = []
+
+    def _write(self, rows: List):
+        self.redis_client.set(
+            generate_redis_results_chunk_key(self.query_id, self.chunks),
+            zlib.compress(json.dumps(rows).encode("utf-8")),
+            ex=REDIS_STATUS_TTL,
+        )
+        self.rows += len(rows)
+        self.chunks += 1
+
+    def refresh_ttl(self):
+        """Keeps the chunks, written while the query ran, for as long as the final status."""
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for chunk in range(self.chunks):
+            pipeline.expire(generate_redis_results_chunk_key(self.query_id, chunk), REDIS_STATUS_TTL)
+        pipeline.execute()
+
+
 def execute_with_progress(
     team_id, query_id, query, args=None, settings=None, with_column_types=False, update_freq=0.2, task_id=None
 ):
     """
     Kick off query with progress reporting
-    Iterate over the progress status
-    Save status to redis
-    Once complete save results to redis
+    Iterate over the progress status, saving it to redis at most every `update_freq` seconds
+    Save results to redis in chunks as they arrive
+    Once complete save the final status to redis
     """
 
     key = generate_redis_results_key(query_id)
-    ch_client = SyncClient(
-        host=CLICKHOUSE_HOST,
-        database=CLICKHOUSE_DATABASE,
-        secure=CLICKHOUSE_SECURE,
-        user=CLICKHOUSE_USER,
-        password=CLICKHOUSE_PASSWORD,
-        ca_certs=CLICKHOUSE_CA,
-        verify=CLICKHOUSE_VERIFY,
-        settings={"max_result_rows": "10000"},
-    )
     redis_client = redis.get_client()
+    results_writer = _ResultsWriter(redis_client, query_id)
 
     start_time = perf_counter()
 
-    prepared_sql, prepared_args, tags = _prepare_query(client=ch_client, query=query, args=args)
+    query_status = QueryStatus(team_id, task_id=task_id, result_chunk_size=RESULTS_CHUNK_SIZE)
 
-    query_status = QueryStatus(team_id, task_id=task_id)
+    with get_pool(Workload.DEFAULT, team_id).get_client() as ch_client:
+        prepared_sql, prepared_args, tags = _prepare_query(client=ch_client, query=query, args=args)
+        query_settings = _query_settings({"max_result_rows": "10000", **(settings or {})}, tags)
 
-    start_time = time.time()
+        query_status.start_time = time.time()
+        last_update = 0.0
 
-    try:
-        progress = ch_client.execute_with_progress(
-            prepared_sql, params=prepared_args, settings=settings, with_column_types=with_column_types
-        )
-        for num_rows, total_rows in progress:
-            query_status = QueryStatus(
-                team_id=team_id,
-                num_rows=num_rows,
-                total_rows=total_rows,
-                complete=False,
-                error=False,
-                error_message="",
-                results=None,
-                start_time=start_time,
-                task_id=task_id,
-            )
-            redis_client.set(key, json.dumps(dataclass_asdict(query_status)), ex=REDIS_STATUS_TTL)
-            time.sleep(update_freq)
-        else:
-            rv = progress.get_result()
-            query_status = QueryStatus(
-                team_id=team_id,
-                num_rows=query_status.num_rows,
-                total_rows=query_status.total_rows,
-                complete=True,
-                error=False,
-                start_time=query_status.start_time,
-                end_time=time.time(),
-                error_message="",
-                results=rv,
-                task_id=task_id,
+        try:
+            progress = ch_client.execute_with_progress(
+                prepared_sql, params=prepared_args, settings=query_settings, with_column_types=with_column_types
             )
-            redis_client.set(key, json.dumps(dataclass_asdict(query_status)), ex=REDIS_STATUS_TTL)
+            for num_rows, total_rows in progress:
+                query_status.num_rows = num_rows
+                query_status.total_rows = total_rows
+                # Rows received so far are stored right away, rather than kept in memory until the query finishes
+                results_writer.add(progress.data)
+                progress.data.clear()
 
-    except Exception as err:
-        err = wrap_query_error(err)
-        tags["failed"] = True
-        tags["reason"] = type(err).__name__
-        statsd.incr("clickhouse_sync_execution_failure")
-        query_status = QueryStatus(
-            team_id=team_id,
-            num_rows=query_status.num_rows,
-            total_rows=query_status.total_rows,
-            complete=False,
-            error=True,
-            start_time=query_status.start_time,
-            end_time=time.time(),
-            error_message=str(err),
-            results=None,
-            task_id=task_id,
-        )
-        redis_client.set(key, json.dumps(dataclass_asdict(query_status)), ex=REDIS_STATUS_TTL)
+                if time.time() - last_update >= update_freq:
+                    last_update = time.time()
+                    query_status.result_rows = results_writer.rows
+                    query_status.result_chunks = results_writer.chunks
+                    redis_client.set(key, json.dumps(dataclass_asdict(query_status)), ex=REDIS_STATUS_TTL)
+            else:
+                rv = progress.get_result()
+                results_writer.add(rv[0] if with_column_types else rv)
+                results_writer.flush()
 
-        raise err
-    finally:
-        ch_client.disconnect()
+                query_status.complete = True
+                query_status.end_time = time.time()
+                query_status.result_rows = results_writer.rows
+                query_status.result_chunks = results_writer.chunks
+                query_status.columns = rv[1] if with_column_types else None
+                redis_client.set(key, json.dumps(dataclass_asdict(query_status)), ex=REDIS_STATUS_TTL)
+                # After the status, so that the chunks don't expire before it
+                results_writer.refresh_ttl()
 
-        execution_time = perf_counter() - start_time
+        except Exception as err:
+            err = wrap_query_error(err)
+            tags["failed"] = True
+            tags["reason"] = type(err).__name__
+            statsd.incr("clickhouse_sync_execution_failure")
+            query_status.complete = False
+            query_status.error = True
+            query_status.end_time = time.time()
+            query_status.error_message = str(err)
+            redis_client.set(key, json.dumps(dataclass_asdict(query_status)), ex=REDIS_STATUS_TTL)
 
-        statsd.timing("clickhouse_sync_execution_time", execution_time * 1000.0)
+            raise err
+        finally:
+            execution_time = perf_counter() - start_time
 
-        if app_settings.SHELL_PLUS_PRINT_SQL:
-            print("Execution time: %.6fs" % (execution_time,))  # noqa T201
+            statsd.timing("clickhouse_sync_execution_time", execution_time * 1000.0)
+
+            if app_settings.SHELL_PLUS_PRINT_SQL:
+                print("Execution time: %.6fs" % (execution_time,))  # noqa T201
 
 
 def enqueue_execute_with_progress(
@@ -183,12 +206,12 @@ def enqueue_execute_with_progress(
     return query_id
 
 
-def get_status_or_results(team_id, query_id):
+def get_status_or_results(team_id, query_id, offset: int = 0, limit: Optional[int] = None):
     """
     Returns QueryStatus data class
     QueryStatus data class contains either:
     Current status of running query
-    Results of completed query
+    Results of completed query, from `offset` and up to `limit` rows
     Error payload of failed query
     """
     redis_client = redis.get_client()
@@ -202,11 +225,32 @@ def get_status_or_results(team_id, query_id):
         query_status = QueryStatus(**json.loads(str_results))
         if query_status.team_id != team_id:
             raise Exception("Requesting team is not executing team")
+        if query_status.complete:
+            rows = _get_result_rows(redis_client, query_id, query_status, offset, limit)
+            query_status.results = [rows, query_status.columns] if query_status.columns is not None else rows
     except Exception as e:
         query_status = QueryStatus(team_id, error=True, error_message=str(e))
     return query_status
 
 
+def _get_result_rows(redis_client, query_id, query_status: QueryStatus, offset: int, limit: Optional[int]) -> List:
+    """Reads only the chunks holding the requested rows."""
+    end = query_status.result_rows if limit is None else min(offset + limit, query_status.result_rows)
+    if offset >= end:
+        return []
+
+    chunk_size = query_status.result_chunk_size
+    first_chunk, last_chunk = offset // chunk_size, (end - 1) // chunk_size
+    chunks = redis_client.mget(
+        [generate_redis_results_chunk_key(query_id, index) for index in range(first_chunk, last_chunk + 1)]
+    )
+    if any(chunk is None for chunk in chunks):
+        raise Exception("Query results have expired")
+
+    rows = [row for chunk in chunks for row in json.loads(zlib.decompress(chunk))]
+    return rows[offset - first_chunk * chunk_size : end - first_chunk * chunk_size]
+
+
 def _query_hash(query: str, team_id: int, args: Any) -> str:
     """
     Takes a query and returns a hex encoded hash of the query and args
@@ -0,0 +1,98 @@
+import pytest
+import sqlparse
+
+from posthog.clickhouse.client.execute import stream_execute, stream_execute_arrow, strip_comments, sync_execute
+from posthog.errors import InternalCHQueryError
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT 1 -- a comment\nFROM events",
+        "SELECT /* a comment */ 1",
+        "SELECT 1\n# a comment\n",
+        "SELECT '-- not a comment' FROM events",
+        "SELECT 1 -- a comment  \r\nFROM events",
+    ],
+)
+def test_strip_comments_matches_sqlparse_for_queries_with_comments(sql):
+    assert strip_comments(sql) == sqlparse.format(sql, strip_comments=True)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT 1",
+        "SELECT event, count() FROM events WHERE team_id = 2 GROUP BY event\nORDER BY count() DESC",
+        "SELECT 1 - -1, 2 / 3 * 4",
+        # sqlparse would also remove the trailing whitespace and normalize line breaks, which ClickHouse ignores
+        "SELECT 1  \n\n",
+        "SELECT 1\r\nFROM events",
+    ],
+)
+def test_strip_comments_returns_queries_without_comments_as_is(sql):
+    assert strip_comments(sql) == sql
+
+
+def test_strip_comments_skips_parsing_queries_without_comments(mocker):
+    format = mocker.spy(sqlparse, "format")
+
+    assert strip_comments("SELECT 1 FROM events") == "SELECT 1 FROM events"
+    format.assert_not_called()
+
+
+def test_stream_execute_yields_blocks():
+    with stream_execute("SELECT number, toString(number) AS label FROM numbers(25)", block_size=10) as result:
+        assert result.columns == [("number", "UInt64"), ("label", "String")]
+        blocks = list(result)
+
+    assert [len(block) for block in blocks] == [10, 10, 5]
+    assert blocks[0][0] == (0, "0")
+    assert result.finished
+
+
+def test_stream_execute_named_rows():
+    with stream_execute(
+        "SELECT number, toString(number) AS label FROM numbers(%(count)s)", {"count": 3}, named_rows=True
+    ) as result:
+        rows = [row for block in result for row in block]
+
+    assert [(row.number, row.label) for row in rows] == [(0, "0"), (1, "1"), (2, "2")]
+
+
+def test_stream_execute_leaving_early_does_not_affect_next_query():
+    with stream_execute("SELECT number FROM numbers(100000)", block_size=10) as result:
+        assert len(next(iter(result))) == 10
+    assert not result.finished
+
+    assert sync_execute("SELECT 1") == [(1,)]
+
+
+def test_stream_execute_arrow_yields_record_batches():
+    with stream_execute_arrow(
+        "SELECT number, toString(number) AS label FROM numbers(%(count)s)", {"count": 3}
+    ) as reader:
+        table = reader.read_all()
+
+    assert table.column_names == ["number", "label"]
+    assert table.to_pydict() == {"number": [0, 1, 2], "label": ["0", "1", "2"]}
+
+
+def test_stream_execute_arrow_wraps_errors():
+    with pytest.raises(InternalCHQueryError):
+        with stream_execute_arrow("SELECT unknown_column FROM numbers(1)"):
+            pass
+
+
+def test_stream_execute_arrow_counts_errors_while_reading(mocker):
+    statsd = mocker.patch("posthog.clickhouse.client.execute.statsd")
+
+    with pytest.raises(Exception):
+        # Large enough that the response has started before the query fails
+        with stream_execute_arrow(
+            "SELECT throwIf(number = 9999999) FROM numbers(10000000)", settings={"max_block_size": 65536}
+        ) as reader:
+            for _ in reader:
+                pass
+
+    statsd.incr.assert_called_once_with("clickhouse_stream_execution_failure", tags=mocker.ANY)
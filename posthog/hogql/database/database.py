@@ -1,5 +1,8 @@
-from typing import Any, ClassVar, Dict, List, Literal, Optional, TypedDict
+import threading
+from typing import Any, ClassVar, Dict, List, Literal, Optional, Tuple, TypedDict
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from cachetools import TTLCache
 from pydantic import ConfigDict, BaseModel
 
 from posthog.hogql.database.models import (
@@ -32,12 +35,20 @@ from posthog.hogql.database.schema.persons import PersonsTable, RawPersonsTable
 from posthog.hogql.database.schema.person_overrides import PersonOverridesTable, RawPersonOverridesTable
 from posthog.hogql.database.schema.session_replay_events import RawSessionReplayEventsTable, SessionReplayEventsTable
 from posthog.hogql.database.schema.static_cohort_people import StaticCohortPeople
+from posthog.hogql.database.version import get_hogql_database_version
 from posthog.hogql.errors import HogQLException
 from posthog.models.group_type_mapping import GroupTypeMapping
-from posthog.models.team.team import WeekStartDay
+from posthog.models.team.team import Team, WeekStartDay
 from posthog.schema import HogQLQueryModifiers
 from posthog.utils import PersonOnEventsMode
 
+HOGQL_DATABASE_CACHE_SIZE = 1_000
+# Group types are created by ingestion without going through Django, so a cached schema is only trusted for a minute
+HOGQL_DATABASE_CACHE_TTL = 60
+
+_databases: TTLCache = TTLCache(maxsize=HOGQL_DATABASE_CACHE_SIZE, ttl=HOGQL_DATABASE_CACHE_TTL)
+_databases_lock = threading.Lock()
+
 
 class Database(BaseModel):
     model_config = ConfigDict(extra="allow")
@@ -110,12 +121,42 @@ class Database(BaseModel):
 
 
 def create_hogql_database(team_id: int, modifiers: Optional[HogQLQueryModifiers] = None) -> Database:
-    from posthog.models import Team
     from posthog.hogql.query import create_default_modifiers_for_team
-    from posthog.warehouse.models import DataWarehouseTable, DataWarehouseSavedQuery, DataWarehouseViewLink
+
+    team = Team.objects.get(pk=team_id)
+    return _build_hogql_database(team, create_default_modifiers_for_team(team, modifiers))
+
+
+def get_cached_hogql_database(team_id: int, modifiers: Optional[HogQLQueryModifiers] = None) -> Database:
+    """
+    Like `create_hogql_database`, but reuses the database of earlier queries of the team until its schema changes.
+
+    The returned database is shared between queries and must not be modified. Use `create_hogql_database` to get a
+    database that can be.
+    """
+    from posthog.hogql.query import create_default_modifiers_for_team
 
     team = Team.objects.get(pk=team_id)
     modifiers = create_default_modifiers_for_team(team, modifiers)
+    version = get_hogql_database_version(team_id)
+    if version is None:
+        return _build_hogql_database(team, modifiers)
+
+    key = (team.pk, team.timezone, team.week_start_day, modifiers.personsOnEventsMode)
+    with _databases_lock:
+        cached: Optional[Tuple[str, Database]] = _databases.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    database = _build_hogql_database(team, modifiers)
+    with _databases_lock:
+        _databases[key] = (version, database)
+    return database
+
+
+def _build_hogql_database(team: Team, modifiers: HogQLQueryModifiers) -> Database:
+    from posthog.warehouse.models import DataWarehouseTable, DataWarehouseSavedQuery, DataWarehouseViewLink
+
     database = Database(timezone=team.timezone, week_start_day=team.week_start_day)
     if modifiers.personsOnEventsMode != PersonOnEventsMode.DISABLED:
         # TODO: split PoE v1 and v2 once SQL Expression fields are supported #15180
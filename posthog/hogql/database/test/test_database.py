@@ -6,7 +6,7 @@ import pytest
 from django.test import override_settings
 from parameterized import parameterized
 
-from posthog.hogql.database.database import create_hogql_database, serialize_database
+from posthog.hogql.database.database import create_hogql_database, get_cached_hogql_database, serialize_database
 from posthog.hogql.database.models import FieldTraverser, StringDatabaseField
 from posthog.models.group_type_mapping import GroupTypeMapping
 from posthog.test.base import BaseTest
@@ -76,3 +76,41 @@ class TestDatabase(BaseTest):
         db = create_hogql_database(team_id=self.team.pk)
 
         assert db.events.fields["event"] == StringDatabaseField(name="event")
+
+    def test_cached_database_is_reused(self):
+        db = get_cached_hogql_database(team_id=self.team.pk)
+
+        assert get_cached_hogql_database(team_id=self.team.pk) is db
+        assert create_hogql_database(team_id=self.team.pk) is not db
+
+    def test_cached_database_invalidated_by_group_type_mappings(self):
+        db = get_cached_hogql_database(team_id=self.team.pk)
+        GroupTypeMapping.objects.create(team=self.team, group_type="test", group_type_index=0)
+
+        new_db = get_cached_hogql_database(team_id=self.team.pk)
+        assert new_db is not db
+        assert new_db.events.fields["test"] == FieldTraverser(chain=["group_0"])
+
+    def test_cached_database_invalidated_by_warehouse_tables(self):
+        db = get_cached_hogql_database(team_id=self.team.pk)
+        credential = DataWarehouseCredential.objects.create(
+            team=self.team, access_key="_accesskey", access_secret="_secret"
+        )
+        DataWarehouseTable.objects.create(
+            name="whatever", team=self.team, columns={"id": "String"}, credential=credential, url_pattern=""
+        )
+
+        new_db = get_cached_hogql_database(team_id=self.team.pk)
+        assert new_db is not db
+        assert new_db.has_table("whatever")
+
+    def test_cached_database_per_team_settings(self):
+        db = get_cached_hogql_database(team_id=self.team.pk)
+        with override_settings(PERSON_ON_EVENTS_OVERRIDE=True):
+            poe_db = get_cached_hogql_database(team_id=self.team.pk)
+        assert poe_db is not db
+        assert poe_db.events.fields["person"] == FieldTraverser(chain=["poe"])
+
+        self.team.timezone = "Europe/Berlin"
+        self.team.save()
+        assert get_cached_hogql_database(team_id=self.team.pk).get_timezone() == "Europe/Berlin"
@@ -0,0 +1,45 @@
+from typing import Optional
+from uuid import uuid4
+
+import structlog
+from django.core.cache import cache
+from django.db import transaction
+
+logger = structlog.get_logger(__name__)
+
+HOGQL_DATABASE_VERSION_TTL = 60 * 60 * 24 * 7  # 7 days
+
+
+def _version_cache_key(team_id: int) -> str:
+    return f"hogql_database_version_{team_id}"
+
+
+def get_hogql_database_version(team_id: int) -> Optional[str]:
+    """
+    Returns an opaque version of the team's HogQL database schema, which changes whenever warehouse tables,
+    saved queries, view links or group type mappings of the team change. None if redis is unavailable.
+    """
+    key = _version_cache_key(team_id)
+    try:
+        version = cache.get(key)
+        if version is None:
+            # `add` only sets the key if it's missing, so all processes agree on the new version
+            cache.add(key, uuid4().hex, HOGQL_DATABASE_VERSION_TTL)
+            version = cache.get(key)
+        return version
+    except Exception:
+        logger.exception("Redis is unavailable")
+        return None
+
+
+def invalidate_hogql_database(team_id: int) -> None:
+    def invalidate():
+        try:
+            cache.delete(_version_cache_key(team_id))
+        except Exception:
+            logger.exception("Redis is unavailable")
+
+    invalidate()
+    # :TRICKY: Invalidate again once the change is committed, otherwise another process could
+    # still read the old schema from the database and store it under the new version
+    transaction.on_commit(invalidate)
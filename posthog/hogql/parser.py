@@ -1,10 +1,12 @@
-from typing import Dict, List, Literal, Optional, cast
+import threading
+from typing import Any, Dict, List, Literal, Optional, cast
 
 from antlr4 import CommonTokenStream, InputStream, ParseTreeVisitor, ParserRuleContext
 from antlr4.error.ErrorListener import ErrorListener
+from cachetools import LRUCache
 
 from posthog.hogql import ast
-from posthog.hogql.base import AST
+from posthog.hogql.base import AST, Expr
 from posthog.hogql.constants import RESERVED_KEYWORDS
 from posthog.hogql.errors import NotImplementedException, HogQLException, SyntaxException
 from posthog.hogql.grammar.HogQLLexer import HogQLLexer
@@ -12,6 +14,7 @@ from posthog.hogql.grammar.HogQLParser import HogQLParser
 from posthog.hogql.parse_string import parse_string, parse_string_literal
 from posthog.hogql.placeholders import replace_placeholders
 from posthog.hogql.timings import HogQLTimings
+from posthog.hogql.visitor import clone_expr
 from hogql_parser import (
     parse_expr as _parse_expr_cpp,
     parse_order_expr as _parse_order_expr_cpp,
@@ -31,6 +34,28 @@ RULE_TO_PARSE_FUNCTION = {
     },
 }
 
+# Maximum number of parsed strings kept in memory per process. Most parsed strings are fixed templates in our code.
+PARSER_CACHE_SIZE = 2048
+
+_parser_cache: LRUCache = LRUCache(maxsize=PARSER_CACHE_SIZE)
+_parser_cache_lock = threading.Lock()
+
+
+def _parse_cached(backend: Literal["python", "cpp"], rule: str, string: str, timings: HogQLTimings, *args: Any) -> Expr:
+    """Returns a parsed AST shared between callers. It must be cloned before it's handed out, never mutated."""
+    key = (rule, string, backend, *args)
+    with _parser_cache_lock:
+        node = _parser_cache.get(key)
+    if node is not None:
+        timings.increment("parse_cache_hit")
+        return node
+
+    timings.increment("parse_cache_miss")
+    node = RULE_TO_PARSE_FUNCTION[backend][rule](string, *args)
+    with _parser_cache_lock:
+        _parser_cache[key] = node
+    return node
+
 
 def parse_expr(
     expr: str,
@@ -43,11 +68,12 @@ def parse_expr(
     if timings is None:
         timings = HogQLTimings()
     with timings.measure(f"parse_expr_{backend}"):
-        node = RULE_TO_PARSE_FUNCTION[backend]["expr"](expr, start)
+        node = _parse_cached(backend, "expr", expr, timings, start)
         if placeholders:
+            # Replacing placeholders clones the tree as well
             with timings.measure("replace_placeholders"):
                 return replace_placeholders(node, placeholders)
-    return node
+        return clone_expr(node)
 
 
 def parse_order_expr(
@@ -60,11 +86,11 @@ def parse_order_expr(
     if timings is None:
         timings = HogQLTimings()
     with timings.measure(f"parse_order_expr_{backend}"):
-        node = RULE_TO_PARSE_FUNCTION[backend]["order_expr"](order_expr)
+        node = _parse_cached(backend, "order_expr", order_expr, timings)
         if placeholders:
             with timings.measure("replace_placeholders"):
                 return replace_placeholders(node, placeholders)
-    return node
+        return clone_expr(node)
 
 
 def parse_select(
@@ -77,11 +103,11 @@ def parse_select(
     if timings is None:
         timings = HogQLTimings()
     with timings.measure(f"parse_select_{backend}"):
-        node = RULE_TO_PARSE_FUNCTION[backend]["select"](statement)
+        node = _parse_cached(backend, "select", statement, timings)
         if placeholders:
             with timings.measure("replace_placeholders"):
-                node = replace_placeholders(node, placeholders)
-    return node
+                return cast(ast.SelectQuery | ast.SelectUnionQuery, replace_placeholders(node, placeholders))
+        return cast(ast.SelectQuery | ast.SelectUnionQuery, clone_expr(node))
 
 
 def get_parser(query: str) -> HogQLParser:
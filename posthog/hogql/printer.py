@@ -1,10 +1,15 @@
+import hashlib
 import re
+import threading
 from dataclasses import dataclass
 from datetime import datetime, date
 from difflib import get_close_matches
-from typing import List, Literal, Optional, Union, cast
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union, cast
 from uuid import UUID
 
+from cachetools import TTLCache
+from django.conf import settings as app_settings
+
 from posthog.hogql import ast
 from posthog.hogql.base import AST
 from posthog.hogql.constants import (
@@ -20,7 +25,7 @@ from posthog.hogql.functions import (
 )
 from posthog.hogql.context import HogQLContext
 from posthog.hogql.database.models import Table, FunctionCallTable, SavedQuery
-from posthog.hogql.database.database import create_hogql_database
+from posthog.hogql.database.database import Database, get_cached_hogql_database
 from posthog.hogql.database.s3_table import S3Table
 from posthog.hogql.errors import HogQLException
 from posthog.hogql.escape_sql import (
@@ -33,12 +38,30 @@ from posthog.hogql.functions.mapping import validate_function_args
 from posthog.hogql.resolver import ResolverException, lookup_field_by_name, resolve_types
 from posthog.hogql.transforms.lazy_tables import resolve_lazy_tables
 from posthog.hogql.transforms.property_types import resolve_property_types
-from posthog.hogql.visitor import Visitor
+from posthog.hogql.visitor import CloningVisitor, Visitor, clone_expr
 from posthog.models.property import PropertyName, TableColumn
 from posthog.models.team.team import WeekStartDay
 from posthog.models.utils import UUIDT
 from posthog.utils import PersonOnEventsMode
 
+COMPILED_QUERY_CACHE_SIZE = 1_000
+# Property types and materialized columns can change without the team's schema changing
+COMPILED_QUERY_CACHE_TTL = 60
+
+_compiled_queries: TTLCache = TTLCache(maxsize=COMPILED_QUERY_CACHE_SIZE, ttl=COMPILED_QUERY_CACHE_TTL)
+_compiled_queries_lock = threading.Lock()
+
+
+# NOTE: This is purely for testing purposes
+def TEST_clear_compiled_query_cache():
+    with _compiled_queries_lock:
+        _compiled_queries.clear()
+
+
+# Printed in place of string constants in the HogQL of compiled queries. "\x00" is escaped everywhere else in HogQL.
+_CONSTANT_SLOT_MARKER = "\x00{}\x00"
+_constant_slot_marker_pattern = re.compile("\x00(\\d+)\x00")
+
 
 def team_id_guard_for_table(table_type: Union[ast.TableType, ast.TableAliasType], context: HogQLContext) -> ast.Expr:
     """Add a mandatory "and(team_id, ...)" filter around the expression."""
@@ -72,28 +95,245 @@ def prepare_ast_for_printing(
     settings: Optional[HogQLGlobalSettings] = None,
 ) -> ast.Expr:
     with context.timings.measure("create_hogql_database"):
-        context.database = context.database or create_hogql_database(context.team_id, context.modifiers)
+        context.database = context.database or get_cached_hogql_database(context.team_id, context.modifiers)
 
     with context.timings.measure("resolve_types"):
         node = resolve_types(node, context, scopes=[node.type for node in stack] if stack else None)
     if dialect == "clickhouse":
-        with context.timings.measure("resolve_property_types"):
-            node = resolve_property_types(node, context)
-        with context.timings.measure("resolve_lazy_tables"):
-            resolve_lazy_tables(node, stack, context)
-
-        # We support global query settings, and local subquery settings.
-        # If the global query is a select query with settings, merge the two.
-        if isinstance(node, ast.SelectQuery) and node.settings is not None and settings is not None:
-            for key, value in node.settings.model_dump().items():
-                if value is not None:
-                    settings.__setattr__(key, value)
-            node.settings = None
+        node = _prepare_resolved_ast_for_clickhouse(node, context, stack=stack, settings=settings)
 
     # We add a team_id guard right before printing. It's not a separate step here.
     return node
 
 
+def _prepare_resolved_ast_for_clickhouse(
+    node: ast.Expr,
+    context: HogQLContext,
+    stack: Optional[List[ast.SelectQuery]] = None,
+    settings: Optional[HogQLGlobalSettings] = None,
+) -> ast.Expr:
+    with context.timings.measure("resolve_property_types"):
+        node = resolve_property_types(node, context)
+    with context.timings.measure("resolve_lazy_tables"):
+        resolve_lazy_tables(node, stack, context)
+
+    # We support global query settings, and local subquery settings.
+    # If the global query is a select query with settings, merge the two.
+    if isinstance(node, ast.SelectQuery) and node.settings is not None and settings is not None:
+        _merge_query_settings(node, settings)
+        node.settings = None
+
+    return node
+
+
+def _merge_query_settings(node: ast.SelectQuery, settings: HogQLGlobalSettings) -> None:
+    for key, value in node.settings.model_dump().items():
+        if value is not None:
+            settings.__setattr__(key, value)
+
+
+@dataclass
+class PrintedQuery:
+    hogql: str
+    clickhouse: str
+    # Names of the returned columns, as printed in HogQL
+    columns: List[str]
+
+
+def print_ast_in_both_dialects(
+    node: Union[ast.SelectQuery, ast.SelectUnionQuery],
+    context: HogQLContext,
+    settings: Optional[HogQLGlobalSettings] = None,
+) -> PrintedQuery:
+    """
+    Print a query as HogQL and ClickHouse SQL, resolving its types only once.
+
+    The HogQL output and column names are printed from the tree with resolved types, before the ClickHouse-only
+    transforms (property types, lazy tables) modify that same tree in place. `context` ends up with the values
+    of the ClickHouse query.
+
+    Queries against the team's own database are compiled once per shape: string constants are taken out of the
+    query, and queries that only differ in them reuse the printed output with their own values bound to it.
+    """
+    use_cache = (
+        app_settings.HOGQL_COMPILED_QUERY_CACHE_ENABLED and context.database is None and context.team_id is not None
+    )
+    with context.timings.measure("create_hogql_database"):
+        context.database = context.database or get_cached_hogql_database(context.team_id, context.modifiers)
+    if not use_cache:
+        return _print_ast_in_both_dialects(node, context, settings)
+
+    with context.timings.measure("compiled_query_cache"):
+        slotter = _ConstantSlotter()
+        normalized = cast(Union[ast.SelectQuery, ast.SelectUnionQuery], slotter.visit(node))
+        key = _compiled_query_cache_key(normalized, slotter.constants, context, settings)
+        with _compiled_queries_lock:
+            compiled: Optional[_CompiledQuery] = _compiled_queries.get(key)
+
+    if compiled is not None and compiled.matches(context.database, slotter.constants):
+        context.timings.increment("compiled_query_cache_hit")
+        if isinstance(node, ast.SelectQuery) and node.settings is not None and settings is not None:
+            _merge_query_settings(node, settings)
+        return compiled.bind(slotter.constants, context)
+
+    context.timings.increment("compiled_query_cache_miss")
+    first_value = len(context.values)
+    try:
+        printed = _print_ast_in_both_dialects(normalized, context, settings)
+    except HogQLException:
+        # Report the error with the locations and constants of the query itself
+        for key in list(context.values)[first_value:]:
+            del context.values[key]
+        return _print_ast_in_both_dialects(node, context, settings)
+    values = dict(list(context.values.items())[first_value:])
+    compiled = _CompiledQuery.create(printed, context.database, slotter.constants, values)
+    with _compiled_queries_lock:
+        _compiled_queries[key] = compiled
+    return compiled.bind(slotter.constants, context)
+
+
+def _print_ast_in_both_dialects(
+    node: Union[ast.SelectQuery, ast.SelectUnionQuery],
+    context: HogQLContext,
+    settings: Optional[HogQLGlobalSettings] = None,
+) -> PrintedQuery:
+    with context.timings.measure("resolve_types"):
+        prepared = resolve_types(node, context)
+
+    with context.timings.measure("print_hogql"):
+        hogql = print_prepared_ast(prepared, context, "hogql")
+        columns = []
+        columns_query = prepared.select_queries[0] if isinstance(prepared, ast.SelectUnionQuery) else prepared
+        for column in columns_query.select:
+            if isinstance(column, ast.Alias):
+                columns.append(column.alias)
+            else:
+                columns.append(print_prepared_ast(node=column, context=context, dialect="hogql", stack=[prepared]))
+
+    with context.timings.measure("prepare_clickhouse"):
+        prepared = _prepare_resolved_ast_for_clickhouse(prepared, context, settings=settings)
+
+    with context.timings.measure("print_clickhouse"):
+        clickhouse = print_prepared_ast(prepared, context, "clickhouse", settings=settings)
+
+    return PrintedQuery(hogql=hogql, clickhouse=clickhouse, columns=columns)
+
+
+class _ConstantSlot(str):
+    """A string constant of a compiled query, which is replaced by the constant at the same place in the next query."""
+
+    index: int
+
+    def __new__(cls, value: str, index: int) -> "_ConstantSlot":
+        slot = super().__new__(cls, value)
+        slot.index = index
+        return slot
+
+    def __repr__(self) -> str:
+        return f"_ConstantSlot({self.index})"
+
+
+class _ConstantSlotter(CloningVisitor):
+    """Clones a query, replacing its string constants with slots, so that queries differing only in them look alike."""
+
+    def __init__(self):
+        super().__init__(clear_types=True, clear_locations=True)
+        self.constants: List[str] = []
+
+    def visit_constant(self, node: ast.Constant):
+        if isinstance(node.value, str):
+            slot = _ConstantSlot(node.value, len(self.constants))
+            self.constants.append(node.value)
+            return ast.Constant(value=slot)
+        return super().visit_constant(node)
+
+    def visit_array_access(self, node: ast.ArrayAccess):
+        # Keys like `properties['$browser']` are resolved into fields, they're part of the shape of the query
+        return ast.ArrayAccess(
+            array=self.visit(node.array),
+            property=clone_expr(node.property, clear_types=True, clear_locations=True),
+        )
+
+
+def _compiled_query_cache_key(
+    normalized: ast.Expr, constants: List[str], context: HogQLContext, settings: Optional[HogQLGlobalSettings]
+) -> Tuple:
+    # Which constants are equal to each other can change the printed query, e.g. when comparing two constants
+    first_index: Dict[str, int] = {}
+    equal_constants = tuple(first_index.setdefault(constant, index) for index, constant in enumerate(constants))
+    return (
+        context.team_id,
+        len(context.values),
+        context.enable_select_queries,
+        context.limit_top_select,
+        context.within_non_hogql_query,
+        context.max_view_depth,
+        context.modifiers.model_dump_json(),
+        settings.model_dump_json() if settings else None,
+        equal_constants,
+        hashlib.sha1(repr(normalized).encode("utf-8")).hexdigest(),
+    )
+
+
+@dataclass(frozen=True)
+class _CompiledQuery:
+    database: Database
+    # HogQL and column names, with markers in place of string constants
+    hogql: str
+    columns: List[str]
+    clickhouse: str
+    # Values of the ClickHouse query, as the index of the constant they're bound to, or the value itself
+    values: Dict[str, Tuple[Optional[int], Any]]
+    # Constants that shaped the query without being passed on as values, e.g. cohort names or constants that were
+    # compared to each other. The compiled query can only be reused for queries with the same values for them.
+    pinned_constants: Dict[int, str]
+
+    @classmethod
+    def create(
+        cls, printed: PrintedQuery, database: Database, constants: List[str], values: Dict[str, Any]
+    ) -> "_CompiledQuery":
+        compiled_values: Dict[str, Tuple[Optional[int], Any]] = {}
+        for key, value in values.items():
+            if isinstance(value, _ConstantSlot):
+                compiled_values[key] = (value.index, None)
+            else:
+                compiled_values[key] = (None, value)
+
+        # Constants can be added as values, and still be left out of the query, e.g. when comparing two constants
+        bound = {
+            index
+            for key, (index, _) in compiled_values.items()
+            if index is not None and f"%({key})s" in printed.clickhouse
+        }
+        return cls(
+            database=database,
+            hogql=printed.hogql,
+            columns=printed.columns,
+            clickhouse=printed.clickhouse,
+            values=compiled_values,
+            pinned_constants={index: constant for index, constant in enumerate(constants) if index not in bound},
+        )
+
+    def matches(self, database: Database, constants: List[str]) -> bool:
+        return self.database is database and all(
+            constants[index] == value for index, value in self.pinned_constants.items()
+        )
+
+    def bind(self, constants: List[str], context: HogQLContext) -> PrintedQuery:
+        """Print the compiled query with the given constants, adding its values to the context."""
+
+        def print_constant(match: re.Match) -> str:
+            return escape_hogql_string(constants[int(match.group(1))])
+
+        for key, (index, value) in self.values.items():
+            context.values[key] = constants[index] if index is not None else value
+        return PrintedQuery(
+            hogql=_constant_slot_marker_pattern.sub(print_constant, self.hogql),
+            clickhouse=self.clickhouse,
+            columns=[_constant_slot_marker_pattern.sub(print_constant, column) for column in self.columns],
+        )
+
+
 def print_prepared_ast(
     node: ast.Expr,
     context: HogQLContext,
@@ -551,6 +791,9 @@ class _Printer(Visitor):
 
     def visit_constant(self, node: ast.Constant):
         if self.dialect == "hogql":
+            if isinstance(node.value, _ConstantSlot):
+                # Printed with the constant of the query that's bound to the compiled query
+                return _CONSTANT_SLOT_MARKER.format(node.value.index)
             # Inline everything in HogQL
             return self._print_escaped_string(node.value)
         elif (
@@ -1,4 +1,5 @@
-from typing import Dict, Optional, Union, cast
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple, Union
 
 from posthog.clickhouse.client.connection import Workload
 from posthog.hogql import ast
@@ -8,15 +9,18 @@ from posthog.hogql.hogql import HogQLContext
 from posthog.hogql.modifiers import create_default_modifiers_for_team
 from posthog.hogql.parser import parse_select
 from posthog.hogql.placeholders import replace_placeholders, find_placeholders
-from posthog.hogql.printer import prepare_ast_for_printing, print_ast, print_prepared_ast
+from posthog.hogql.printer import PrintedQuery, print_ast_in_both_dialects
 from posthog.hogql.filters import replace_filters
 from posthog.hogql.timings import HogQLTimings
-from posthog.hogql.visitor import clone_expr
 from posthog.models.team import Team
 from posthog.clickhouse.query_tagging import tag_queries
-from posthog.client import sync_execute
+from posthog.client import stream_execute, stream_execute_arrow, sync_execute
+from posthog.clickhouse.client.execute import StreamedQueryResult
 from posthog.schema import HogQLQueryResponse, HogQLFilters, HogQLQueryModifiers
 
+if TYPE_CHECKING:
+    import pyarrow
+
 
 def execute_hogql_query(
     query: Union[str, ast.SelectQuery, ast.SelectUnionQuery],
@@ -34,31 +38,7 @@ def execute_hogql_query(
     if timings is None:
         timings = HogQLTimings()
 
-    with timings.measure("query"):
-        if isinstance(query, ast.SelectQuery) or isinstance(query, ast.SelectUnionQuery):
-            select_query = query
-            query = None
-        else:
-            select_query = parse_select(str(query), timings=timings)
-
-    with timings.measure("replace_placeholders"):
-        placeholders_in_query = find_placeholders(select_query)
-        placeholders = placeholders or {}
-
-        if "filters" in placeholders and filters is not None:
-            raise HogQLException(
-                f"Query contains 'filters' placeholder, yet filters are also provided as a standalone query parameter."
-            )
-        if "filters" in placeholders_in_query:
-            select_query = replace_filters(select_query, filters, team)
-            placeholders_in_query.remove("filters")
-
-        if len(placeholders_in_query) > 0:
-            if len(placeholders) == 0:
-                raise HogQLException(
-                    f"Query contains placeholders, but none were provided. Placeholders in query: {', '.join(placeholders_in_query)}"
-                )
-            select_query = replace_placeholders(select_query, placeholders)
+    select_query, query = _prepare_select_query(query, team, filters, placeholders, timings)
 
     with timings.measure("max_limit"):
         from posthog.hogql.constants import DEFAULT_RETURNED_ROWS
@@ -71,52 +51,19 @@ def execute_hogql_query(
                 # One more "max" of MAX_SELECT_RETURNED_ROWS (100k) in applied in the query printer.
                 one_query.limit = ast.Constant(value=default_limit or DEFAULT_RETURNED_ROWS)
 
-    # Get printed HogQL query, and returned columns. Using a cloned query.
-    with timings.measure("hogql"):
-        query_modifiers = create_default_modifiers_for_team(team, modifiers)
-        with timings.measure("prepare_ast"):
-            hogql_query_context = HogQLContext(
-                team_id=team.pk,
-                enable_select_queries=True,
-                timings=timings,
-                modifiers=query_modifiers,
-            )
-            with timings.measure("clone"):
-                cloned_query = clone_expr(select_query, True)
-            select_query_hogql = cast(
-                ast.SelectQuery,
-                prepare_ast_for_printing(node=cloned_query, context=hogql_query_context, dialect="hogql"),
-            )
-
-        with timings.measure("print_ast"):
-            hogql = print_prepared_ast(select_query_hogql, hogql_query_context, "hogql")
-            print_columns = []
-            columns_query = (
-                select_query_hogql.select_queries[0]
-                if isinstance(select_query_hogql, ast.SelectUnionQuery)
-                else select_query_hogql
-            )
-            for node in columns_query.select:
-                if isinstance(node, ast.Alias):
-                    print_columns.append(node.alias)
-                else:
-                    print_columns.append(
-                        print_prepared_ast(
-                            node=node, context=hogql_query_context, dialect="hogql", stack=[select_query_hogql]
-                        )
-                    )
-
-    # Print the ClickHouse SQL query
+    # Print the HogQL and ClickHouse SQL queries, and the returned columns
     with timings.measure("print_ast"):
+        query_modifiers = create_default_modifiers_for_team(team, modifiers)
         clickhouse_context = HogQLContext(
             team_id=team.pk,
             enable_select_queries=True,
             timings=timings,
             modifiers=query_modifiers,
         )
-        clickhouse_sql = print_ast(
-            select_query, context=clickhouse_context, dialect="clickhouse", settings=settings or HogQLGlobalSettings()
+        printed = print_ast_in_both_dialects(
+            select_query, context=clickhouse_context, settings=settings or HogQLGlobalSettings()
         )
+        hogql, clickhouse_sql, print_columns = printed.hogql, printed.clickhouse, printed.columns
 
     timings_dict = timings.to_dict()
     with timings.measure("clickhouse_execute"):
@@ -162,3 +109,118 @@ def execute_hogql_query(
         modifiers=query_modifiers,
         explain=explain_output,
     )
+
+
+@contextmanager
+def stream_hogql_query(
+    query: Union[str, ast.SelectQuery, ast.SelectUnionQuery],
+    team: Team,
+    query_type: str = "hogql_query",
+    filters: Optional[HogQLFilters] = None,
+    placeholders: Optional[Dict[str, ast.Expr]] = None,
+    workload: Workload = Workload.OFFLINE,
+    settings: Optional[HogQLGlobalSettings] = None,
+    modifiers: Optional[HogQLQueryModifiers] = None,
+    timings: Optional[HogQLTimings] = None,
+) -> Iterator[Tuple[List[str], StreamedQueryResult]]:
+    """
+    Like `execute_hogql_query`, but streams the results in blocks, and returns all rows instead of at most
+    MAX_SELECT_RETURNED_ROWS. Meant for exports. Yields the names of the returned columns, and the streamed result.
+    """
+    if timings is None:
+        timings = HogQLTimings()
+
+    select_query, query = _prepare_select_query(query, team, filters, placeholders, timings)
+    printed, values = _print_streamed_query(select_query, team, settings, modifiers, timings, limit_top_select=False)
+
+    tag_queries(team_id=team.pk, query_type=query_type, timings=timings.to_dict())
+    with stream_execute(printed.clickhouse, values, workload=workload, team_id=team.pk, readonly=True) as result:
+        yield printed.columns or [name for name, _type in result.columns], result
+
+
+@contextmanager
+def stream_hogql_query_as_arrow(
+    query: Union[str, ast.SelectQuery, ast.SelectUnionQuery],
+    team: Team,
+    query_type: str = "hogql_query",
+    filters: Optional[HogQLFilters] = None,
+    placeholders: Optional[Dict[str, ast.Expr]] = None,
+    workload: Workload = Workload.OFFLINE,
+    settings: Optional[HogQLGlobalSettings] = None,
+    modifiers: Optional[HogQLQueryModifiers] = None,
+    timings: Optional[HogQLTimings] = None,
+    limit_top_select: bool = False,
+) -> Iterator[Tuple[List[str], "pyarrow.RecordBatchReader"]]:
+    """
+    Like `stream_hogql_query`, but streams the results as Arrow record batches, for exports to columnar formats.
+    ClickHouse names the columns of the batches after their printed expressions, so the names of the returned
+    columns are yielded separately. With `limit_top_select`, at most MAX_SELECT_RETURNED_ROWS rows are returned.
+    """
+    if timings is None:
+        timings = HogQLTimings()
+
+    select_query, query = _prepare_select_query(query, team, filters, placeholders, timings)
+    printed, values = _print_streamed_query(select_query, team, settings, modifiers, timings, limit_top_select)
+
+    tag_queries(team_id=team.pk, query_type=query_type, timings=timings.to_dict())
+    with stream_execute_arrow(printed.clickhouse, values, workload=workload, team_id=team.pk, readonly=True) as reader:
+        yield printed.columns or reader.schema.names, reader
+
+
+def _print_streamed_query(
+    select_query: Union[ast.SelectQuery, ast.SelectUnionQuery],
+    team: Team,
+    settings: Optional[HogQLGlobalSettings],
+    modifiers: Optional[HogQLQueryModifiers],
+    timings: HogQLTimings,
+    limit_top_select: bool,
+) -> Tuple[PrintedQuery, Dict[str, Any]]:
+    with timings.measure("print_ast"):
+        clickhouse_context = HogQLContext(
+            team_id=team.pk,
+            enable_select_queries=True,
+            limit_top_select=limit_top_select,
+            timings=timings,
+            modifiers=create_default_modifiers_for_team(team, modifiers),
+        )
+        printed = print_ast_in_both_dialects(
+            select_query, context=clickhouse_context, settings=settings or HogQLGlobalSettings()
+        )
+    return printed, clickhouse_context.values
+
+
+def _prepare_select_query(
+    query: Union[str, ast.SelectQuery, ast.SelectUnionQuery],
+    team: Team,
+    filters: Optional[HogQLFilters],
+    placeholders: Optional[Dict[str, ast.Expr]],
+    timings: HogQLTimings,
+) -> Tuple[Union[ast.SelectQuery, ast.SelectUnionQuery], Optional[str]]:
+    """Parses the query if needed, and fills in filters and placeholders. Returns the query, and the query string."""
+    with timings.measure("query"):
+        if isinstance(query, ast.SelectQuery) or isinstance(query, ast.SelectUnionQuery):
+            select_query = query
+            query = None
+        else:
+            select_query = parse_select(str(query), timings=timings)
+
+    with timings.measure("replace_placeholders"):
+        placeholders_in_query = find_placeholders(select_query)
+        placeholders = placeholders or {}
+
+        if "filters" in placeholders and filters is not None:
+            raise HogQLException(
+                f"Query contains 'filters' placeholder, yet filters are also provided as a standalone query parameter."
+            )
+        if "filters" in placeholders_in_query:
+            select_query = replace_filters(select_query, filters, team)
+            placeholders_in_query.remove("filters")
+
+        if len(placeholders_in_query) > 0:
+            if len(placeholders) == 0:
+                raise HogQLException(
+                    f"Query contains placeholders, but none were provided. Placeholders in query: {', '.join(placeholders_in_query)}"
+                )
+            select_query = replace_placeholders(select_query, placeholders)
+
+    return select_query, query
@@ -5,6 +5,7 @@ import math
 from posthog.hogql import ast
 from posthog.hogql.errors import HogQLException, SyntaxException
 from posthog.hogql.parser import parse_expr, parse_order_expr, parse_select
+from posthog.hogql.timings import HogQLTimings
 from posthog.hogql.visitor import clear_locations
 from posthog.test.base import BaseTest
 
@@ -1283,4 +1284,31 @@ def parser_test_factory(backend: Literal["python", "cpp"]):
             self.assertEqual(e.exception.start, 0)
             self.assertEqual(e.exception.end, 7)
 
+        def test_cached_parse_returns_copies(self):
+            query = "SELECT event, timestamp FROM events WHERE event = 'cached_parse_returns_copies'"
+            timings = HogQLTimings()
+            first = cast(ast.SelectQuery, parse_select(query, timings=timings, backend=backend))
+            second = cast(ast.SelectQuery, parse_select(query, timings=timings, backend=backend))
+
+            self.assertEqual(timings.counters, {"parse_cache_miss": 1, "parse_cache_hit": 1})
+            self.assertEqual(first, second)
+            self.assertIsNot(first, second)
+
+            first.select.append(ast.Field(chain=["uuid"]))
+            cast(ast.CompareOperation, first.where).right = ast.Constant(value="changed")
+            self.assertEqual(clear_locations(parse_select(query, backend=backend)), clear_locations(second))
+
+        def test_cached_parse_with_placeholders(self):
+            query = "SELECT {column} FROM events WHERE event = 'placeholders'"
+            first = self._select(query, placeholders={"column": ast.Field(chain=["event"])})
+            second = self._select(query, placeholders={"column": ast.Field(chain=["timestamp"])})
+            self.assertEqual(first, self._select("SELECT event FROM events WHERE event = 'placeholders'"))
+            self.assertEqual(second, self._select("SELECT timestamp FROM events WHERE event = 'placeholders'"))
+
+        def test_cached_parse_keeps_expr_start_offsets_apart(self):
+            self.assertEqual(parse_expr("cached_start", start=0, backend=backend).start, 0)
+            if backend == "python":
+                # Locations are only kept when a start is given
+                self.assertIsNone(parse_expr("cached_start", start=None, backend=backend).start)
+
     return TestParser
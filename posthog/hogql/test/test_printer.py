@@ -1,4 +1,5 @@
 from typing import Literal, Optional, Dict
+from unittest.mock import patch
 
 from django.test import override_settings
 
@@ -10,7 +11,8 @@ from posthog.hogql.database.models import DateDatabaseField
 from posthog.hogql.errors import HogQLException
 from posthog.hogql.hogql import translate_hogql
 from posthog.hogql.parser import parse_select
-from posthog.hogql.printer import print_ast
+from posthog.hogql.printer import PrintedQuery, print_ast, print_ast_in_both_dialects
+from posthog.hogql.resolver import resolve_types
 from posthog.models.team.team import WeekStartDay
 from posthog.schema import HogQLQueryModifiers, PersonsArgMaxVersion
 from posthog.test.base import BaseTest
@@ -911,3 +913,94 @@ class TestPrinter(BaseTest):
             printed,
             f"SELECT 1 FROM events WHERE equals(events.team_id, {self.team.pk}) LIMIT 10000 SETTINGS optimize_aggregation_in_order=1, readonly=2, max_execution_time=10, allow_experimental_object_type=1",
         )
+
+    def test_print_ast_in_both_dialects(self):
+        query = "SELECT event, count() AS c, person.properties.email FROM events WHERE properties.$browser = 'Chrome' GROUP BY event, person.properties.email"
+        expected_hogql = print_ast(
+            parse_select(query), HogQLContext(team_id=self.team.pk, enable_select_queries=True), "hogql"
+        )
+        expected_context = HogQLContext(team_id=self.team.pk, enable_select_queries=True)
+        expected_clickhouse = print_ast(parse_select(query), expected_context, "clickhouse")
+
+        context = HogQLContext(team_id=self.team.pk, enable_select_queries=True)
+        with patch("posthog.hogql.printer.resolve_types", wraps=resolve_types) as resolve_types_spy:
+            printed = print_ast_in_both_dialects(parse_select(query), context)
+
+        self.assertEqual(resolve_types_spy.call_count, 1)
+        self.assertEqual(printed.hogql, expected_hogql)
+        self.assertEqual(printed.clickhouse, expected_clickhouse)
+        self.assertEqual(context.values, expected_context.values)
+        self.assertEqual(printed.columns, ["event", "c", "person.properties.email"])
+        for phase in ["resolve_types", "print_hogql", "prepare_clickhouse", "print_clickhouse"]:
+            self.assertIn(f"./{phase}", context.timings.to_dict())
+
+    def test_print_ast_in_both_dialects_with_settings(self):
+        query = parse_select("SELECT 1 FROM events")
+        query.settings = HogQLQuerySettings(optimize_aggregation_in_order=True)
+        printed = print_ast_in_both_dialects(
+            query,
+            HogQLContext(team_id=self.team.pk, enable_select_queries=True),
+            settings=HogQLGlobalSettings(max_execution_time=10),
+        )
+        self.assertEqual(printed.hogql, "SELECT 1 FROM events LIMIT 10000")
+        self.assertEqual(
+            printed.clickhouse,
+            f"SELECT 1 FROM events WHERE equals(events.team_id, {self.team.pk}) LIMIT 10000 SETTINGS optimize_aggregation_in_order=1, readonly=2, max_execution_time=10, allow_experimental_object_type=1",
+        )
+
+    @override_settings(HOGQL_COMPILED_QUERY_CACHE_ENABLED=False)
+    def test_print_ast_in_both_dialects_without_compiled_query_cache(self):
+        query = "SELECT event FROM events WHERE properties.$browser = 'Chrome'"
+        with patch("posthog.hogql.printer.resolve_types", wraps=resolve_types) as resolve_types_spy:
+            printed = [
+                print_ast_in_both_dialects(
+                    parse_select(query), HogQLContext(team_id=self.team.pk, enable_select_queries=True)
+                )
+                for _ in range(2)
+            ]
+
+        self.assertEqual(resolve_types_spy.call_count, 2)
+        self.assertEqual(printed[0], printed[1])
+
+    def test_print_ast_in_both_dialects_binds_constants_to_compiled_query(self):
+        def print_query(browser: str, date_from: str) -> tuple:
+            context = HogQLContext(team_id=self.team.pk, enable_select_queries=True)
+            query = parse_select(
+                "SELECT event, {browser} AS b FROM events WHERE properties.$browser = {browser} AND timestamp > {date_from}",
+                placeholders={"browser": ast.Constant(value=browser), "date_from": ast.Constant(value=date_from)},
+            )
+            return print_ast_in_both_dialects(query, context), context
+
+        printed, context = print_query("Chrome", "2023-01-01")
+        self.assertEqual(context.timings.counters, {"compiled_query_cache_miss": 1})
+        self.assertEqual(
+            printed.hogql,
+            "SELECT event, 'Chrome' AS b FROM events WHERE and(equals(properties.$browser, 'Chrome'), greater(timestamp, '2023-01-01')) LIMIT 10000",
+        )
+
+        with patch("posthog.hogql.printer.resolve_types") as resolve_types_mock:
+            rebound, rebound_context = print_query("Safari's", "2023-02-01")
+        resolve_types_mock.assert_not_called()
+        self.assertEqual(rebound_context.timings.counters, {"compiled_query_cache_hit": 1})
+        self.assertEqual(rebound.clickhouse, printed.clickhouse)
+        self.assertEqual(
+            rebound.hogql,
+            "SELECT event, 'Safari\\'s' AS b FROM events WHERE and(equals(properties.$browser, 'Safari\\'s'), greater(timestamp, '2023-02-01')) LIMIT 10000",
+        )
+        self.assertEqual(rebound.columns, ["event", "b"])
+        rebound_values = {"Chrome": "Safari's", "2023-01-01": "2023-02-01"}
+        expected_values = {key: rebound_values.get(value, value) for key, value in context.values.items()}
+        self.assertEqual(rebound_context.values, expected_values)
+        self.assertTrue(all(type(value) is str for value in rebound_context.values.values()))
+
+    def test_print_ast_in_both_dialects_does_not_rebind_constants_folded_into_query(self):
+        def print_query(left: str, right: str) -> PrintedQuery:
+            query = parse_select(
+                "SELECT event FROM events WHERE {left} < {right}",
+                placeholders={"left": ast.Constant(value=left), "right": ast.Constant(value=right)},
+            )
+            return print_ast_in_both_dialects(query, HogQLContext(team_id=self.team.pk, enable_select_queries=True))
+
+        self.assertIn(", 1) LIMIT", print_query("a", "b").clickhouse)
+        self.assertIn(", 0) LIMIT", print_query("b", "a").clickhouse)
+        self.assertIn(", 0) LIMIT", print_query("a", "a").clickhouse)
@@ -90,3 +90,20 @@ class TestHogQLTimings(BaseTest):
             results = timings.to_dict()
             self.assertAlmostEquals(results["./a"], 0.1)
             self.assertAlmostEquals(results["."], 0.25)
+
+    def test_add_timings(self):
+        with patch("posthog.hogql.timings.perf_counter", fake_perf_counter):
+            timings = HogQLTimings()
+            other_timings = HogQLTimings()
+
+            with other_timings.measure("query"):
+                pass
+            other_timings.increment("cache_hit")
+            with timings.measure("series"):
+                timings.add("0", other_timings)
+
+            results = timings.to_dict()
+            self.assertAlmostEquals(results["./series/0/query"], 0.05)
+            self.assertAlmostEquals(results["./series/0"], 0.2)
+            self.assertAlmostEquals(results["./series"], 0.1)
+            self.assertEqual(timings.counters, {"cache_hit": 1})
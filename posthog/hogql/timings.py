@@ -12,6 +12,8 @@ from posthog.schema import QueryTiming
 class HogQLTimings:
     # Completed time in seconds for different parts of the HogQL query
     timings: Dict[str, float] = field(default_factory=dict)
+    # Number of times something happened while processing the query, e.g. cache hits
+    counters: Dict[str, int] = field(default_factory=dict)
 
     # Used for housekeeping
     _timing_starts: Dict[str, float] = field(default_factory=dict)
@@ -37,6 +39,17 @@ class HogQLTimings:
             if span:
                 span.set_tag("duration_seconds", duration)
 
+    def increment(self, key: str, value: int = 1):
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def add(self, key: str, timings: "HogQLTimings"):
+        """Add the timings and counters of another instance, e.g. measured in another thread, under `key`."""
+        for timing_key, time in timings.to_dict().items():
+            full_key = f"{self._timing_pointer}/{key}{timing_key[1:]}"
+            self.timings[full_key] = self.timings.get(full_key, 0.0) + time
+        for counter_key, value in timings.counters.items():
+            self.increment(counter_key, value)
+
     def to_dict(self) -> Dict[str, float]:
         timings = {**self.timings}
         for key, start in reversed(self._timing_starts.items()):
@@ -0,0 +1,170 @@
+from unittest.mock import patch
+
+from freezegun import freeze_time
+
+from posthog.hogql_queries.insights.trends.trends_query_runner import TrendsQueryRunner
+from posthog.models.instance_setting import override_instance_config
+from posthog.models.property_definition import PropertyDefinition
+from posthog.schema import BreakdownFilter, DateRange, EventsNode, IntervalType, TrendsFilter, TrendsQuery
+from posthog.test.base import APIBaseTest, ClickhouseTestMixin, _create_event, flush_persons_and_events
+
+
+class TestTrendsBucketCache(ClickhouseTestMixin, APIBaseTest):
+    maxDiff = None
+
+    def _create_events(self, timestamps, properties=None):
+        for timestamp in timestamps:
+            _create_event(
+                team=self.team, event="$pageview", distinct_id="p1", timestamp=timestamp, properties=properties or {}
+            )
+        flush_persons_and_events()
+
+    def _run(self, date_from="-7d", refresh_requested=False, strict_caching_teams="all", **kwargs):
+        query = TrendsQuery(
+            dateRange=DateRange(date_from=date_from),
+            interval=IntervalType.day,
+            series=[EventsNode(event="$pageview")],
+            **kwargs,
+        )
+        with self.settings(TRENDS_BUCKET_CACHE_ENABLED=True), override_instance_config(
+            "STRICT_CACHING_TEAMS", strict_caching_teams
+        ), patch.object(
+            TrendsQueryRunner,
+            "_execute_series_query",
+            autospec=True,
+            side_effect=TrendsQueryRunner._execute_series_query,
+        ) as execute_series_query:
+            runner = TrendsQueryRunner(team=self.team, query=query)
+            runner.refresh_requested = refresh_requested
+            response = runner.calculate()
+        return response.results, execute_series_query
+
+    def _run_uncached(self, date_from="-7d", **kwargs):
+        query = TrendsQuery(
+            dateRange=DateRange(date_from=date_from),
+            interval=IntervalType.day,
+            series=[EventsNode(event="$pageview")],
+            **kwargs,
+        )
+        with self.settings(TRENDS_BUCKET_CACHE_ENABLED=False):
+            return TrendsQueryRunner(team=self.team, query=query).calculate().results
+
+    def _browser_breakdown(self) -> BreakdownFilter:
+        PropertyDefinition.objects.create(
+            team=self.team, name="browser", property_type="String", type=PropertyDefinition.Type.EVENT
+        )
+        return BreakdownFilter(breakdown="browser", breakdown_type="event")
+
+    def _queried_date_from(self, execute_series_query) -> str:
+        query_date_range = execute_series_query.call_args.args[3]
+        return query_date_range.date_from_str
+
+    def test_only_queries_buckets_after_the_last_cached_one(self):
+        self._create_events(["2020-01-08T12:00:00Z", "2020-01-09T12:00:00Z", "2020-01-10T10:00:00Z"])
+        with freeze_time("2020-01-10T11:00:00Z"):
+            results, _ = self._run()
+        self.assertEqual(results[0]["data"], [0, 0, 0, 0, 0, 1, 1, 1])
+
+        self._create_events(["2020-01-09T13:00:00Z", "2020-01-10T12:00:00Z", "2020-01-11T12:00:00Z"])
+        with freeze_time("2020-01-11T13:00:00Z"):
+            results, execute_series_query = self._run()
+            uncached_results = self._run_uncached()
+
+        # The event added to an already complete bucket isn't queried again
+        self.assertEqual(results[0]["data"], [0, 0, 0, 0, 1, 1, 2, 1])
+        self.assertEqual(uncached_results[0]["data"], [0, 0, 0, 0, 1, 2, 2, 1])
+        self.assertEqual(results[0]["days"], uncached_results[0]["days"])
+        self.assertEqual(self._queried_date_from(execute_series_query), "2020-01-10 00:00:00")
+
+        # Until the insight is refreshed
+        with freeze_time("2020-01-11T13:00:00Z"):
+            refreshed_results, execute_series_query = self._run(refresh_requested=True)
+            cached_results, _ = self._run()
+        self.assertEqual(refreshed_results[0]["data"], uncached_results[0]["data"])
+        self.assertEqual(self._queried_date_from(execute_series_query), "2020-01-04 00:00:00")
+        self.assertEqual(cached_results[0]["data"], uncached_results[0]["data"])
+
+    def test_only_reuses_buckets_for_teams_with_strict_caching(self):
+        self._create_events(["2020-01-09T12:00:00Z"])
+        with freeze_time("2020-01-10T11:00:00Z"):
+            self._run(strict_caching_teams="")
+            _, execute_series_query = self._run(strict_caching_teams="")
+
+        self.assertEqual(self._queried_date_from(execute_series_query), "2020-01-03 00:00:00")
+
+    def test_queries_whole_date_range_when_cached_buckets_start_later(self):
+        self._create_events(["2020-01-02T12:00:00Z", "2020-01-09T12:00:00Z"])
+        with freeze_time("2020-01-10T11:00:00Z"):
+            self._run()
+            results, execute_series_query = self._run(date_from="-14d")
+
+        self.assertEqual(sum(results[0]["data"]), 2)
+        self.assertEqual(self._queried_date_from(execute_series_query), "2019-12-27 00:00:00")
+
+    def test_merges_breakdown_buckets(self):
+        self._create_events(["2020-01-08T12:00:00Z", "2020-01-10T10:00:00Z"], properties={"browser": "Chrome"})
+        self._create_events(["2020-01-09T12:00:00Z"], properties={"browser": "Safari"})
+        breakdown = self._browser_breakdown()
+        with freeze_time("2020-01-10T11:00:00Z"):
+            self._run(breakdown=breakdown)
+
+        self._create_events(["2020-01-11T12:00:00Z"], properties={"browser": "Safari"})
+        with freeze_time("2020-01-11T13:00:00Z"):
+            results, execute_series_query = self._run(breakdown=breakdown)
+            uncached_results = self._run_uncached(breakdown=breakdown)
+
+        self.assertEqual(
+            [(result["breakdown_value"], result["data"]) for result in results],
+            [(result["breakdown_value"], result["data"]) for result in uncached_results],
+        )
+        self.assertEqual(self._queried_date_from(execute_series_query), "2020-01-10 00:00:00")
+
+    def test_queries_whole_date_range_when_breakdown_values_change(self):
+        self._create_events(["2020-01-08T12:00:00Z"], properties={"browser": "Chrome"})
+        breakdown = self._browser_breakdown()
+        with freeze_time("2020-01-10T11:00:00Z"):
+            self._run(breakdown=breakdown)
+
+        self._create_events(["2020-01-11T12:00:00Z"], properties={"browser": "Safari"})
+        with freeze_time("2020-01-11T13:00:00Z"):
+            results, execute_series_query = self._run(breakdown=breakdown)
+
+        self.assertEqual(sorted(result["breakdown_value"] for result in results), ["Chrome", "Safari"])
+        self.assertEqual(execute_series_query.call_count, 2)
+        self.assertEqual(self._queried_date_from(execute_series_query), "2020-01-04 00:00:00")
+
+    def test_merges_breakdown_values_found_in_the_series_query(self):
+        self._create_events(["2020-01-08T12:00:00Z", "2020-01-10T10:00:00Z"], properties={"browser": "Chrome"})
+        self._create_events(["2020-01-09T12:00:00Z"], properties={"browser": "Safari"})
+        breakdown = self._browser_breakdown()
+        with self.settings(TRENDS_BREAKDOWN_SINGLE_QUERY_ENABLED=True):
+            with freeze_time("2020-01-10T11:00:00Z"):
+                self._run(breakdown=breakdown)
+
+            # Safari has no events in the queried buckets, and Edge none in the cached ones
+            self._create_events(["2020-01-11T12:00:00Z"], properties={"browser": "Edge"})
+            with freeze_time("2020-01-11T13:00:00Z"):
+                results, execute_series_query = self._run(breakdown=breakdown)
+                uncached_results = self._run_uncached(breakdown=breakdown)
+
+        self.assertEqual(
+            [(result["breakdown_value"], result["data"]) for result in results],
+            [(result["breakdown_value"], result["data"]) for result in uncached_results],
+        )
+        self.assertEqual([result["breakdown_value"] for result in results], ["Chrome", "Edge", "Safari"])
+        self.assertEqual(execute_series_query.call_count, 1)
+        self.assertEqual(self._queried_date_from(execute_series_query), "2020-01-10 00:00:00")
+
+    def test_caches_previous_period_separately(self):
+        self._create_events(["2020-01-01T12:00:00Z", "2020-01-09T12:00:00Z"])
+        trends_filter = TrendsFilter(compare=True)
+        with freeze_time("2020-01-10T11:00:00Z"):
+            self._run(trendsFilter=trends_filter)
+        with freeze_time("2020-01-10T12:00:00Z"):
+            results, _ = self._run(trendsFilter=trends_filter)
+            uncached_results = self._run_uncached(trendsFilter=trends_filter)
+
+        self.assertEqual(
+            [(result["compare_label"], result["data"]) for result in results],
+            [(result["compare_label"], result["data"]) for result in uncached_results],
+        )
@@ -0,0 +1,143 @@
+from unittest.mock import patch
+
+from freezegun import freeze_time
+
+from posthog.clickhouse.client.connection import concurrent_query_worker
+from posthog.hogql_queries.insights.trends.trends_query_runner import TrendsQueryRunner
+from posthog.hogql_queries.insights.trends.breakdown_values import BreakdownValues
+from posthog.models.property_definition import PropertyDefinition
+from posthog.schema import BreakdownFilter, DateRange, EventsNode, IntervalType, TrendsFilter, TrendsQuery
+from posthog.test.base import APIBaseTest, ClickhouseTestMixin, _create_event, flush_persons_and_events
+
+
+class TestTrendsQueryRunner(ClickhouseTestMixin, APIBaseTest):
+    maxDiff = None
+
+    def _create_events(self):
+        for event, timestamps, browser in [
+            ("$pageview", ["2020-01-08T12:00:00Z", "2020-01-09T12:00:00Z"], "Chrome"),
+            ("$pageview", ["2020-01-09T13:00:00Z"], "Safari"),
+            ("$pageleave", ["2020-01-09T12:00:00Z"], "Chrome"),
+        ]:
+            for timestamp in timestamps:
+                _create_event(
+                    team=self.team, event=event, distinct_id="p1", timestamp=timestamp, properties={"browser": browser}
+                )
+        flush_persons_and_events()
+
+    def _create_query_runner(self, **kwargs) -> TrendsQueryRunner:
+        query = TrendsQuery(
+            dateRange=DateRange(date_from="-7d"),
+            interval=IntervalType.day,
+            series=[EventsNode(event="$pageview"), EventsNode(event="$pageleave")],
+            trendsFilter=TrendsFilter(compare=True),
+            **kwargs,
+        )
+        return TrendsQueryRunner(team=self.team, query=query)
+
+    @freeze_time("2020-01-10T12:00:00Z")
+    def test_calculates_series_concurrently(self):
+        self._create_events()
+
+        with self.settings(TRENDS_SERIES_MAX_WORKERS=1):
+            sequential_results = self._create_query_runner().calculate().results
+        with self.settings(TRENDS_SERIES_MAX_WORKERS=3):
+            query_runner = self._create_query_runner()
+            concurrent_results = query_runner.calculate().results
+
+        self.assertEqual(
+            [(result["label"], result["compare_label"], result["data"]) for result in concurrent_results],
+            [(result["label"], result["compare_label"], result["data"]) for result in sequential_results],
+        )
+        self.assertEqual(
+            [(result["label"], result["compare_label"], sum(result["data"])) for result in concurrent_results],
+            [
+                ("$pageview", "current", 3),
+                ("$pageview", "previous", 0),
+                ("$pageleave", "current", 1),
+                ("$pageleave", "previous", 0),
+            ],
+        )
+        timings = query_runner.timings.to_dict()
+        self.assertIn("./series/0/trends_query", timings)
+        self.assertIn("./series/3/trends_query", timings)
+
+    def test_limits_concurrency_to_team_connections(self):
+        with self.settings(
+            TRENDS_SERIES_MAX_WORKERS=3, CLICKHOUSE_PER_TEAM_SETTINGS={str(self.team.pk): {"connections_max": 1}}
+        ), patch.object(TrendsQueryRunner, "calculate_series", return_value=([], [])):
+            query_runner = self._create_query_runner()
+            query_runner.calculate()
+
+        self.assertNotIn("./series", query_runner.timings.to_dict())
+
+    def test_calculates_series_serially_in_concurrent_workers(self):
+        with self.settings(TRENDS_SERIES_MAX_WORKERS=3), patch.object(
+            TrendsQueryRunner, "calculate_series", return_value=([], [])
+        ), concurrent_query_worker():
+            query_runner = self._create_query_runner()
+            query_runner.calculate()
+
+        self.assertNotIn("./series", query_runner.timings.to_dict())
+
+    @freeze_time("2020-01-10T12:00:00Z")
+    def test_finds_breakdown_values_in_the_series_query(self):
+        self._create_events()
+        PropertyDefinition.objects.create(
+            team=self.team, name="browser", property_type="String", type=PropertyDefinition.Type.EVENT
+        )
+        breakdown = BreakdownFilter(breakdown="browser", breakdown_type="event")
+
+        with self.settings(TRENDS_BREAKDOWN_SINGLE_QUERY_ENABLED=False):
+            separate_query_results = self._create_query_runner(breakdown=breakdown).calculate().results
+        with self.settings(TRENDS_BREAKDOWN_SINGLE_QUERY_ENABLED=True), patch.object(
+            BreakdownValues, "get_breakdown_values"
+        ) as get_breakdown_values:
+            single_query_results = self._create_query_runner(breakdown=breakdown).calculate().results
+
+        get_breakdown_values.assert_not_called()
+        self.assertEqual(
+            [
+                (result["label"], result["compare_label"], result["days"], result["data"])
+                for result in single_query_results
+            ],
+            [
+                (result["label"], result["compare_label"], result["days"], result["data"])
+                for result in separate_query_results
+                # Values without events only have a row when they're found in a query of their own
+                if result["count"] > 0
+            ],
+        )
+        self.assertEqual(
+            [(result["label"], result["compare_label"], result["count"]) for result in single_query_results],
+            [
+                ("$pageview - Chrome", "current", 2),
+                ("$pageview - Safari", "current", 1),
+                ("$pageleave - Chrome", "current", 1),
+            ],
+        )
+
+    @freeze_time("2020-01-10T12:00:00Z")
+    def test_formula_aligns_breakdown_values_of_series(self):
+        self._create_events()
+        PropertyDefinition.objects.create(
+            team=self.team, name="browser", property_type="String", type=PropertyDefinition.Type.EVENT
+        )
+        query = TrendsQuery(
+            dateRange=DateRange(date_from="-7d"),
+            interval=IntervalType.day,
+            series=[EventsNode(event="$pageview"), EventsNode(event="$pageleave")],
+            trendsFilter=TrendsFilter(formula="A+B*10"),
+            breakdown=BreakdownFilter(breakdown="browser", breakdown_type="event"),
+        )
+
+        results = TrendsQueryRunner(team=self.team, query=query).calculate().results
+
+        # There are no $pageleave events on Safari
+        self.assertEqual(
+            [(result["label"], result["breakdown_value"], result["data"][-3:]) for result in results],
+            [
+                ("Formula (A+B*10) - Chrome", "Chrome", [1, 11, 0]),
+                ("Formula (A+B*10) - Safari", "Safari", [0, 1, 0]),
+            ],
+        )
@@ -1,4 +1,7 @@
 from typing import Dict, List, Tuple
+
+from django.conf import settings
+
 from posthog.hogql import ast
 from posthog.hogql.timings import HogQLTimings
 from posthog.hogql_queries.insights.trends.breakdown_values import BreakdownValues
@@ -9,6 +12,19 @@ from posthog.models.team.team import Team
 from posthog.schema import ActionsNode, EventsNode, TrendsQuery
 
 
+def breakdown_values_from_events(query: TrendsQuery) -> bool:
+    """
+    Whether the breakdown values are those of the events the series counts, found in the same query as the series.
+    Histogram buckets are still found in a separate query first, as they depend on all the values.
+    """
+    return (
+        settings.TRENDS_BREAKDOWN_SINGLE_QUERY_ENABLED
+        and query.breakdown is not None
+        and query.breakdown.breakdown is not None
+        and query.breakdown.breakdown_histogram_bin_count is None
+    )
+
+
 class Breakdown:
     query: TrendsQuery
     team: Team
@@ -38,6 +54,10 @@ class Breakdown:
     def is_histogram_breakdown(self) -> bool:
         return self.enabled and self.query.breakdown.breakdown_histogram_bin_count is not None
 
+    @cached_property
+    def values_from_events(self) -> bool:
+        return breakdown_values_from_events(self.query)
+
     def placeholders(self) -> Dict[str, ast.Expr]:
         values = self._breakdown_buckets_ast if self.is_histogram_breakdown else self._breakdown_values_ast
 
@@ -0,0 +1,151 @@
+"""
+Reuse the cached buckets of a trends series, and only query the buckets that changed since.
+
+A 90 day insight refreshed every few minutes would otherwise scan all 90 days to update the last one. Instead, the
+results of each series are cached per bucket, without the date range. When refreshing, the buckets before the last
+cached one are complete, so only the last cached bucket and the ones after it are queried again, and merged with the
+cached ones. If the cached buckets don't cover the requested date range, or the breakdown values changed, the whole
+date range is queried again.
+"""
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from posthog.hogql_queries.insights.trends.series_with_extras import SeriesWithExtras
+from posthog.hogql_queries.utils.query_date_range import QueryDateRange
+from posthog.models.team import Team
+from posthog.schema import TrendsQuery
+from posthog.utils import generate_cache_key
+
+
+class IncrementalQueryDateRange(QueryDateRange):
+    """The end of a date range, from the start of one of its buckets."""
+
+    def __init__(self, query_date_range: QueryDateRange, date_from: datetime) -> None:
+        super().__init__(
+            query_date_range._date_range,
+            query_date_range._team,
+            query_date_range._interval,
+            query_date_range._now_without_timezone,
+        )
+        self._query_date_range = query_date_range
+        self._date_from = date_from
+
+    def date_from(self) -> datetime:
+        return self._date_from
+
+    def date_to(self) -> datetime:
+        return self._query_date_range.date_to()
+
+
+def bucket_cache_key(
+    query: TrendsQuery, series: SeriesWithExtras, team: Team, breakdown_values_from_events: bool = False
+) -> str:
+    # Neither the date range nor the trends filter change the value of a bucket
+    query_json = query.model_dump_json(exclude={"dateRange", "series", "trendsFilter"}, exclude_none=True)
+    series_json = series.series.model_dump_json(exclude_none=True)
+    return generate_cache_key(
+        f"trends_buckets_{query_json}_{series_json}_{series.is_previous_period_series}_{breakdown_values_from_events}"
+        f"_{team.pk}_{team.timezone}"
+    )
+
+
+def bucket_start(value: date | datetime, timezone_info: ZoneInfo) -> datetime:
+    if not isinstance(value, datetime):
+        return datetime.combine(value, time.min, tzinfo=timezone_info)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone_info)
+    return value.astimezone(timezone_info)
+
+
+def get_incremental_date_range(
+    cached_buckets: Optional[Dict[str, Any]], query_date_range: QueryDateRange
+) -> Optional[IncrementalQueryDateRange]:
+    """The part of `query_date_range` that isn't complete in `cached_buckets`, or None if all of it must be queried."""
+    if not cached_buckets or not cached_buckets["results"] or not cached_buckets["results"][0][0]:
+        return None
+
+    timezone_info = query_date_range._team.timezone_info
+    date_from = query_date_range.date_from()
+    cached_date_from = cached_buckets["date_from"]
+    cached_starts = [bucket_start(day, timezone_info) for day in cached_buckets["results"][0][0]]
+
+    # When starting later than the cached buckets, `date_from` must start a bucket, so that the cached one holds
+    # the same events as the requested one
+    if cached_date_from > date_from or (cached_date_from != date_from and date_from not in cached_starts):
+        return None
+    # The last cached bucket might have been incomplete when it was cached
+    last_cached_start = cached_starts[-1]
+    if last_cached_start < date_from or last_cached_start > query_date_range.date_to():
+        return None
+
+    return IncrementalQueryDateRange(query_date_range, last_cached_start)
+
+
+def merge_bucket_results(
+    cached_buckets: Dict[str, Any],
+    results: List[Any],
+    incremental_date_range: IncrementalQueryDateRange,
+    has_breakdown: bool,
+    breakdown_values_from_events: bool = False,
+) -> Optional[List[Any]]:
+    """
+    Rows of cached buckets before `incremental_date_range`, followed by the queried buckets in `results`. Returns None
+    if they can't be merged into the rows a query of the whole date range would return.
+
+    Breakdown values found in the same query as the series only have rows when they have events. Then, a value
+    missing from the cached or the queried rows had no events in those buckets, and gets zeros for them.
+    """
+    timezone_info = incremental_date_range._team.timezone_info
+    date_from = incremental_date_range._query_date_range.date_from()
+    incremental_date_from = incremental_date_range.date_from()
+    keep_earlier_buckets = cached_buckets["date_from"] == date_from
+
+    earlier_rows: Dict[Any, Tuple[List[Any], List[Any]]] = {}
+    for row in cached_buckets["results"]:
+        days: List[Any] = []
+        data: List[Any] = []
+        for day, value in zip(row[0], row[1]):
+            start = bucket_start(day, timezone_info)
+            if start < incremental_date_from and (keep_earlier_buckets or start >= date_from):
+                days.append(day)
+                data.append(value)
+        earlier_rows[row[2] if has_breakdown else None] = (days, data)
+    queried_rows = {row[2] if has_breakdown else None: (list(row[0]), list(row[1])) for row in results}
+
+    breakdown_values = list(queried_rows.keys())
+    if earlier_rows.keys() != queried_rows.keys():
+        if not breakdown_values_from_events or not queried_rows:
+            return None
+
+        earlier_days = _common_days([days for days, _ in earlier_rows.values()])
+        for breakdown_value in queried_rows.keys() - earlier_rows.keys():
+            earlier_rows[breakdown_value] = (earlier_days, [0] * len(earlier_days))
+
+        queried_days = _common_days([days for days, _ in queried_rows.values()])
+        for breakdown_value in earlier_rows.keys() - queried_rows.keys():
+            # When the date range starts later than the cached buckets, a value without events in the remaining
+            # cached buckets might have no row in the whole date range
+            if not keep_earlier_buckets and not any(earlier_rows[breakdown_value][1]):
+                return None
+            queried_rows[breakdown_value] = (queried_days, [0] * len(queried_days))
+
+        # As ordered by ClickHouse
+        breakdown_values = sorted(queried_rows.keys(), key=lambda value: (value is None, value))
+
+    merged_results = []
+    for breakdown_value in breakdown_values:
+        earlier_days, earlier_data = earlier_rows[breakdown_value]
+        queried_days, queried_data = queried_rows[breakdown_value]
+        row = [earlier_days + queried_days, earlier_data + queried_data]
+        if has_breakdown:
+            row.append(breakdown_value)
+        merged_results.append(row)
+    return merged_results
+
+
+def _common_days(days_of_rows: List[List[Any]]) -> List[Any]:
+    if not days_of_rows:
+        return []
+    common_days = set.intersection(*(set(days) for days in days_of_rows))
+    return [day for day in days_of_rows[0] if day in common_days]
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from posthog.hogql import ast
 from posthog.hogql.parser import parse_expr, parse_select
 from posthog.hogql.property import property_to_expr
@@ -17,6 +17,7 @@ class TrendsQueryBuilder:
     query_date_range: QueryDateRange
     series: EventsNode | ActionsNode
     timings: HogQLTimings
+    breakdown_values_date_range: QueryDateRange
 
     def __init__(
         self,
@@ -25,14 +26,21 @@ class TrendsQueryBuilder:
         query_date_range: QueryDateRange,
         series: EventsNode | ActionsNode,
         timings: HogQLTimings,
+        breakdown_values_date_range: Optional[QueryDateRange] = None,
     ):
         self.query = trends_query
         self.team = team
         self.query_date_range = query_date_range
         self.series = series
         self.timings = timings
+        # When only querying the end of a date range, the breakdown values are still those of the whole range,
+        # unless they're found in the same query as the series
+        self.breakdown_values_date_range = breakdown_values_date_range or query_date_range
 
     def build_query(self) -> ast.SelectUnionQuery:
+        if self._breakdown.values_from_events:
+            return self._breakdown_values_from_events_query(self._get_events_subquery())
+
         date_subqueries = self._get_date_subqueries()
         event_query = self._get_events_subquery()
 
@@ -105,6 +113,42 @@ class TrendsQueryBuilder:
             )
         ]
 
+    def _breakdown_values_from_events_query(self, events_query: ast.SelectQuery) -> ast.SelectQuery:
+        # Each breakdown value with events gets a row, with zeros for the days it has no events on. This finds the
+        # breakdown values in the same pass over the events as the series, instead of in a separate query.
+        return parse_select(
+            """
+                SELECT
+                    arraySort(arrayDistinct(arrayConcat({days}, day_starts))) AS date,
+                    arrayMap(day -> arraySum(arrayFilter((t, d) -> d = day, totals, day_starts)), date) AS total,
+                    breakdown_value
+                FROM (
+                    SELECT
+                        groupArray(day_start) AS day_starts,
+                        groupArray(total) AS totals,
+                        breakdown_value
+                    FROM {events_query}
+                    GROUP BY breakdown_value
+                )
+                ORDER BY breakdown_value ASC
+            """,
+            placeholders={
+                "days": parse_expr(
+                    """
+                        arrayPushFront(
+                            arrayMap(
+                                number -> dateTrunc({interval}, {date_to}) - {number_interval_period},
+                                range(0, coalesce(dateDiff({interval}, {date_from}, {date_to}), 0))
+                            ),
+                            {date_from}
+                        )
+                    """,
+                    placeholders=self.query_date_range.to_placeholders(),
+                ),
+                "events_query": events_query,
+            },
+        )
+
     def _get_events_subquery(self) -> ast.SelectQuery:
         query = parse_select(
             """
@@ -212,7 +256,11 @@ class TrendsQueryBuilder:
             filters.append(property_to_expr(series.properties, self.team))
 
         # Breakdown
-        if self._breakdown.enabled and not self._breakdown.is_histogram_breakdown:
+        if (
+            self._breakdown.enabled
+            and not self._breakdown.is_histogram_breakdown
+            and not self._breakdown.values_from_events
+        ):
             filters.append(self._breakdown.events_where_filter())
 
         if len(filters) == 0:
@@ -237,4 +285,10 @@ class TrendsQueryBuilder:
 
     @cached_property
     def _breakdown(self):
-        return Breakdown(team=self.team, query=self.query, series=self.series, query_date_range=self.query_date_range)
+        return Breakdown(
+            team=self.team,
+            query=self.query,
+            series=self.series,
+            query_date_range=self.breakdown_values_date_range,
+            timings=self.timings,
+        )
@@ -1,37 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from itertools import groupby
 from math import ceil
-from operator import itemgetter
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Tuple
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
 from django.utils.timezone import datetime
+from prometheus_client import Counter
+
 from posthog.caching.insights_api import BASE_MINIMUM_INSIGHT_REFRESH_INTERVAL, REDUCED_MINIMUM_INSIGHT_REFRESH_INTERVAL
 from posthog.caching.utils import is_stale
+from posthog.clickhouse.client.connection import concurrent_query_worker, team_connections_limit
+from posthog.clickhouse.query_tagging import get_query_tags, tag_queries
 
 from posthog.hogql import ast
 from posthog.hogql.query import execute_hogql_query
 from posthog.hogql.timings import HogQLTimings
+from posthog.hogql_queries.insights.trends.breakdown import breakdown_values_from_events
+from posthog.hogql_queries.insights.trends.bucket_cache import (
+    bucket_cache_key,
+    get_incremental_date_range,
+    merge_bucket_results,
+)
 from posthog.hogql_queries.insights.trends.query_builder import TrendsQueryBuilder
 from posthog.hogql_queries.insights.trends.series_with_extras import SeriesWithExtras
-from posthog.hogql_queries.query_runner import QueryRunner
+from posthog.hogql_queries.query_runner import CachedQueryResponse, QueryRunner
 from posthog.hogql_queries.utils.formula_ast import FormulaAST
 from posthog.hogql_queries.utils.query_date_range import QueryDateRange
 from posthog.hogql_queries.utils.query_previous_period_date_range import QueryPreviousPeriodDateRange
 from posthog.models import Team
 from posthog.models.filters.mixins.utils import cached_property
 from posthog.models.property_definition import PropertyDefinition
-from posthog.schema import ActionsNode, EventsNode, HogQLQueryResponse, TrendsQuery, TrendsQueryResponse
+from posthog.schema import (
+    ActionsNode,
+    EventsNode,
+    HogQLQueryResponse,
+    QueryTiming,
+    TrendsQuery,
+    TrendsQueryResponse,
+)
+from posthog.utils import get_safe_cache
+
+TRENDS_BUCKET_CACHE_COUNTER = Counter(
+    "posthog_trends_bucket_cache_total",
+    "Whether a trends series was calculated from its cached buckets, or queried for its whole date range.",
+    labelnames=["cache_hit"],
+)
 
 
 class TrendsQueryRunner(QueryRunner):
     query: TrendsQuery
     query_type = TrendsQuery
     series: List[SeriesWithExtras]
+    max_staleness = timedelta(hours=1)
+    # Refreshes query every bucket again, instead of trusting the cached ones
+    refresh_requested = False
 
     def __init__(self, query: TrendsQuery | Dict[str, Any], team: Team, timings: Optional[HogQLTimings] = None):
         super().__init__(query, team, timings)
         self.series = self.setup_series()
 
+    def run(self, refresh_requested: Optional[bool] = None) -> CachedQueryResponse:
+        self.refresh_requested = bool(refresh_requested)
+        return super().run(refresh_requested)
+
     def _is_stale(self, cached_result_package):
         date_to = self.query_date_range.date_to()
         interval = self.query_date_range.interval_name
@@ -58,47 +91,123 @@ class TrendsQueryRunner(QueryRunner):
         queries = []
         with self.timings.measure("trends_query"):
             for series in self.series:
-                if not series.is_previous_period_series:
-                    query_date_range = self.query_date_range
-                else:
-                    query_date_range = self.query_previous_date_range
-
-                query_builder = TrendsQueryBuilder(self.query, self.team, query_date_range, series.series, self.timings)
+                query_builder = TrendsQueryBuilder(
+                    self.query, self.team, self.series_date_range(series), series.series, self.timings
+                )
                 queries.append(query_builder.build_query())
 
         return queries
 
     def calculate(self):
-        queries = self.to_query()
-
-        res = []
+        series_res = []
         timings = []
 
-        for index, query in enumerate(queries):
-            series_with_extra = self.series[index]
+        for series_with_extra, (results, series_timings) in zip(self.series, self._calculate_all_series()):
+            timings.extend(series_timings)
 
-            response = execute_hogql_query(
-                query_type="TrendsQuery",
-                query=query,
-                team=self.team,
-                timings=self.timings,
-            )
-
-            timings.extend(response.timings)
-
-            res.extend(self.build_series_response(response, series_with_extra))
+            series_res.append(self.build_series_response(results, series_with_extra))
 
         if self.query.trendsFilter is not None and self.query.trendsFilter.formula is not None:
-            res = self.apply_formula(self.query.trendsFilter.formula, res)
+            res = self.apply_formula(self.query.trendsFilter.formula, series_res)
+        else:
+            res = [series_object for series_objects in series_res for series_object in series_objects]
 
         return TrendsQueryResponse(results=res, timings=timings)
 
-    def build_series_response(self, response: HogQLQueryResponse, series: SeriesWithExtras):
-        if response.results is None:
-            return []
+    def _calculate_all_series(self) -> List[Tuple[List[Any], List[QueryTiming]]]:
+        max_workers = min(team_connections_limit(self.team.pk, settings.TRENDS_SERIES_MAX_WORKERS), len(self.series))
+        if max_workers <= 1:
+            return [self.calculate_series(series, self.timings) for series in self.series]
+
+        query_tags = get_query_tags()
+        # Timings can't be measured from many threads at once, so each series gets its own
+        series_timings = [HogQLTimings() for _ in self.series]
+
+        def calculate_series(index: int) -> Tuple[List[Any], List[QueryTiming]]:
+            tag_queries(**query_tags)
+            try:
+                with concurrent_query_worker():
+                    return self.calculate_series(self.series[index], series_timings[index])
+            finally:
+                # Threads of the pool open their own database connections
+                connections.close_all()
+
+        with self.timings.measure("series"):
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trends-series") as executor:
+                results = list(executor.map(calculate_series, range(len(self.series))))
+            for index, timings in enumerate(series_timings):
+                self.timings.add(str(index), timings)
+
+        return results
+
+    def calculate_series(self, series: SeriesWithExtras, timings: HogQLTimings) -> Tuple[List[Any], List[QueryTiming]]:
+        query_date_range = self.series_date_range(series)
+        # Like the legacy trends cache, buckets are only reused for teams that opted into strict caching
+        if not settings.TRENDS_BUCKET_CACHE_ENABLED or not self.team.strict_caching_enabled:
+            response = self._execute_series_query(series, timings, query_date_range)
+            return response.results or [], response.timings or []
+
+        values_from_events = breakdown_values_from_events(self.query)
+        cache_key = bucket_cache_key(self.query, series, self.team, values_from_events)
+        # Late events and changed actions or cohorts only reach the complete buckets when refreshing
+        cached_buckets = None if self.refresh_requested else get_safe_cache(cache_key)
+        incremental_date_range = get_incremental_date_range(cached_buckets, query_date_range)
+
+        results = None
+        series_timings: List[QueryTiming] = []
+        if incremental_date_range is not None:
+            response = self._execute_series_query(series, timings, incremental_date_range, query_date_range)
+            series_timings.extend(response.timings or [])
+            results = merge_bucket_results(
+                cached_buckets,
+                response.results or [],
+                incremental_date_range,
+                self._is_breakdown_enabled(),
+                values_from_events,
+            )
+        TRENDS_BUCKET_CACHE_COUNTER.labels(
+            cache_hit="miss" if incremental_date_range is None else "hit" if results is not None else "mismatch"
+        ).inc()
+
+        if results is None:
+            response = self._execute_series_query(series, timings, query_date_range)
+            series_timings.extend(response.timings or [])
+            results = response.results or []
+
+        cache.set(
+            cache_key,
+            {"date_from": query_date_range.date_from(), "results": results},
+            settings.CACHED_RESULTS_TTL,
+        )
+        return results, series_timings
+
+    def _execute_series_query(
+        self,
+        series: SeriesWithExtras,
+        timings: HogQLTimings,
+        query_date_range: QueryDateRange,
+        breakdown_values_date_range: Optional[QueryDateRange] = None,
+    ) -> HogQLQueryResponse:
+        with timings.measure("trends_query"):
+            query = TrendsQueryBuilder(
+                self.query, self.team, query_date_range, series.series, timings, breakdown_values_date_range
+            ).build_query()
+
+        return execute_hogql_query(
+            query_type="TrendsQuery",
+            query=query,
+            team=self.team,
+            timings=timings,
+        )
 
+    def series_date_range(self, series: SeriesWithExtras) -> QueryDateRange:
+        if series.is_previous_period_series:
+            return self.query_previous_date_range
+        return self.query_date_range
+
+    def build_series_response(self, results: List[Any], series: SeriesWithExtras):
         res = []
-        for val in response.results:
+        for val in results:
             series_object = {
                 "data": val[1],
                 "labels": [item.strftime("%-d-%b-%Y") for item in val[0]],  # TODO: Add back in hour formatting
@@ -131,7 +240,7 @@ class TrendsQueryRunner(QueryRunner):
                 series_object["labels"] = labels
 
             # Modifications for when breakdowns are active
-            if self.query.breakdown is not None and self.query.breakdown.breakdown is not None:
+            if self._is_breakdown_enabled():
                 if self._is_breakdown_field_boolean():
                     remapped_label = self._convert_boolean(val[2])
                     series_object["label"] = "{} - {}".format(series_object["label"], remapped_label)
@@ -170,33 +279,51 @@ class TrendsQueryRunner(QueryRunner):
 
         return [SeriesWithExtras(series, is_previous_period_series=False) for series in self.query.series]
 
-    def apply_formula(self, formula: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def apply_formula(self, formula: str, results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Applies the formula to the results of each series, given in the order of `self.series`."""
         if self.query.trendsFilter is not None and self.query.trendsFilter.compare:
-            sorted_results = sorted(results, key=itemgetter("compare_label"))
             res = []
-            for _, group in groupby(sorted_results, key=itemgetter("compare_label")):
-                group_list = list(group)
-
-                series_data = map(lambda s: s["data"], group_list)
-                new_series_data = FormulaAST(series_data).call(formula)
+            for is_previous_period in (False, True):
+                period_results = [
+                    series_results
+                    for series, series_results in zip(self.series, results)
+                    if bool(series.is_previous_period_series) == is_previous_period
+                ]
+                res.extend(self._apply_formula_to_series(formula, period_results))
+            return res
 
-                new_result = group_list[0]
-                new_result["data"] = new_series_data
-                new_result["count"] = float(sum(new_series_data))
-                new_result["label"] = f"Formula ({formula})"
+        return self._apply_formula_to_series(formula, results)
 
-                res.append(new_result)
-            return res
+    def _apply_formula_to_series(self, formula: str, results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        # Rows of the same breakdown value are evaluated together, with zeros for series without a row for it
+        rows_by_breakdown_value: Dict[Any, List[Optional[Dict[str, Any]]]] = {}
+        for index, series_results in enumerate(results):
+            for series_object in series_results:
+                breakdown_value = series_object.get("breakdown_value")
+                rows_by_breakdown_value.setdefault(breakdown_value, [None] * len(results))[index] = series_object
+        if not rows_by_breakdown_value:
+            return []
 
-        series_data = map(lambda s: s["data"], results)
-        new_series_data = FormulaAST(series_data).call(formula)
-        new_result = results[0]
+        series_data = [
+            [rows[index]["data"] if rows[index] is not None else [] for rows in rows_by_breakdown_value.values()]
+            for index in range(len(results))
+        ]
+        formula_data = FormulaAST(series_data).call(formula)
 
-        new_result["data"] = new_series_data
-        new_result["count"] = float(sum(new_series_data))
-        new_result["label"] = f"Formula ({formula})"
+        res = []
+        for (breakdown_value, rows), new_series_data in zip(rows_by_breakdown_value.items(), formula_data):
+            new_result = next(row for row in rows if row is not None)
+            new_result["data"] = new_series_data
+            new_result["count"] = float(sum(new_series_data))
+            new_result["label"] = f"Formula ({formula})"
+            if self._is_breakdown_enabled():
+                new_result["label"] = "{} - {}".format(new_result["label"], breakdown_value)
+
+            res.append(new_result)
+        return res
 
-        return [new_result]
+    def _is_breakdown_enabled(self) -> bool:
+        return self.query.breakdown is not None and self.query.breakdown.breakdown is not None
 
     def _is_breakdown_field_boolean(self):
         if self.query.breakdown.breakdown_type == "person":
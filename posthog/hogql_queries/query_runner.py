@@ -1,12 +1,17 @@
 from abc import ABC, abstractmethod
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Generic, List, Optional, Type, Dict, TypeVar, Union, Tuple, cast
+from zoneinfo import ZoneInfo
+
+from dateutil.parser import isoparse
 
 from django.conf import settings
 from django.core.cache import cache
 from prometheus_client import Counter
 from pydantic import BaseModel, ConfigDict
 
+from posthog.caching.single_flight import single_flight
+from posthog.caching.stale_while_revalidate import finish_background_refresh, queue_background_refresh
 from posthog.clickhouse.query_tagging import tag_queries
 from posthog.hogql import ast
 from posthog.hogql.context import HogQLContext
@@ -60,6 +65,8 @@ class CachedQueryResponse(QueryResponse):
         extra="forbid",
     )
     is_cached: bool
+    # Whether this is a stale result, served while a fresh one is calculated in the background
+    is_stale: bool = False
     last_refresh: str
     next_allowed_client_refresh: str
 
@@ -126,11 +133,24 @@ def get_query_runner(
     raise ValueError(f"Can't get a runner for an unknown query kind: {kind}")
 
 
+def refresh_query_cache(team_id: int, query: Dict[str, Any]) -> None:
+    """Calculate a query again and cache the result, after a stale result of it was served."""
+    team = Team.objects.get(pk=team_id)
+    query_runner = get_query_runner(query, team)
+    try:
+        query_runner.run(refresh_requested=True)
+    finally:
+        finish_background_refresh(query_runner._cache_key())
+
+
 class QueryRunner(ABC):
     query: RunnableQueryNode
     query_type: Type[RunnableQueryNode]
     team: Team
     timings: HogQLTimings
+    # How old a stale cached result can be to still be served, while it's refreshed in the background.
+    # Stale results are calculated again right away if None.
+    max_staleness: Optional[timedelta] = None
 
     def __init__(self, query: RunnableQueryNode | Dict[str, Any], team: Team, timings: Optional[HogQLTimings] = None):
         self.team = team
@@ -150,18 +170,51 @@ class QueryRunner(ABC):
         cache_key = self._cache_key()
         tag_queries(cache_key=cache_key)
 
+        cached_response = None
         if not refresh_requested:
             cached_response = get_safe_cache(cache_key)
             if cached_response:
                 if not self._is_stale(cached_response):
                     QUERY_CACHE_HIT_COUNTER.labels(team_id=self.team.pk, cache_hit="hit").inc()
                     cached_response.is_cached = True
+                    cached_response.is_stale = False
+                    return cached_response
+                elif self._can_serve_stale(cached_response):
+                    QUERY_CACHE_HIT_COUNTER.labels(team_id=self.team.pk, cache_hit="stale_served").inc()
+                    queue_background_refresh("query", cache_key, self._queue_refresh)
+                    cached_response.is_cached = True
+                    cached_response.is_stale = True
                     return cached_response
                 else:
                     QUERY_CACHE_HIT_COUNTER.labels(team_id=self.team.pk, cache_hit="stale").inc()
             else:
                 QUERY_CACHE_HIT_COUNTER.labels(team_id=self.team.pk, cache_hit="miss").inc()
 
+        # Only one process calculates the same query at a time, the others wait for a newer result than this one
+        if refresh_requested:
+            cached_response = get_safe_cache(cache_key)
+        previous_refresh = cached_response.last_refresh if cached_response else None
+
+        def get_calculated_response() -> Optional[CachedQueryResponse]:
+            calculated_response = get_safe_cache(cache_key)
+            if calculated_response and calculated_response.last_refresh != previous_refresh:
+                calculated_response.is_cached = True
+                return calculated_response
+            return None
+
+        return single_flight("query", cache_key, lambda: self._calculate_and_cache(cache_key), get_calculated_response)
+
+    def _can_serve_stale(self, cached_response: CachedQueryResponse) -> bool:
+        if not settings.STALE_WHILE_REVALIDATE_ENABLED or self.max_staleness is None:
+            return False
+        return datetime.now(tz=ZoneInfo("UTC")) - isoparse(cached_response.last_refresh) <= self.max_staleness
+
+    def _queue_refresh(self) -> None:
+        from posthog.celery import refresh_query_cache_task
+
+        refresh_query_cache_task.delay(self.team.pk, self.query.model_dump(mode="json"))
+
+    def _calculate_and_cache(self, cache_key: str) -> CachedQueryResponse:
         fresh_response_dict = cast(QueryResponse, self.calculate()).model_dump()
         fresh_response_dict["is_cached"] = False
         fresh_response_dict["last_refresh"] = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -1,13 +1,20 @@
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Any, List, Literal, Optional, Type
+from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
 from dateutil.parser import isoparse
 from freezegun import freeze_time
 from pydantic import BaseModel
 
-from posthog.hogql_queries.query_runner import QueryResponse, QueryRunner, RunnableQueryNode
+from django.core.cache import cache
+from django.test import override_settings
+
+from posthog.hogql_queries.query_runner import CachedQueryResponse, QueryResponse, QueryRunner, RunnableQueryNode
 from posthog.models.team.team import Team
+from posthog.redis import get_client
 from posthog.test.base import BaseTest
 
 
@@ -139,3 +146,89 @@ class TestQueryRunner(BaseTest):
             # returns fresh response if stale
             response = runner.run(refresh_requested=False)
             self.assertEqual(response.is_cached, False)
+
+    def test_waits_for_concurrent_calculation(self):
+        TestQueryRunner = self.setup_test_query_runner_class()
+        runner = TestQueryRunner(query={"some_attr": "bla"}, team=self.team)  # type: ignore
+        cache_key = runner._cache_key()
+        redis = get_client()
+        lock = redis.lock(f"single_flight_lock:{cache_key}", timeout=10)
+        self.assertTrue(lock.acquire(blocking=False))
+
+        def calculate_in_other_process():
+            time.sleep(0.2)
+            response = CachedQueryResponse(
+                results=["from other process"],
+                is_cached=False,
+                last_refresh=datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
+                next_allowed_client_refresh=datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            )
+            cache.set(cache_key, response)
+            lock.release()
+            redis.publish(f"single_flight_done:{cache_key}", "done")
+
+        other_process = threading.Thread(target=calculate_in_other_process)
+        other_process.start()
+        with patch.object(TestQueryRunner, "calculate") as calculate:
+            response = runner.run(refresh_requested=False)
+        other_process.join()
+
+        calculate.assert_not_called()
+        self.assertEqual(response.results, ["from other process"])
+        self.assertEqual(response.is_cached, True)
+
+    @patch("posthog.caching.single_flight.SINGLE_FLIGHT_WAIT_TIMEOUT", 0.2)
+    def test_calculates_when_concurrent_calculation_times_out(self):
+        TestQueryRunner = self.setup_test_query_runner_class()
+        runner = TestQueryRunner(query={"some_attr": "bla"}, team=self.team)  # type: ignore
+        lock = get_client().lock(f"single_flight_lock:{runner._cache_key()}", timeout=10)
+        self.assertTrue(lock.acquire(blocking=False))
+
+        try:
+            response = runner.run(refresh_requested=False)
+        finally:
+            lock.release()
+
+        self.assertEqual(response.results, [])
+        self.assertEqual(response.is_cached, False)
+
+    @override_settings(STALE_WHILE_REVALIDATE_ENABLED=True)
+    def test_serves_stale_response_and_refreshes_in_background(self):
+        TestQueryRunner = self.setup_test_query_runner_class()
+        TestQueryRunner.max_staleness = timedelta(hours=1)
+        runner = TestQueryRunner(query={"some_attr": "bla"}, team=self.team)  # type: ignore
+
+        with freeze_time(datetime(2023, 2, 4, 13, 37, 42)):
+            runner.run(refresh_requested=False)
+
+        with freeze_time(datetime(2023, 2, 4, 13, 37 + 11, 42)), patch(
+            "posthog.celery.refresh_query_cache_task.delay"
+        ) as refresh, patch.object(TestQueryRunner, "calculate") as calculate:
+            response = runner.run(refresh_requested=False)
+            self.assertEqual(response.is_cached, True)
+            self.assertEqual(response.is_stale, True)
+            self.assertEqual(response.last_refresh, "2023-02-04T13:37:42Z")
+
+            # the refresh is only queued once
+            runner.run(refresh_requested=False)
+
+        calculate.assert_not_called()
+        refresh.assert_called_once_with(self.team.pk, {"kind": "TestQuery", "some_attr": "bla", "other_attr": []})
+
+    @override_settings(STALE_WHILE_REVALIDATE_ENABLED=True)
+    def test_calculates_response_older_than_max_staleness(self):
+        TestQueryRunner = self.setup_test_query_runner_class()
+        TestQueryRunner.max_staleness = timedelta(hours=1)
+        runner = TestQueryRunner(query={"some_attr": "bla"}, team=self.team)  # type: ignore
+
+        with freeze_time(datetime(2023, 2, 4, 13, 37, 42)):
+            runner.run(refresh_requested=False)
+
+        with freeze_time(datetime(2023, 2, 4, 15, 37, 42)), patch(
+            "posthog.celery.refresh_query_cache_task.delay"
+        ) as refresh:
+            response = runner.run(refresh_requested=False)
+
+        refresh.assert_not_called()
+        self.assertEqual(response.is_cached, False)
+        self.assertEqual(response.is_stale, False)
@@ -1,9 +1,19 @@
 import ast
 import operator
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
 
 
 class FormulaAST:
+    """
+    Evaluates a formula over the data of series, named `A`, `B`... in order. The formula is parsed once, and evaluated
+    over all data points at once with NumPy.
+
+    The data of a series is either a list of values, or a list of rows of values, e.g. one per breakdown value.
+    Missing values, e.g. of shorter rows, are zeros. Divisions by zero result in zero.
+    """
+
     op_map = {
         ast.Add: operator.add,
         ast.Sub: operator.sub,
@@ -12,28 +22,44 @@ class FormulaAST:
         ast.Mod: operator.mod,
         ast.Pow: operator.pow,
     }
-    zipped_data: List[tuple[float]]
+    data: List[np.ndarray]
+    has_rows: bool
+
+    def __init__(self, data: Iterable[Sequence[Any]]):
+        data = list(data)
+        self.has_rows = any(len(series) > 0 and isinstance(series[0], (list, tuple)) for series in data)
+        series_rows = [[list(row) for row in series] if self.has_rows else [list(series)] for series in data]
+
+        row_count = max((len(rows) for rows in series_rows), default=0)
+        length = max((len(row) for rows in series_rows for row in rows), default=0)
+        values = [np.asarray(row) for rows in series_rows for row in rows if len(row) > 0]
+        dtype = np.result_type(*values) if values else np.dtype(np.int64)
+        if dtype.kind not in "iuf":
+            dtype = np.dtype(np.float64)
 
-    def __init__(self, data: List[List[float]]):
-        self.zipped_data = list(zip(*data))
+        self.data = []
+        for rows in series_rows:
+            matrix = np.zeros((row_count, length), dtype=dtype)
+            for index, row in enumerate(rows):
+                matrix[index, : len(row)] = row
+            self.data.append(matrix)
 
     def call(self, node: str):
-        res = []
-        for consts in self.zipped_data:
-            map = {}
-            for index, value in enumerate(consts):
-                map[chr(ord("`") + index + 1)] = value
-            result = self._evaluate(node.lower(), map)
-            res.append(result)
-        return res
+        if not self.data:
+            return []
+
+        const_map = {chr(ord("`") + index + 1): matrix for index, matrix in enumerate(self.data)}
+        with np.errstate(all="ignore"):
+            result = np.broadcast_to(self._evaluate(ast.parse(node.lower()), const_map), self.data[0].shape)
+        if result.dtype.kind == "f":
+            result = np.where(np.isfinite(result), result, 0.0)
+
+        return result.tolist() if self.has_rows else result[0].tolist()
 
     def _evaluate(self, node, const_map: Dict[str, Any]):
         if isinstance(node, (list, tuple)):
             return [self._evaluate(sub_node, const_map) for sub_node in node]
 
-        elif isinstance(node, str):
-            return self._evaluate(ast.parse(node), const_map)
-
         elif isinstance(node, ast.Module):
             values = []
             for body in node.body:
@@ -51,12 +77,20 @@ class FormulaAST:
             right = self._evaluate(node.right, const_map)
 
             try:
-                return self.op_map[type(op)](left, right)
+                operation = self.op_map[type(op)]
             except KeyError:
                 raise ValueError(f"Operator {op.__class__.__name__} not supported")
+            # NumPy doesn't raise integers to negative powers
+            if operation is operator.pow and np.any(np.asarray(right) < 0):
+                return np.float_power(left, right)
+            return operation(np.asarray(left), right)
+
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+            operand = np.asarray(self._evaluate(node.operand, const_map))
+            return -operand if isinstance(node.op, ast.USub) else operand
 
-        elif isinstance(node, ast.Num):
-            return node.n
+        elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
 
         elif isinstance(node, ast.Name):
             try:
@@ -51,3 +51,33 @@ class TestFormulaAST(APIBaseTest):
         formula = self._get_formula_ast()
         response = formula.call("a+b")
         self.assertListEqual([2, 4, 6, 8], response)
+
+    def test_unary_operators(self):
+        formula = self._get_formula_ast()
+        response = formula.call("-A+2")
+        self.assertListEqual([1, 0, -1, -2], response)
+
+    def test_negative_power(self):
+        formula = self._get_formula_ast()
+        response = formula.call("A**-1")
+        self.assertListEqual([1, 0.5, 1 / 3, 0.25], response)
+
+    def test_division_by_zero(self):
+        formula = FormulaAST(data=[[1, 0, 3], [0, 0, 3]])
+        self.assertListEqual([0, 0, 1], formula.call("A/B"))
+        self.assertListEqual([0, 0, 0], formula.call("A%B"))
+
+    def test_shorter_series_are_padded_with_zeros(self):
+        formula = FormulaAST(data=[[1, 2, 3], [1]])
+        response = formula.call("A+B")
+        self.assertListEqual([2, 2, 3], response)
+
+    def test_rows(self):
+        formula = FormulaAST(data=[[[1, 2], [3, 4]], [[1, 1]]])
+        response = formula.call("A*10+B")
+        self.assertListEqual([[11, 21], [30, 40]], response)
+
+    def test_unsupported_operator(self):
+        formula = self._get_formula_ast()
+        with self.assertRaises(ValueError):
+            formula.call("A//2")
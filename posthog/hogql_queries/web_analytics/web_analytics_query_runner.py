@@ -1,4 +1,5 @@
 from abc import ABC
+from datetime import timedelta
 from typing import Optional, List, Union, Type
 
 from django.utils.timezone import datetime
@@ -27,6 +28,7 @@ WebQueryNode = Union[
 class WebAnalyticsQueryRunner(QueryRunner, ABC):
     query: WebQueryNode
     query_type: Type[WebQueryNode]
+    max_staleness = timedelta(minutes=5)
 
     def _is_stale(self, cached_result_package):
         return True
@@ -1,6 +1,7 @@
 import json
+import time
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 import kafka.errors
 from django.conf import settings
@@ -73,6 +74,12 @@ class KafkaConsumerForTests:
         return
 
 
+class KafkaMessage(NamedTuple):
+    topic: str
+    data: Any
+    key: Any = None
+
+
 class _KafkaSecurityProtocol(str, Enum):
     PLAINTEXT = "PLAINTEXT"
     SSL = "SSL"
@@ -158,6 +165,30 @@ class _KafkaProducer:
         future.add_callback(self.on_send_success).add_errback(lambda exc: self.on_send_failure(topic=topic, exc=exc))
         return future
 
+    def produce_batch(
+        self,
+        messages: Iterable[KafkaMessage],
+        value_serializer: Optional[Callable[[Any], Any]] = None,
+    ) -> List[FutureRecordMetadata]:
+        """
+        Send all messages without waiting for any acknowledgement in between, so they are batched together by the
+        producer. Use `wait_for_futures` to wait for all of them at once.
+        """
+        return [
+            self.produce(topic=message.topic, data=message.data, key=message.key, value_serializer=value_serializer)
+            for message in messages
+        ]
+
+    @staticmethod
+    def wait_for_futures(futures: Iterable[FutureRecordMetadata], timeout: float) -> None:
+        """
+        Wait for all futures against a single deadline, raising the first `KafkaError`. We don't call `flush` here as
+        that would also wait for messages produced by every other thread sharing this producer.
+        """
+        deadline = time.monotonic() + timeout
+        for future in futures:
+            future.get(timeout=max(deadline - time.monotonic(), 0))
+
     def flush(self, timeout=None):
         self.producer.flush(timeout)
 
@@ -1,9 +1,10 @@
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import kafka
 from django.test import TestCase, override_settings
+from kafka.errors import KafkaError
 
-from posthog.kafka_client.client import _KafkaProducer, build_kafka_consumer
+from posthog.kafka_client.client import KafkaMessage, _KafkaProducer, build_kafka_consumer
 
 
 class KafkaClientTestCase(TestCase):
@@ -20,6 +21,31 @@ class KafkaClientTestCase(TestCase):
         msg = next(consumer)
         self.assertEqual(msg, "message 1 from test_topic topic")
 
+    def test_kafka_produce_batch(self):
+        producer = _KafkaProducer(test=True)
+        with patch.object(producer, "produce", wraps=producer.produce) as produce:
+            futures = producer.produce_batch(
+                [KafkaMessage(topic=self.topic, data=self.payload), KafkaMessage(self.topic, self.payload, "key")]
+            )
+
+        self.assertEqual(len(futures), 2)
+        self.assertEqual(produce.call_args_list[1].kwargs["key"], "key")
+        _KafkaProducer.wait_for_futures(futures, timeout=1)
+
+    def test_wait_for_futures_shares_one_deadline(self):
+        first, second = MagicMock(), MagicMock()
+        with patch("posthog.kafka_client.client.time.monotonic", side_effect=[100, 100, 103]):
+            _KafkaProducer.wait_for_futures([first, second], timeout=5)
+
+        first.get.assert_called_once_with(timeout=5)
+        second.get.assert_called_once_with(timeout=2)
+
+    def test_wait_for_futures_raises_errors(self):
+        failing = MagicMock()
+        failing.get.side_effect = KafkaError("Failed to produce")
+        with self.assertRaises(KafkaError):
+            _KafkaProducer.wait_for_futures([MagicMock(), failing], timeout=1)
+
     def test_kafka_produce(self):
         producer = _KafkaProducer(test=False)
         producer.produce(topic=self.topic, data=self.payload)
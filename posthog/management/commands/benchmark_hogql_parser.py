@@ -0,0 +1,75 @@
+from time import perf_counter
+from typing import Any, Dict, Tuple
+
+from django.core.management.base import BaseCommand
+
+from posthog.hogql import parser
+from posthog.hogql.timings import HogQLTimings
+from posthog.hogql_queries.query_runner import get_query_runner
+from posthog.models import Team
+
+QUERIES: Dict[str, Dict[str, Any]] = {
+    "trends": {
+        "kind": "TrendsQuery",
+        "dateRange": {"date_from": "-7d"},
+        "series": [
+            {"kind": "EventsNode", "event": "$pageview", "math": "total"},
+            {"kind": "EventsNode", "event": "$pageview", "math": "dau"},
+        ],
+    },
+    "trends_breakdown": {
+        "kind": "TrendsQuery",
+        "dateRange": {"date_from": "-30d"},
+        "series": [{"kind": "EventsNode", "event": "$pageview", "math": "total"}],
+        "breakdown": {"breakdown": "$browser", "breakdown_type": "event"},
+    },
+    "web_overview_stats": {"kind": "WebOverviewStatsQuery", "dateRange": {"date_from": "-7d"}, "properties": []},
+    "web_top_pages": {"kind": "WebTopPagesQuery", "dateRange": {"date_from": "-7d"}, "properties": []},
+    "web_top_sources": {"kind": "WebTopSourcesQuery", "dateRange": {"date_from": "-7d"}, "properties": []},
+    "web_top_clicks": {"kind": "WebTopClicksQuery", "dateRange": {"date_from": "-7d"}, "properties": []},
+}
+
+
+def parse_time(timings: HogQLTimings) -> float:
+    return sum(duration for key, duration in timings.to_dict().items() if key.split("/")[-1].startswith("parse_"))
+
+
+class Command(BaseCommand):
+    help = "Measure time spent parsing HogQL in trends and web analytics queries, with and without the parser cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--team-id", type=int, help="Team to build the queries for, defaults to the first team")
+        parser.add_argument("--iterations", type=int, default=50, help="Number of times each query is built")
+
+    def handle(self, *args, **options):
+        team = Team.objects.get(pk=options["team_id"]) if options["team_id"] else Team.objects.order_by("pk").first()
+        if team is None:
+            self.stderr.write("No team to build queries for")
+            return
+
+        iterations = options["iterations"]
+        self.stdout.write(
+            f"{'query':<24}{'cold parse ms':>16}{'warm parse ms':>16}{'cold total ms':>16}{'warm total ms':>16}"
+        )
+        for name, query in QUERIES.items():
+            cold = self._measure(query, team, iterations, clear_cache=True)
+            warm = self._measure(query, team, iterations, clear_cache=False)
+            self.stdout.write(
+                f"{name:<24}{cold[0] * 1000:>16.3f}{warm[0] * 1000:>16.3f}"
+                f"{cold[1] * 1000:>16.3f}{warm[1] * 1000:>16.3f}"
+            )
+
+    def _measure(self, query: Dict[str, Any], team: Team, iterations: int, clear_cache: bool) -> Tuple[float, float]:
+        """Average time per built query spent parsing, and spent building the query overall."""
+        total_parse = total = 0.0
+        # Warm up, so that only parsing is affected by clearing the cache
+        get_query_runner(query, team).to_query()
+        for _ in range(iterations):
+            if clear_cache:
+                parser._parser_cache.clear()
+            timings = HogQLTimings()
+            start = perf_counter()
+            get_query_runner(query, team, timings=timings).to_query()
+            total += perf_counter() - start
+            total_parse += parse_time(timings)
+        return total_parse / iterations, total / iterations
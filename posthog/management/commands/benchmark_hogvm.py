@@ -0,0 +1,62 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from hogvm.python.compiler import compile_bytecode, execute_many
+from hogvm.python.execute import execute_bytecode
+from posthog.hogql.bytecode import to_bytecode
+
+EXPRESSIONS = [
+    "event = '$pageview'",
+    "event = '$pageview' and properties.$current_url like '%/pricing%'",
+    "properties.$browser ilike '%chrome%' or properties.$os =~ '^(Mac|Windows)'",
+    "toInt(properties.$screen_width) >= 1024 and not (properties.email ilike '%@posthog.com')",
+    "concat(properties.$host, properties.$pathname) = 'posthog.com/pricing'",
+]
+
+FIELDS = [
+    {
+        "event": "$pageview" if index % 3 else "$autocapture",
+        "properties": {
+            "$current_url": f"https://posthog.com/{'pricing' if index % 2 else 'blog'}",
+            "$host": "posthog.com",
+            "$pathname": "/pricing" if index % 2 else "/blog",
+            "$browser": "Chrome" if index % 4 else "Safari",
+            "$os": "Mac OS X" if index % 5 else "Linux",
+            "$screen_width": str(800 + index % 1000),
+            "email": f"user{index}@{'posthog.com' if index % 7 else 'example.com'}",
+        },
+    }
+    for index in range(10_000)
+]
+
+
+class Command(BaseCommand):
+    help = "Compare interpreted and compiled HogVM throughput on bytecode of HogQL expressions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3, help="Number of times each expression is measured")
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        for expr in EXPRESSIONS:
+            bytecode = to_bytecode(expr)
+            compile_bytecode(bytecode)  # warm the cache, compilation is a one-off cost
+
+            interpreted = min(
+                timeit.repeat(
+                    lambda bytecode=bytecode: [execute_bytecode(bytecode, fields) for fields in FIELDS],
+                    number=1,
+                    repeat=repeat,
+                )
+            )
+            compiled = min(
+                timeit.repeat(lambda bytecode=bytecode: execute_many(bytecode, FIELDS), number=1, repeat=repeat)
+            )
+
+            self.stdout.write(expr)
+            self.stdout.write(
+                f"  interpreted: {len(FIELDS) / interpreted:>12,.0f} rows/s"
+                f"  compiled: {len(FIELDS) / compiled:>12,.0f} rows/s"
+                f"  speedup: {interpreted / compiled:.1f}x"
+            )
@@ -0,0 +1,61 @@
+import re
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, List
+
+import sqlparse
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posthog.clickhouse.client.execute import SQL_COMMENT_MARKERS, strip_comments
+
+# Comment prepended by `_annotate_tagged_query` after comments were stripped, so not part of the benchmarked query
+ANNOTATION_REGEX = re.compile(r"^/\*[^*]*\*/\s*")
+
+
+def load_snapshot_queries() -> List[str]:
+    """ClickHouse queries from the `__snapshots__` directories, as `_prepare_query` gets them."""
+    queries = []
+    for path in sorted(Path(settings.BASE_DIR).glob("**/__snapshots__/*.ambr")):
+        for snapshot in path.read_text().split("\n---\n"):
+            lines = snapshot.strip("\n").splitlines()
+            # Each snapshot is a name, and a quoted value indented by two spaces
+            if len(lines) < 4 or not lines[0].startswith("# name:") or lines[1].strip() != "'":
+                continue
+            query = ANNOTATION_REGEX.sub("", "\n".join(line[2:] for line in lines[2:-1]).strip())
+            # Skip postgres queries, which quote their identifiers
+            if query.upper().startswith(("SELECT", "WITH", "INSERT")) and '"posthog_' not in query:
+                queries.append(query)
+    return queries
+
+
+def time_per_query(strip: Callable[[str], str], queries: List[str], iterations: int) -> float:
+    start = perf_counter()
+    for _ in range(iterations):
+        for query in queries:
+            strip(query)
+    return (perf_counter() - start) / (iterations * len(queries))
+
+
+class Command(BaseCommand):
+    help = "Measure time spent stripping comments from ClickHouse queries, with sqlparse and with its fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=3, help="Number of times each query is stripped")
+
+    def handle(self, *args, **options):
+        queries = load_snapshot_queries()
+        if not queries:
+            self.stderr.write("No snapshot queries found")
+            return
+
+        iterations = options["iterations"]
+        without_comments = sum(1 for query in queries if not any(marker in query for marker in SQL_COMMENT_MARKERS))
+        sqlparse_time = time_per_query(lambda query: sqlparse.format(query, strip_comments=True), queries, iterations)
+        fast_path_time = time_per_query(strip_comments, queries, iterations)
+
+        self.stdout.write(f"queries: {len(queries)}, without comments: {without_comments}")
+        self.stdout.write(f"average query length: {sum(len(query) for query in queries) // len(queries)} characters")
+        self.stdout.write(f"sqlparse.format: {sqlparse_time * 1000:.3f} ms per query")
+        self.stdout.write(f"strip_comments: {fast_path_time * 1000:.3f} ms per query")
+        self.stdout.write(f"removed overhead: {(sqlparse_time - fast_path_time) * 1000:.3f} ms per query")
@@ -18,7 +18,7 @@ from rest_framework import status
 from statshog.defaults.django import statsd
 
 from posthog.api.capture import get_event
-from posthog.api.decide import get_decide
+from posthog.api.decide import get_decide, get_decide_batch
 from posthog.clickhouse.client.execute import clickhouse_query_counter
 from posthog.clickhouse.query_tagging import QueryCounter, reset_query_tags, tag_queries
 from posthog.cloud_utils import is_cloud
@@ -290,7 +290,8 @@ class ShortCircuitMiddleware:
         )
 
     def __call__(self, request: HttpRequest):
-        if request.path == "/decide/" or request.path == "/decide":
+        if request.path in ("/decide/", "/decide", "/decide/batch/", "/decide/batch"):
+            is_batch = request.path.startswith("/decide/batch")
             try:
                 # :KLUDGE: Manually tag ClickHouse queries as CHMiddleware is skipped
                 tag_queries(
@@ -301,13 +302,15 @@ class ShortCircuitMiddleware:
                     http_referer=request.META.get("HTTP_REFERER"),
                     http_user_agent=request.META.get("HTTP_USER_AGENT"),
                 )
-                if self.decide_throttler.allow_request(request, None):
-                    return get_decide(request)
+                # Batch requests count once per distinct_id, like the /decide requests they replace
+                num_tokens = self.decide_throttler.safely_get_distinct_id_count(request) if is_batch else 1
+                if self.decide_throttler.allow_request(request, None, num_tokens):
+                    return get_decide_batch(request) if is_batch else get_decide(request)
                 else:
                     return cors_response(
                         request,
                         generate_exception_response(
-                            "decide",
+                            "decide_batch" if is_batch else "decide",
                             f"Rate limit exceeded ",
                             code="rate_limit_exceeded",
                             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.19 on 2023-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posthog", "0354_organization_never_drop_data"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportedasset",
+            name="exported_rows",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.19 on 2023-10-19 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posthog", "0355_exportedasset_exported_rows"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="exportedasset",
+            name="export_format",
+            field=models.CharField(
+                choices=[
+                    ("image/png", "image/png"),
+                    ("application/pdf", "application/pdf"),
+                    ("text/csv", "text/csv"),
+                    ("application/vnd.apache.parquet", "application/vnd.apache.parquet"),
+                    ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.stream"),
+                ],
+                max_length=64,
+            ),
+        ),
+    ]
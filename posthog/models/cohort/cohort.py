@@ -1,10 +1,12 @@
+import csv
+import io
 import time
 from datetime import datetime
 from typing import Any, Dict, List, Literal, Optional, cast
 
 import structlog
 from django.conf import settings
-from django.db import connection, models
+from django.db import connection, models, transaction
 from django.db.models import Case, Q, When
 from django.db.models.expressions import F
 from django.utils import timezone
@@ -29,6 +31,49 @@ INSERT INTO "posthog_cohortpeople" ("person_id", "cohort_id", "version")
 ON CONFLICT DO NOTHING
 """
 
+# Rows copied into Postgres, and inserted into ClickHouse, at a time when uploading a static cohort
+STATIC_COHORT_UPLOAD_BATCH_SIZE = 100_000
+
+CREATE_STATIC_COHORT_UPLOAD_TABLE_QUERY = """
+CREATE TEMPORARY TABLE "static_cohort_upload" ("distinct_id" text) ON COMMIT DROP
+"""
+
+COPY_STATIC_COHORT_UPLOAD_QUERY = """
+COPY "static_cohort_upload" ("distinct_id") FROM STDIN WITH (FORMAT csv)
+"""
+
+# Persons of the uploaded distinct IDs that aren't in the cohort yet. Kept after the commit, until they've been
+# inserted into ClickHouse.
+RESOLVE_STATIC_COHORT_UPLOAD_QUERY = """
+CREATE TEMPORARY TABLE "static_cohort_upload_persons" AS
+SELECT DISTINCT "posthog_person"."id", "posthog_person"."uuid"
+FROM "static_cohort_upload"
+JOIN "posthog_persondistinctid"
+    ON "posthog_persondistinctid"."team_id" = %(team_id)s
+    AND "posthog_persondistinctid"."distinct_id" = "static_cohort_upload"."distinct_id"
+JOIN "posthog_person" ON "posthog_person"."id" = "posthog_persondistinctid"."person_id"
+WHERE "posthog_person"."team_id" = %(team_id)s
+AND NOT EXISTS (
+    SELECT 1 FROM "posthog_cohortpeople"
+    WHERE "posthog_cohortpeople"."cohort_id" = %(cohort_id)s
+    AND "posthog_cohortpeople"."person_id" = "posthog_person"."id"
+)
+"""
+
+INSERT_STATIC_COHORT_UPLOAD_QUERY = """
+INSERT INTO "posthog_cohortpeople" ("person_id", "cohort_id", "version")
+SELECT "id", %(cohort_id)s, %(version)s FROM "static_cohort_upload_persons"
+ON CONFLICT DO NOTHING
+"""
+
+DROP_STATIC_COHORT_UPLOAD_TABLE_QUERY = """
+DROP TABLE "static_cohort_upload"
+"""
+
+DROP_STATIC_COHORT_UPLOAD_PERSONS_TABLE_QUERY = """
+DROP TABLE IF EXISTS "static_cohort_upload_persons"
+"""
+
 
 class Group:
     def __init__(
@@ -236,8 +281,7 @@ class Cohort(models.Model):
         Items can be distinct_id or email
         """
 
-        batchsize = 1000
-        from posthog.models.cohort.util import insert_static_cohort, get_static_cohort_size
+        from posthog.models.cohort.util import get_static_cohort_size
 
         if TEST:
             from posthog.test.base import flush_persons_and_events
@@ -246,23 +290,10 @@ class Cohort(models.Model):
             flush_persons_and_events()
 
         try:
-            cursor = connection.cursor()
-            for i in range(0, len(items), batchsize):
-                batch = items[i : i + batchsize]
-                persons_query = (
-                    Person.objects.filter(team_id=self.team_id)
-                    .filter(Q(persondistinctid__team_id=self.team_id, persondistinctid__distinct_id__in=batch))
-                    .exclude(cohort__id=self.id)
-                )
-                insert_static_cohort([p for p in persons_query.values_list("uuid", flat=True)], self.pk, self.team)
-                sql, params = persons_query.distinct("pk").only("pk").query.sql_with_params()
-                query = UPDATE_QUERY.format(
-                    cohort_id=self.pk,
-                    values_query=sql.replace(
-                        'FROM "posthog_person"', f', {self.pk}, {self.version or "NULL"} FROM "posthog_person"', 1
-                    ),
-                )
-                cursor.execute(query, params)
+            if settings.STATIC_COHORT_BULK_UPLOAD_ENABLED:
+                self._insert_users_by_list_in_bulk(items)
+            else:
+                self._insert_users_by_list_in_batches(items)
 
             count = get_static_cohort_size(self)
             self.count = count
@@ -279,6 +310,73 @@ class Cohort(models.Model):
             self.save()
             capture_exception(err)
 
+    def _insert_users_by_list_in_batches(self, items: List[str]) -> None:
+        batchsize = 1000
+        from posthog.models.cohort.util import insert_static_cohort
+
+        cursor = connection.cursor()
+        for i in range(0, len(items), batchsize):
+            batch = items[i : i + batchsize]
+            persons_query = (
+                Person.objects.filter(team_id=self.team_id)
+                .filter(Q(persondistinctid__team_id=self.team_id, persondistinctid__distinct_id__in=batch))
+                .exclude(cohort__id=self.id)
+            )
+            insert_static_cohort([p for p in persons_query.values_list("uuid", flat=True)], self.pk, self.team)
+            sql, params = persons_query.distinct("pk").only("pk").query.sql_with_params()
+            query = UPDATE_QUERY.format(
+                cohort_id=self.pk,
+                values_query=sql.replace(
+                    'FROM "posthog_person"', f', {self.pk}, {self.version or "NULL"} FROM "posthog_person"', 1
+                ),
+            )
+            cursor.execute(query, params)
+
+    def _insert_users_by_list_in_bulk(self, items: List[str]) -> None:
+        """
+        Copies the distinct IDs into a temporary table, and finds and adds their persons in Postgres with a single
+        query. Once that's committed, the persons are inserted into ClickHouse STATIC_COHORT_UPLOAD_BATCH_SIZE at a
+        time, and the count of the cohort is updated after each batch.
+        """
+        from posthog.models.cohort.util import get_static_cohort_size, insert_static_cohort
+
+        with connection.cursor() as cursor:
+            try:
+                with transaction.atomic():
+                    cursor.execute(CREATE_STATIC_COHORT_UPLOAD_TABLE_QUERY)
+                    for i in range(0, len(items), STATIC_COHORT_UPLOAD_BATCH_SIZE):
+                        batch = items[i : i + STATIC_COHORT_UPLOAD_BATCH_SIZE]
+                        rows = io.StringIO()
+                        csv.writer(rows, lineterminator="\n").writerows([item] for item in batch)
+                        rows.seek(0)
+                        cursor.copy_expert(COPY_STATIC_COHORT_UPLOAD_QUERY, rows)
+
+                    cursor.execute(RESOLVE_STATIC_COHORT_UPLOAD_QUERY, {"team_id": self.team_id, "cohort_id": self.pk})
+                    cursor.execute(INSERT_STATIC_COHORT_UPLOAD_QUERY, {"cohort_id": self.pk, "version": self.version})
+                    cursor.execute(DROP_STATIC_COHORT_UPLOAD_TABLE_QUERY)
+
+                inserted_count = 0
+                # Read the persons with a server-side cursor, so that they don't all need to fit in memory
+                with connection.chunked_cursor() as persons_cursor:
+                    persons_cursor.execute('SELECT "uuid" FROM "static_cohort_upload_persons"')
+                    while True:
+                        person_rows = persons_cursor.fetchmany(STATIC_COHORT_UPLOAD_BATCH_SIZE)
+                        if not person_rows:
+                            break
+                        insert_static_cohort([row[0] for row in person_rows], self.pk, self.team)
+                        inserted_count += len(person_rows)
+
+                        self.count = get_static_cohort_size(self)
+                        self.save(update_fields=["count"])
+                        logger.info(
+                            "static_cohort_upload_progress",
+                            id=self.pk,
+                            uploaded_count=len(items),
+                            inserted_count=inserted_count,
+                        )
+            finally:
+                cursor.execute(DROP_STATIC_COHORT_UPLOAD_PERSONS_TABLE_QUERY)
+
     def insert_users_list_by_uuid(self, items: List[str]) -> None:
         batchsize = 1000
         from posthog.models.cohort.util import get_static_cohort_size
@@ -1,6 +1,6 @@
 import secrets
 from datetime import timedelta
-from typing import List, Optional
+from typing import IO, List, Optional
 
 import structlog
 from django.conf import settings
@@ -23,6 +23,11 @@ logger = structlog.get_logger(__name__)
 
 PUBLIC_ACCESS_TOKEN_EXP_DAYS = 365
 MAX_AGE_CONTENT = 86400  # 1 day
+# Extensions of the formats whose MIME subtype isn't one
+FILE_EXTENSIONS = {
+    "application/vnd.apache.parquet": "parquet",
+    "application/vnd.apache.arrow.stream": "arrows",
+}
 
 
 def get_default_access_token() -> str:
@@ -44,6 +49,8 @@ class ExportedAsset(models.Model):
         PNG = "image/png", "image/png"
         PDF = "application/pdf", "application/pdf"
         CSV = "text/csv", "text/csv"
+        PARQUET = "application/vnd.apache.parquet", "application/vnd.apache.parquet"
+        ARROW = "application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.stream"
 
     # Relations
     team: models.ForeignKey = models.ForeignKey("Team", on_delete=models.CASCADE)
@@ -51,7 +58,7 @@ class ExportedAsset(models.Model):
     insight = models.ForeignKey("posthog.Insight", on_delete=models.CASCADE, null=True)
 
     # Content related fields
-    export_format: models.CharField = models.CharField(max_length=16, choices=ExportFormat.choices)
+    export_format: models.CharField = models.CharField(max_length=64, choices=ExportFormat.choices)
     content: models.BinaryField = models.BinaryField(null=True)
     created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True, blank=True)
     # DateTime after the created_at after which this asset should be deleted
@@ -65,6 +72,8 @@ class ExportedAsset(models.Model):
     # path in object storage or some other location identifier for the asset
     # 1000 characters would hold a 20 UUID forward slash separated path with space to spare
     content_location: models.TextField = models.TextField(null=True, blank=True, max_length=1000)
+    # number of rows written so far by exports streaming their content, to report progress
+    exported_rows: models.IntegerField = models.IntegerField(null=True, blank=True)
 
     # DEPRECATED: We now use JWT for accessing assets
     access_token: models.CharField = models.CharField(
@@ -77,7 +86,7 @@ class ExportedAsset(models.Model):
 
     @property
     def filename(self):
-        ext = self.export_format.split("/")[1]
+        ext = self.file_ext
         filename = "export"
 
         if self.export_context and self.export_context.get("filename"):
@@ -93,7 +102,7 @@ class ExportedAsset(models.Model):
 
     @property
     def file_ext(self):
-        return self.export_format.split("/")[1]
+        return FILE_EXTENSIONS.get(self.export_format, self.export_format.split("/")[1])
 
     def get_analytics_metadata(self):
         return {"export_format": self.export_format, "dashboard_id": self.dashboard_id, "insight_id": self.insight_id}
@@ -158,20 +167,43 @@ def save_content(exported_asset: ExportedAsset, content: bytes) -> None:
         save_content_to_exported_asset(exported_asset, content)
 
 
+def save_content_from_file(exported_asset: ExportedAsset, file: IO[bytes]) -> None:
+    """Like `save_content`, but uploads the content from a file, so it doesn't have to fit into memory."""
+    file.seek(0)
+    try:
+        if settings.OBJECT_STORAGE_ENABLED:
+            object_path = _object_storage_path(exported_asset)
+            object_storage.write_file(object_path, file)
+            exported_asset.content_location = object_path
+            exported_asset.save(update_fields=["content_location"])
+            return
+    except ObjectStorageError as ose:
+        capture_exception(ose)
+        logger.error(
+            "exported_asset.object-storage-error", exported_asset_id=exported_asset.id, exception=ose, exc_info=True
+        )
+    file.seek(0)
+    save_content_to_exported_asset(exported_asset, file.read())
+
+
 def save_content_to_exported_asset(exported_asset: ExportedAsset, content: bytes) -> None:
     exported_asset.content = content
     exported_asset.save(update_fields=["content"])
 
 
-def save_content_to_object_storage(exported_asset: ExportedAsset, content: bytes) -> None:
+def _object_storage_path(exported_asset: ExportedAsset) -> str:
     path_parts: List[str] = [
         settings.OBJECT_STORAGE_EXPORTS_FOLDER,
-        exported_asset.export_format.split("/")[1],
+        exported_asset.file_ext,
         f"team-{exported_asset.team.id}",
         f"task-{exported_asset.id}",
         str(UUIDT()),
     ]
-    object_path = "/".join(path_parts)
+    return "/".join(path_parts)
+
+
+def save_content_to_object_storage(exported_asset: ExportedAsset, content: bytes) -> None:
+    object_path = _object_storage_path(exported_asset)
     object_storage.write(object_path, content)
     exported_asset.content_location = object_path
     exported_asset.save(update_fields=["content_location"])
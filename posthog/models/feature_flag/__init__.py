@@ -4,6 +4,6 @@ from .feature_flag import (
     set_feature_flags_for_team_in_cache,
     FeatureFlagDashboards,
 )
-from .flag_matching import FeatureFlagMatcher, get_all_feature_flags
+from .flag_matching import FeatureFlagMatcher, get_all_feature_flags, get_feature_flags_for_distinct_ids
 from .permissions import can_user_edit_feature_flag
 from .user_blast_radius import get_user_blast_radius
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import structlog
 from typing import Dict, List, Optional, cast
@@ -351,10 +352,16 @@ def set_feature_flags_for_team_in_cache(
             FeatureFlag.objects.using(using_database).filter(team_id=team_id, active=True, deleted=False)
         )
 
-    serialized_flags = MinimalFeatureFlagSerializer(all_feature_flags, many=True).data
+    serialized_flags = json.dumps(MinimalFeatureFlagSerializer(all_feature_flags, many=True).data)
 
     try:
-        cache.set(f"team_feature_flags_{team_id}", json.dumps(serialized_flags), FIVE_DAYS)
+        cache.set(f"team_feature_flags_{team_id}", serialized_flags, FIVE_DAYS)
+        # :TRICKY: Written after the flags, so whoever reads a version can only get these flags or newer ones
+        cache.set(
+            f"team_feature_flags_version_{team_id}",
+            hashlib.sha1(serialized_flags.encode("utf-8")).hexdigest(),
+            FIVE_DAYS,
+        )
     except Exception:
         # redis is unavailable
         logger.exception("Redis is unavailable")
@@ -363,6 +370,16 @@ def set_feature_flags_for_team_in_cache(
     return all_feature_flags
 
 
+def get_feature_flags_version_for_team_in_cache(team_id: int) -> Optional[str]:
+    "A hash of the cached flags, which changes whenever any of the team's flags change."
+    try:
+        return cache.get(f"team_feature_flags_version_{team_id}")
+    except Exception:
+        # redis is unavailable
+        logger.exception("Redis is unavailable")
+        return None
+
+
 def get_feature_flags_for_team_in_cache(team_id: int) -> Optional[List[FeatureFlag]]:
     try:
         flag_data = cache.get(f"team_feature_flags_{team_id}")
@@ -0,0 +1,172 @@
+"""
+Precompiled, per-team feature flag definitions.
+
+Matching flags used to re-parse every condition with `Filter(data=condition)` and rebuild variant lookup tables on
+every `/decide` request. A `FeatureFlagBundle` does that work once per version of the team's flags, and is kept in
+process memory until the version stored next to the cached flags in Redis changes.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from cachetools import LRUCache
+from prometheus_client import Counter
+
+from posthog.models.filters import Filter
+from posthog.models.property.property import Property
+
+from .feature_flag import (
+    FeatureFlag,
+    get_feature_flags_for_team_in_cache,
+    get_feature_flags_version_for_team_in_cache,
+    set_feature_flags_for_team_in_cache,
+)
+
+FLAG_BUNDLE_CACHE_SIZE = 1_000
+
+FLAG_BUNDLE_CACHE_HIT_COUNTER = Counter(
+    "flag_bundle_cache_hit_total",
+    "Whether compiled flag bundles were reused from process memory or rebuilt.",
+    labelnames=["cache_hit"],
+)
+
+_bundles: LRUCache = LRUCache(maxsize=FLAG_BUNDLE_CACHE_SIZE)
+_bundles_lock = threading.Lock()
+
+
+class VariantRange(NamedTuple):
+    value_min: float
+    value_max: float
+    key: str
+
+
+@dataclass(frozen=True)
+class CompiledCondition:
+    properties: Tuple[Property, ...]
+    rollout_percentage: Optional[float] = None
+    variant: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CompiledFeatureFlag:
+    feature_flag: FeatureFlag
+    # In the order they're evaluated, with variant overrides first, alongside their original index
+    sorted_conditions: Tuple[Tuple[int, CompiledCondition], ...]
+    super_condition: Optional[CompiledCondition]
+    # `is_set` check on the super condition property, which decides whether the super condition applies at all
+    super_condition_is_set: Optional[CompiledCondition]
+    # Define contiguous sub-domains within [0, 1].
+    # By looking up a random hash value, you can find the associated variant key.
+    # e.g. the first of two variants with 50% rollout percentage will have value_max: 0.5
+    # and the second will have value_min: 0.5 and value_max: 1.0
+    variant_lookup_table: Tuple[VariantRange, ...]
+    variant_keys: FrozenSet[str]
+    hash_salt: str
+
+
+@dataclass(frozen=True)
+class FeatureFlagBundle:
+    team_id: int
+    # `None` when the flags couldn't be versioned (e.g. redis is down), in which case the bundle isn't reused
+    version: Optional[str]
+    feature_flags: Tuple[FeatureFlag, ...]
+    # Keyed by `id()` of the flags above. Flags with invalid filters are left out, and compiled again when matched,
+    # so the error surfaces for that flag alone instead of failing all flags of the team.
+    compiled_flags: Dict[int, CompiledFeatureFlag]
+
+    def get(self, feature_flag: FeatureFlag) -> CompiledFeatureFlag:
+        compiled = self.compiled_flags.get(id(feature_flag))
+        if compiled is None or compiled.feature_flag is not feature_flag:
+            return compile_feature_flag(feature_flag)
+        return compiled
+
+
+def _compile_condition(condition: Dict) -> CompiledCondition:
+    properties: Tuple[Property, ...] = ()
+    if len(condition.get("properties") or []) > 0:
+        properties = tuple(Filter(data=condition).property_groups.flat)
+    return CompiledCondition(
+        properties=properties,
+        rollout_percentage=condition.get("rollout_percentage"),
+        variant=condition.get("variant"),
+    )
+
+
+def compile_feature_flag(feature_flag: FeatureFlag) -> CompiledFeatureFlag:
+    variant_lookup_table = []
+    value_min: float = 0
+    for variant in feature_flag.variants:
+        value_max = value_min + variant["rollout_percentage"] / 100
+        variant_lookup_table.append(VariantRange(value_min, value_max, variant["key"]))
+        value_min = value_max
+
+    super_condition = super_condition_is_set = None
+    if feature_flag.super_conditions:
+        condition = feature_flag.super_conditions[0]
+        super_condition = _compile_condition(condition)
+        prop_key = (condition.get("properties") or [{}])[0].get("key")
+        if prop_key:
+            super_condition_is_set = _compile_condition({"properties": [{"key": prop_key, "operator": "is_set"}]})
+
+    # Stable sort conditions with variant overrides to the top. This ensures that if overrides are present, they are
+    # evaluated first, and the variant override is applied to the first matching condition.
+    # :TRICKY: We need to include the enumeration index before the sort so the flag evaluation reason gets the right condition index.
+    sorted_conditions = sorted(
+        ((index, _compile_condition(condition)) for index, condition in enumerate(feature_flag.conditions)),
+        key=lambda condition_tuple: 0 if condition_tuple[1].variant else 1,
+    )
+
+    return CompiledFeatureFlag(
+        feature_flag=feature_flag,
+        sorted_conditions=tuple(sorted_conditions),
+        super_condition=super_condition,
+        super_condition_is_set=super_condition_is_set,
+        variant_lookup_table=tuple(variant_lookup_table),
+        variant_keys=frozenset(variant["key"] for variant in feature_flag.variants),
+        hash_salt=f"{feature_flag.key}.",
+    )
+
+
+def compile_feature_flags(team_id: int, feature_flags: List[FeatureFlag], version: Optional[str]) -> FeatureFlagBundle:
+    compiled_flags = {}
+    for feature_flag in feature_flags:
+        try:
+            compiled_flags[id(feature_flag)] = compile_feature_flag(feature_flag)
+        except Exception:
+            continue
+    return FeatureFlagBundle(
+        team_id=team_id, version=version, feature_flags=tuple(feature_flags), compiled_flags=compiled_flags
+    )
+
+
+def get_feature_flag_bundle(team_id: int) -> Tuple[FeatureFlagBundle, bool]:
+    """
+    Returns the compiled flags for a team, and whether the flags were found in the cache.
+
+    In the common path this is a single redis read of the flags version. Flags are only loaded and compiled again
+    when the version changed, which happens whenever a flag is created, updated or deleted.
+    """
+    version = get_feature_flags_version_for_team_in_cache(team_id)
+    if version is not None:
+        with _bundles_lock:
+            bundle: Optional[FeatureFlagBundle] = _bundles.get(team_id)
+        if bundle is not None and bundle.version == version:
+            FLAG_BUNDLE_CACHE_HIT_COUNTER.labels(cache_hit=True).inc()
+            return bundle, True
+
+    FLAG_BUNDLE_CACHE_HIT_COUNTER.labels(cache_hit=False).inc()
+    # :TRICKY: The version is read before the flags, so a bundle can't be labelled with a newer version than its flags.
+    # Without a version, e.g. for flags cached before they were versioned or after it was evicted, the cached flags
+    # are still served, but their bundle isn't reused.
+    all_feature_flags = get_feature_flags_for_team_in_cache(team_id)
+    cache_hit = all_feature_flags is not None
+    if all_feature_flags is None:
+        # The next request picks up the version written alongside these flags
+        all_feature_flags = set_feature_flags_for_team_in_cache(team_id)
+        version = None
+
+    bundle = compile_feature_flags(team_id, all_feature_flags, version)
+    if version is not None:
+        with _bundles_lock:
+            _bundles[team_id] = bundle
+    return bundle, cache_hit
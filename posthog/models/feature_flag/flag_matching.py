@@ -15,7 +15,6 @@ from django.db.models.query import QuerySet
 from sentry_sdk.api import capture_exception, start_span
 from posthog.metrics import LABEL_TEAM_ID
 
-from posthog.models.filters import Filter
 from posthog.models.filters.mixins.utils import cached_property
 from posthog.models.group import Group
 from posthog.models.group_type_mapping import GroupTypeMapping
@@ -28,12 +27,15 @@ from posthog.queries.base import match_property, properties_to_Q
 from posthog.database_healthcheck import postgres_healthcheck, DATABASE_FOR_FLAG_MATCHING
 from posthog.utils import label_for_team_id_to_track
 
-from .feature_flag import (
-    FeatureFlag,
-    FeatureFlagHashKeyOverride,
-    get_feature_flags_for_team_in_cache,
-    set_feature_flags_for_team_in_cache,
+from .feature_flag import FeatureFlag, FeatureFlagHashKeyOverride
+from .flag_bundle import (
+    CompiledCondition,
+    CompiledFeatureFlag,
+    FeatureFlagBundle,
+    compile_feature_flags,
+    get_feature_flag_bundle,
 )
+from .local_evaluation import PropertiesSnapshot, get_group_snapshot, get_person_snapshot, match_properties_locally
 
 logger = structlog.get_logger(__name__)
 
@@ -41,6 +43,9 @@ __LONG_SCALE__ = float(0xFFFFFFFFFFFFFFF)
 
 FLAG_MATCHING_QUERY_TIMEOUT_MS = 300  # 300 ms. Any longer and we'll just error out.
 
+# Per group type, a query for the group annotated with each condition, alongside the names of the condition fields
+GroupConditionQueries = Dict[GroupTypeIndex, Tuple[QuerySet, List[str]]]
+
 FLAG_EVALUATION_ERROR_COUNTER = Counter(
     "flag_evaluation_error_total",
     "Failed decide requests with reason.",
@@ -124,6 +129,7 @@ class FlagsMatcherCache:
 
 class FeatureFlagMatcher:
     failed_to_fetch_conditions = False
+    failed_to_fetch_snapshots = False
 
     def __init__(
         self,
@@ -135,6 +141,8 @@ class FeatureFlagMatcher:
         property_value_overrides: Dict[str, Union[str, int]] = {},
         group_property_value_overrides: Dict[str, Dict[str, Union[str, int]]] = {},
         skip_database_flags: bool = False,
+        bundle: Optional[FeatureFlagBundle] = None,
+        precomputed_conditions: Optional[Dict[str, bool]] = None,
     ):
         self.feature_flags = feature_flags
         self.distinct_id = distinct_id
@@ -145,6 +153,13 @@ class FeatureFlagMatcher:
         self.group_property_value_overrides = group_property_value_overrides
         self.skip_database_flags = skip_database_flags
         self.cohorts_cache: Dict[int, Cohort] = {}
+        self.group_snapshots: Dict[GroupTypeIndex, Optional[PropertiesSnapshot]] = {}
+        self.bundle = bundle or compile_feature_flags(self.feature_flags[0].team_id, feature_flags, version=None)
+        # Condition results already fetched for many distinct_ids at once, see `get_feature_flags_for_distinct_ids`
+        self.precomputed_conditions = precomputed_conditions
+
+    def compiled(self, feature_flag: FeatureFlag) -> CompiledFeatureFlag:
+        return self.bundle.get(feature_flag)
 
     def get_match(self, feature_flag: FeatureFlag) -> FeatureFlagMatch:
         # If aggregating flag by groups and relevant group type is not passed - flag is off!
@@ -166,18 +181,12 @@ class FeatureFlagMatcher:
                     payload=payload,
                 )
 
-        # Stable sort conditions with variant overrides to the top. This ensures that if overrides are present, they are
-        # evaluated first, and the variant override is applied to the first matching condition.
-        # :TRICKY: We need to include the enumeration index before the sort so the flag evaluation reason gets the right condition index.
-        sorted_flag_conditions = sorted(
-            enumerate(feature_flag.conditions),
-            key=lambda condition_tuple: 0 if condition_tuple[1].get("variant") else 1,
-        )
-        for index, condition in sorted_flag_conditions:
+        compiled_flag = self.compiled(feature_flag)
+        for index, condition in compiled_flag.sorted_conditions:
             is_match, evaluation_reason = self.is_condition_match(feature_flag, condition, index)
             if is_match:
-                variant_override = condition.get("variant")
-                if variant_override in [variant["key"] for variant in feature_flag.variants]:
+                variant_override = condition.variant
+                if variant_override in compiled_flag.variant_keys:
                     variant = variant_override
                 else:
                     variant = self.get_matching_variant(feature_flag)
@@ -230,12 +239,10 @@ class FeatureFlagMatcher:
         return flag_values, flag_evaluation_reasons, flag_payloads, faced_error_computing_flags
 
     def get_matching_variant(self, feature_flag: FeatureFlag) -> Optional[str]:
-        for variant in self.variant_lookup_table(feature_flag):
-            if (
-                self.get_hash(feature_flag, salt="variant") >= variant["value_min"]
-                and self.get_hash(feature_flag, salt="variant") < variant["value_max"]
-            ):
-                return variant["key"]
+        variant_hash = self.get_hash(feature_flag, salt="variant")
+        for variant in self.compiled(feature_flag).variant_lookup_table:
+            if variant_hash >= variant.value_min and variant_hash < variant.value_max:
+                return variant.key
         return None
 
     def get_matching_payload(
@@ -262,10 +269,9 @@ class FeatureFlagMatcher:
             return True, super_condition_value, FeatureFlagMatchReason.SUPER_CONDITION_VALUE
 
         # Evaluate if properties are empty
-        if feature_flag.super_conditions and len(feature_flag.super_conditions) > 0:
-            condition = feature_flag.super_conditions[0]
-
-            if not condition.get("properties"):
+        condition = self.compiled(feature_flag).super_condition
+        if condition is not None:
+            if not condition.properties:
                 is_match, evaluation_reason = self.is_condition_match(feature_flag, condition, 0)
                 return (
                     True,
@@ -278,11 +284,11 @@ class FeatureFlagMatcher:
         return False, False, FeatureFlagMatchReason.NO_CONDITION_MATCH
 
     def is_condition_match(
-        self, feature_flag: FeatureFlag, condition: Dict, condition_index: int
+        self, feature_flag: FeatureFlag, condition: CompiledCondition, condition_index: int
     ) -> Tuple[bool, FeatureFlagMatchReason]:
-        rollout_percentage = condition.get("rollout_percentage")
-        if len(condition.get("properties", [])) > 0:
-            properties = Filter(data=condition).property_groups.flat
+        rollout_percentage = condition.rollout_percentage
+        if len(condition.properties) > 0:
+            properties = list(condition.properties)
             if self.can_compute_locally(properties, feature_flag.aggregation_group_type_index):
                 # :TRICKY: If overrides are enough to determine if a condition is a match,
                 # we can skip checking the query.
@@ -294,7 +300,9 @@ class FeatureFlagMatcher:
                     )
                 condition_match = all(match_property(property, target_properties) for property in properties)
             else:
-                condition_match = self._condition_matches(feature_flag, condition_index)
+                condition_match = self._locally_evaluated_condition_match(feature_flag, properties)
+                if condition_match is None:
+                    condition_match = self._condition_matches(feature_flag, condition_index)
 
             if not condition_match:
                 return False, FeatureFlagMatchReason.NO_CONDITION_MATCH
@@ -315,6 +323,90 @@ class FeatureFlagMatcher:
     def _condition_matches(self, feature_flag: FeatureFlag, condition_index: int) -> bool:
         return self._get_query_condition(f"flag_{feature_flag.pk}_condition_{condition_index}")
 
+    def _locally_evaluated_condition_match(
+        self, feature_flag: FeatureFlag, properties: List[Property]
+    ) -> Optional[bool]:
+        """
+        Evaluates the condition against a cached snapshot of the person's or group's properties when possible.
+        Returns None when the database needs to decide.
+        """
+        if (
+            not settings.DECIDE_LOCAL_FLAG_EVALUATION_ENABLED
+            or self.failed_to_fetch_snapshots
+            or self.precomputed_conditions is not None
+        ):
+            return None
+
+        group_type_index = feature_flag.aggregation_group_type_index
+        try:
+            if group_type_index is None:
+                snapshot = self.person_snapshot
+                override_property_values = self.property_value_overrides
+            else:
+                snapshot = self.get_group_snapshot(group_type_index)
+                override_property_values = self.group_property_value_overrides.get(
+                    self.cache.group_type_index_to_name[group_type_index], {}
+                )
+        except DatabaseError as e:
+            self.failed_to_fetch_snapshots = True
+            raise e
+
+        if snapshot is None and self.skip_database_flags:
+            # Without the database we can't tell whether the person or group exists, so let the database path error out
+            return None
+
+        return match_properties_locally(
+            properties,
+            snapshot,
+            is_group=group_type_index is not None,
+            override_property_values=override_property_values,
+            cohorts_cache=self.cohorts_cache,
+        )
+
+    @cached_property
+    def person_snapshot(self) -> Optional[PropertiesSnapshot]:
+        team_id = self.feature_flags[0].team_id
+        # When the database is down, a cached snapshot still lets us evaluate flags
+        uses_cohorts = any(feature_flag.uses_cohorts for feature_flag in self.feature_flags)
+        if uses_cohorts and not self.skip_database_flags:
+            self._load_cohorts(team_id)
+        return get_person_snapshot(
+            team_id,
+            self.distinct_id,
+            include_static_cohorts=uses_cohorts,
+            using_database=DATABASE_FOR_FLAG_MATCHING,
+            allow_database=not self.skip_database_flags,
+            timeout_ms=FLAG_MATCHING_QUERY_TIMEOUT_MS,
+        )
+
+    def get_group_snapshot(self, group_type_index: GroupTypeIndex) -> Optional[PropertiesSnapshot]:
+        if group_type_index not in self.group_snapshots:
+            group_key = self.groups.get(self.cache.group_type_index_to_name[group_type_index])
+            self.group_snapshots[group_type_index] = (
+                get_group_snapshot(
+                    self.feature_flags[0].team_id,
+                    group_type_index,
+                    str(group_key),
+                    using_database=DATABASE_FOR_FLAG_MATCHING,
+                    allow_database=not self.skip_database_flags,
+                    timeout_ms=FLAG_MATCHING_QUERY_TIMEOUT_MS,
+                )
+                if group_key is not None
+                else None
+            )
+        return self.group_snapshots[group_type_index]
+
+    def _load_cohorts(self, team_id: int) -> None:
+        with execute_with_timeout(FLAG_MATCHING_QUERY_TIMEOUT_MS, DATABASE_FOR_FLAG_MATCHING):
+            self.cohorts_cache.update(
+                {
+                    cohort.pk: cohort
+                    for cohort in Cohort.objects.using(DATABASE_FOR_FLAG_MATCHING).filter(
+                        team_id=team_id, deleted=False
+                    )
+                }
+            )
+
     def _get_query_condition(self, key: str) -> bool:
         if self.failed_to_fetch_conditions:
             raise DatabaseError("Failed to fetch conditions for feature flag previously, not trying again.")
@@ -322,158 +414,28 @@ class FeatureFlagMatcher:
             raise DatabaseError("Database healthcheck failed, not fetching flag conditions.")
         return self.query_conditions.get(key, False)
 
-    # Define contiguous sub-domains within [0, 1].
-    # By looking up a random hash value, you can find the associated variant key.
-    # e.g. the first of two variants with 50% rollout percentage will have value_max: 0.5
-    # and the second will have value_min: 0.5 and value_max: 1.0
-    def variant_lookup_table(self, feature_flag: FeatureFlag):
-        lookup_table = []
-        value_min = 0
-        for variant in feature_flag.variants:
-            value_max = value_min + variant["rollout_percentage"] / 100
-            lookup_table.append({"value_min": value_min, "value_max": value_max, "key": variant["key"]})
-            value_min = value_max
-        return lookup_table
-
     @cached_property
     def query_conditions(self) -> Dict[str, bool]:
+        if self.precomputed_conditions is not None:
+            return self.precomputed_conditions
         try:
             # Some extra wiggle room here for timeouts because this depends on the number of flags as well,
             # and not just the database query.
             with execute_with_timeout(FLAG_MATCHING_QUERY_TIMEOUT_MS * 2, DATABASE_FOR_FLAG_MATCHING):
-                all_conditions: Dict = {}
                 team_id = self.feature_flags[0].team_id
                 person_query: QuerySet = Person.objects.using(DATABASE_FOR_FLAG_MATCHING).filter(
                     team_id=team_id, persondistinctid__distinct_id=self.distinct_id, persondistinctid__team_id=team_id
                 )
-                basic_group_query: QuerySet = Group.objects.using(DATABASE_FOR_FLAG_MATCHING).filter(team_id=team_id)
-                group_query_per_group_type_mapping: Dict[GroupTypeIndex, Tuple[QuerySet, List[str]]] = {}
-                # :TRICKY: Create a queryset for each group type that uniquely identifies a group, based on the groups passed in.
-                # If no groups for a group type are passed in, we can skip querying for that group type,
-                # since the result will always be `false`.
-                for group_type, group_key in self.groups.items():
-                    group_type_index = self.cache.group_types_to_indexes.get(group_type)
-                    if group_type_index is not None:
-                        # a tuple of querySet and field names
-                        group_query_per_group_type_mapping[group_type_index] = (
-                            basic_group_query.filter(group_type_index=group_type_index, group_key=group_key),
-                            [],
-                        )
-
-                person_fields: List[str] = []
-
-                def condition_eval(key, condition):
-                    expr = None
-                    annotate_query = True
-                    nonlocal person_query
-
-                    if len(condition.get("properties", {})) > 0:
-                        # Feature Flags don't support OR filtering yet
-                        target_properties = self.property_value_overrides
-                        if feature_flag.aggregation_group_type_index is not None:
-                            target_properties = self.group_property_value_overrides.get(
-                                self.cache.group_type_index_to_name[feature_flag.aggregation_group_type_index], {}
-                            )
-                        expr = properties_to_Q(
-                            Filter(data=condition).property_groups.flat,
-                            override_property_values=target_properties,
-                            cohorts_cache=self.cohorts_cache,
-                            using_database=DATABASE_FOR_FLAG_MATCHING,
-                        )
-
-                        # TRICKY: Due to property overrides for cohorts, we sometimes shortcircuit the condition check.
-                        # In that case, the expression is either an explicit True or explicit False, or multiple conditions.
-                        # We can skip going to the database in explicit True|False conditions. This is important
-                        # as it allows resolving flags correctly for non-ingested persons.
-                        # However, this doesn't work for the multiple condition case (when expr has multiple Q objects),
-                        # but it's better than nothing.
-                        # TODO: A proper fix would be to handle cohorts with property overrides before we get to this point.
-                        # Unskip test test_complex_cohort_filter_with_override_properties when we fix this.
-                        if expr == Q(pk__isnull=False):
-                            all_conditions[key] = True
-                            annotate_query = False
-                        elif expr == Q(pk__isnull=True):
-                            all_conditions[key] = False
-                            annotate_query = False
-
-                    if annotate_query:
-                        if feature_flag.aggregation_group_type_index is None:
-                            person_query = person_query.annotate(
-                                **{
-                                    key: ExpressionWrapper(
-                                        expr if expr else RawSQL("true", []), output_field=BooleanField()
-                                    )
-                                }
-                            )
-                            person_fields.append(key)
-                        else:
-                            if feature_flag.aggregation_group_type_index not in group_query_per_group_type_mapping:
-                                # ignore flags that didn't have the right groups passed in
-                                return
-                            group_query, group_fields = group_query_per_group_type_mapping[
-                                feature_flag.aggregation_group_type_index
-                            ]
-                            group_query = group_query.annotate(
-                                **{
-                                    key: ExpressionWrapper(
-                                        expr if expr else RawSQL("true", []), output_field=BooleanField()
-                                    )
-                                }
-                            )
-                            group_fields.append(key)
-                            group_query_per_group_type_mapping[feature_flag.aggregation_group_type_index] = (
-                                group_query,
-                                group_fields,
-                            )
-
-                if any(feature_flag.uses_cohorts for feature_flag in self.feature_flags):
-                    all_cohorts = {
-                        cohort.pk: cohort
-                        for cohort in Cohort.objects.using(DATABASE_FOR_FLAG_MATCHING).filter(
-                            team_id=team_id, deleted=False
-                        )
-                    }
-                    self.cohorts_cache.update(all_cohorts)
-                # release conditions
-                for feature_flag in self.feature_flags:
-                    # super release conditions
-                    if feature_flag.super_conditions and len(feature_flag.super_conditions) > 0:
-                        condition = feature_flag.super_conditions[0]
-                        prop_key = (condition.get("properties") or [{}])[0].get("key")
-                        if prop_key:
-                            key = f"flag_{feature_flag.pk}_super_condition"
-                            condition_eval(key, condition)
-
-                            is_set_key = f"flag_{feature_flag.pk}_super_condition_is_set"
-                            is_set_condition = {
-                                "properties": [
-                                    {
-                                        "key": prop_key,
-                                        "operator": "is_set",
-                                    }
-                                ]
-                            }
-                            condition_eval(is_set_key, is_set_condition)
-
-                    with start_span(
-                        op="parse_feature_flag_conditions",
-                        description=f"feature_flag={feature_flag.pk} key={feature_flag.key}",
-                    ):
-                        for index, condition in enumerate(feature_flag.conditions):
-                            key = f"flag_{feature_flag.pk}_condition_{index}"
-                            condition_eval(key, condition)
+                all_conditions, person_query, person_fields, group_queries = self.annotate_condition_queries(
+                    person_query
+                )
 
                 if len(person_fields) > 0:
                     person_query = person_query.values(*person_fields)
                     if len(person_query) > 0:
                         all_conditions = {**all_conditions, **person_query[0]}
 
-                for group_query, group_fields in group_query_per_group_type_mapping.values():
-                    group_query = group_query.values(*group_fields)
-                    if len(group_query) > 0:
-                        assert len(group_query) == 1, f"Expected 1 group query result, got {len(group_query)}"
-                        all_conditions = {**all_conditions, **group_query[0]}
-                return all_conditions
+                return {**all_conditions, **self.evaluate_group_condition_queries(group_queries)}
         except DatabaseError as e:
             self.failed_to_fetch_conditions = True
             raise e
@@ -483,6 +445,124 @@ class FeatureFlagMatcher:
             # Covers all cases like invalid JSON, invalid operator, invalid property name, invalid group input format, etc.
             raise e
 
+    def annotate_condition_queries(
+        self, person_query: QuerySet
+    ) -> Tuple[Dict[str, bool], QuerySet, List[str], GroupConditionQueries]:
+        """
+        Annotates `person_query` and one query per group type with all flag conditions. Conditions that don't need
+        the database, because overrides already decide them, are returned directly.
+        """
+        all_conditions: Dict = {}
+        team_id = self.feature_flags[0].team_id
+        basic_group_query: QuerySet = Group.objects.using(DATABASE_FOR_FLAG_MATCHING).filter(team_id=team_id)
+        group_query_per_group_type_mapping: GroupConditionQueries = {}
+        # :TRICKY: Create a queryset for each group type that uniquely identifies a group, based on the groups passed in.
+        # If no groups for a group type are passed in, we can skip querying for that group type,
+        # since the result will always be `false`.
+        for group_type, group_key in self.groups.items():
+            group_type_index = self.cache.group_types_to_indexes.get(group_type)
+            if group_type_index is not None:
+                # a tuple of querySet and field names
+                group_query_per_group_type_mapping[group_type_index] = (
+                    basic_group_query.filter(group_type_index=group_type_index, group_key=group_key),
+                    [],
+                )
+
+        person_fields: List[str] = []
+
+        def condition_eval(key, condition: CompiledCondition):
+            expr = None
+            annotate_query = True
+            nonlocal person_query
+
+            if len(condition.properties) > 0:
+                # Feature Flags don't support OR filtering yet
+                target_properties = self.property_value_overrides
+                if feature_flag.aggregation_group_type_index is not None:
+                    target_properties = self.group_property_value_overrides.get(
+                        self.cache.group_type_index_to_name[feature_flag.aggregation_group_type_index], {}
+                    )
+                expr = properties_to_Q(
+                    list(condition.properties),
+                    override_property_values=target_properties,
+                    cohorts_cache=self.cohorts_cache,
+                    using_database=DATABASE_FOR_FLAG_MATCHING,
+                )
+
+                # TRICKY: Due to property overrides for cohorts, we sometimes shortcircuit the condition check.
+                # In that case, the expression is either an explicit True or explicit False, or multiple conditions.
+                # We can skip going to the database in explicit True|False conditions. This is important
+                # as it allows resolving flags correctly for non-ingested persons.
+                # However, this doesn't work for the multiple condition case (when expr has multiple Q objects),
+                # but it's better than nothing.
+                # TODO: A proper fix would be to handle cohorts with property overrides before we get to this point.
+                # Unskip test test_complex_cohort_filter_with_override_properties when we fix this.
+                if expr == Q(pk__isnull=False):
+                    all_conditions[key] = True
+                    annotate_query = False
+                elif expr == Q(pk__isnull=True):
+                    all_conditions[key] = False
+                    annotate_query = False
+
+            if annotate_query:
+                if feature_flag.aggregation_group_type_index is None:
+                    person_query = person_query.annotate(
+                        **{key: ExpressionWrapper(expr if expr else RawSQL("true", []), output_field=BooleanField())}
+                    )
+                    person_fields.append(key)
+                else:
+                    if feature_flag.aggregation_group_type_index not in group_query_per_group_type_mapping:
+                        # ignore flags that didn't have the right groups passed in
+                        return
+                    group_query, group_fields = group_query_per_group_type_mapping[
+                        feature_flag.aggregation_group_type_index
+                    ]
+                    group_query = group_query.annotate(
+                        **{key: ExpressionWrapper(expr if expr else RawSQL("true", []), output_field=BooleanField())}
+                    )
+                    group_fields.append(key)
+                    group_query_per_group_type_mapping[feature_flag.aggregation_group_type_index] = (
+                        group_query,
+                        group_fields,
+                    )
+
+        if any(feature_flag.uses_cohorts for feature_flag in self.feature_flags):
+            all_cohorts = {
+                cohort.pk: cohort
+                for cohort in Cohort.objects.using(DATABASE_FOR_FLAG_MATCHING).filter(team_id=team_id, deleted=False)
+            }
+            self.cohorts_cache.update(all_cohorts)
+        # release conditions
+        for feature_flag in self.feature_flags:
+            compiled_flag = self.compiled(feature_flag)
+            # super release conditions
+            if compiled_flag.super_condition is not None and compiled_flag.super_condition_is_set is not None:
+                key = f"flag_{feature_flag.pk}_super_condition"
+                condition_eval(key, compiled_flag.super_condition)
+
+                is_set_key = f"flag_{feature_flag.pk}_super_condition_is_set"
+                condition_eval(is_set_key, compiled_flag.super_condition_is_set)
+
+            with start_span(
+                op="parse_feature_flag_conditions",
+                description=f"feature_flag={feature_flag.pk} key={feature_flag.key}",
+            ):
+                for index, condition in compiled_flag.sorted_conditions:
+                    key = f"flag_{feature_flag.pk}_condition_{index}"
+                    condition_eval(key, condition)
+
+        return all_conditions, person_query, person_fields, group_query_per_group_type_mapping
+
+    @staticmethod
+    def evaluate_group_condition_queries(group_query_per_group_type_mapping: GroupConditionQueries) -> Dict[str, bool]:
+        all_conditions: Dict = {}
+        for group_query, group_fields in group_query_per_group_type_mapping.values():
+            group_query = group_query.values(*group_fields)
+            if len(group_query) > 0:
+                assert len(group_query) == 1, f"Expected 1 group query result, got {len(group_query)}"
+                all_conditions = {**all_conditions, **group_query[0]}
+        return all_conditions
+
     def hashed_identifier(self, feature_flag: FeatureFlag) -> Optional[str]:
         """
         If aggregating by people, returns distinct_id.
@@ -509,7 +589,7 @@ class FeatureFlagMatcher:
     # uniformly distributed between 0 and 1, so if we want to show this feature to 20% of traffic
     # we can do _hash(key, identifier) < 0.2
     def get_hash(self, feature_flag: FeatureFlag, salt="") -> float:
-        hash_key = f"{feature_flag.key}.{self.hashed_identifier(feature_flag)}{salt}"
+        hash_key = f"{self.compiled(feature_flag).hash_salt}{self.hashed_identifier(feature_flag)}{salt}"
         hash_val = int(hashlib.sha1(hash_key.encode("utf-8")).hexdigest()[:15], 16)
         return hash_val / __LONG_SCALE__
 
@@ -570,6 +650,26 @@ def get_feature_flag_hash_key_overrides(
     return feature_flag_to_key_overrides
 
 
+def get_feature_flag_hash_key_overrides_for_distinct_ids(
+    team_id: int, distinct_ids: List[str], using_database: str = "default"
+) -> Dict[str, Dict[str, str]]:
+    "Like `get_feature_flag_hash_key_overrides`, but keeps the overrides of every distinct_id apart."
+    feature_flag_to_key_overrides: Dict[str, Dict[str, str]] = {}
+
+    for distinct_id, feature_flag, override in (
+        FeatureFlagHashKeyOverride.objects.using(using_database)
+        .filter(
+            team_id=team_id,
+            person__persondistinctid__distinct_id__in=distinct_ids,
+            person__persondistinctid__team_id=team_id,
+        )
+        .values_list("person__persondistinctid__distinct_id", "feature_flag_key", "hash_key")
+    ):
+        feature_flag_to_key_overrides.setdefault(distinct_id, {})[feature_flag] = override
+
+    return feature_flag_to_key_overrides
+
+
 # Return a Dict with all flags and their values
 def _get_all_feature_flags(
     feature_flags: List[FeatureFlag],
@@ -580,6 +680,7 @@ def _get_all_feature_flags(
     property_value_overrides: Dict[str, Union[str, int]] = {},
     group_property_value_overrides: Dict[str, Dict[str, Union[str, int]]] = {},
     skip_database_flags: bool = False,
+    bundle: Optional[FeatureFlagBundle] = None,
 ) -> Tuple[Dict[str, Union[str, bool]], Dict[str, dict], Dict[str, object], bool]:
     cache = FlagsMatcherCache(team_id)
 
@@ -593,6 +694,7 @@ def _get_all_feature_flags(
             property_value_overrides,
             group_property_value_overrides,
             skip_database_flags,
+            bundle,
         ).get_matches()
 
     return {}, {}, {}, False
@@ -607,11 +709,8 @@ def get_all_feature_flags(
     property_value_overrides: Dict[str, Union[str, int]] = {},
     group_property_value_overrides: Dict[str, Dict[str, Union[str, int]]] = {},
 ) -> Tuple[Dict[str, Union[str, bool]], Dict[str, dict], Dict[str, object], bool]:
-    all_feature_flags = get_feature_flags_for_team_in_cache(team_id)
-    cache_hit = True
-    if all_feature_flags is None:
-        cache_hit = False
-        all_feature_flags = set_feature_flags_for_team_in_cache(team_id)
+    bundle, cache_hit = get_feature_flag_bundle(team_id)
+    all_feature_flags = list(bundle.feature_flags)
 
     FLAG_CACHE_HIT_COUNTER.labels(team_id=label_for_team_id_to_track(team_id), cache_hit=cache_hit).inc()
 
@@ -632,6 +731,7 @@ def get_all_feature_flags(
                 property_value_overrides=property_value_overrides,
                 group_property_value_overrides=group_property_value_overrides,
                 skip_database_flags=not is_database_alive,
+                bundle=bundle,
             )
 
     with start_span(op="with_experience_continuity_write_path"):
@@ -729,6 +829,7 @@ def get_all_feature_flags(
                 property_value_overrides=property_value_overrides,
                 group_property_value_overrides=group_property_value_overrides,
                 skip_database_flags=True,
+                bundle=bundle,
             )
 
     return _get_all_feature_flags(
@@ -739,6 +840,7 @@ def get_all_feature_flags(
         groups=groups,
         property_value_overrides=property_value_overrides,
         group_property_value_overrides=group_property_value_overrides,
+        bundle=bundle,
     )
 
 
@@ -827,3 +929,85 @@ def parse_exception_for_error_message(err: Exception):
             reason = "query_wait_timeout"
 
     return reason
+
+
+# Return flag values for many distinct_ids at once, and whether there were errors computing any of them
+def get_feature_flags_for_distinct_ids(
+    team_id: int,
+    distinct_ids: List[str],
+    groups: Dict[GroupTypeName, str] = {},
+    property_value_overrides: Dict[str, Union[str, int]] = {},
+    group_property_value_overrides: Dict[str, Dict[str, Union[str, int]]] = {},
+) -> Tuple[Dict[str, Dict[str, Union[str, bool]]], bool]:
+    """
+    Instead of one query per distinct_id, persons are matched against all flag conditions with a single query,
+    and hash key overrides are fetched with another. Groups and overrides apply to all distinct_ids.
+
+    Unlike `get_all_feature_flags`, this never writes hash key overrides.
+    """
+    bundle, _ = get_feature_flag_bundle(team_id)
+    feature_flags = list(bundle.feature_flags)
+    if not feature_flags:
+        return {distinct_id: {} for distinct_id in distinct_ids}, False
+
+    cache = FlagsMatcherCache(team_id)
+    shared_conditions: Dict[str, bool] = {}
+    person_conditions: Dict[str, Dict[str, bool]] = {}
+    hash_key_overrides: Dict[str, Dict[str, str]] = {}
+
+    is_database_alive = postgres_healthcheck.is_connected()
+    if is_database_alive and distinct_ids:
+        try:
+            with execute_with_timeout(FLAG_MATCHING_QUERY_TIMEOUT_MS * 2, DATABASE_FOR_FLAG_MATCHING):
+                if any(feature_flag.ensure_experience_continuity for feature_flag in feature_flags):
+                    hash_key_overrides = get_feature_flag_hash_key_overrides_for_distinct_ids(
+                        team_id, distinct_ids, DATABASE_FOR_FLAG_MATCHING
+                    )
+
+                person_query: QuerySet = Person.objects.using(DATABASE_FOR_FLAG_MATCHING).filter(
+                    team_id=team_id, persondistinctid__distinct_id__in=distinct_ids, persondistinctid__team_id=team_id
+                )
+                shared_conditions, person_query, person_fields, group_queries = FeatureFlagMatcher(
+                    feature_flags,
+                    distinct_ids[0],
+                    groups,
+                    cache,
+                    property_value_overrides=property_value_overrides,
+                    group_property_value_overrides=group_property_value_overrides,
+                    bundle=bundle,
+                ).annotate_condition_queries(person_query)
+
+                if len(person_fields) > 0:
+                    for row in person_query.values("persondistinctid__distinct_id", *person_fields):
+                        person_conditions[row.pop("persondistinctid__distinct_id")] = row
+
+                shared_conditions = {
+                    **shared_conditions,
+                    **FeatureFlagMatcher.evaluate_group_condition_queries(group_queries),
+                }
+        except Exception as err:
+            handle_feature_flag_exception(err, "[Feature Flags] Error computing flags for many distinct_ids")
+            # Flags that need the database are reported as errors, the rest can still be computed
+            is_database_alive = False
+
+    all_flag_values = {}
+    faced_errors = False
+    for distinct_id in distinct_ids:
+        flag_values, _, _, faced_error = FeatureFlagMatcher(
+            feature_flags,
+            distinct_id,
+            groups,
+            cache,
+            hash_key_overrides.get(distinct_id, {}),
+            property_value_overrides,
+            group_property_value_overrides,
+            skip_database_flags=not is_database_alive,
+            bundle=bundle,
+            precomputed_conditions={**shared_conditions, **person_conditions.get(distinct_id, {})}
+            if is_database_alive
+            else None,
+        ).get_matches()
+        all_flag_values[distinct_id] = flag_values
+        faced_errors = faced_errors or faced_error
+
+    return all_flag_values, faced_errors
@@ -0,0 +1,451 @@
+"""
+In-process evaluation of feature flag conditions.
+
+`FeatureFlagMatcher.query_conditions` turns every condition of every flag into one big annotated Postgres query.
+Instead, we can fetch the person's (or group's) properties once, cache them, and evaluate most property filters in
+Python. Anything we can't evaluate with the exact same semantics as `properties_to_Q` returns `None`, and the matcher
+falls back to the database for that condition.
+
+Snapshots are invalidated when persons and groups are saved through Django. Static cohort memberships are checked
+against a version per team, bumped whenever a static cohort is saved, which happens after its people are uploaded.
+Anything else, like person updates from ingestion, is picked up once the snapshot expires.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, cast
+
+import structlog
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save, pre_delete
+from prometheus_client import Counter
+
+from posthog.constants import PropertyOperatorType
+from posthog.models.cohort import Cohort, CohortPeople
+from posthog.models.group import Group
+from posthog.models.person import Person, PersonDistinctId
+from posthog.models.property import CLICKHOUSE_ONLY_PROPERTY_TYPES, Property, PropertyGroup
+from posthog.models.signals import mutable_receiver
+from posthog.models.utils import execute_with_timeout
+from posthog.queries.base import is_truthy_property_value, match_property
+from posthog.utils import is_valid_regex
+
+logger = structlog.get_logger(__name__)
+
+# Person updates from ingestion don't go through Django signals, so the TTL bounds how stale a snapshot can be
+PROPERTY_SNAPSHOT_CACHE_TTL = 60
+# The process-local cache can't be invalidated from other processes, so it's kept much shorter
+LOCAL_PROPERTY_SNAPSHOT_CACHE_TTL = 5
+LOCAL_PROPERTY_SNAPSHOT_CACHE_SIZE = 10_000
+
+FLAG_LOCAL_EVALUATION_COUNTER = Counter(
+    "flag_local_evaluation_total",
+    "Feature flag conditions evaluated in-process, or handed back to the database.",
+    labelnames=["evaluated_by"],
+)
+
+PROPERTY_SNAPSHOT_CACHE_HIT_COUNTER = Counter(
+    "flag_property_snapshot_cache_hit_total",
+    "Where person and group property snapshots for flag matching were read from.",
+    labelnames=["source"],
+)
+
+_local_cache: TTLCache = TTLCache(maxsize=LOCAL_PROPERTY_SNAPSHOT_CACHE_SIZE, ttl=LOCAL_PROPERTY_SNAPSHOT_CACHE_TTL)
+_local_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PropertiesSnapshot:
+    properties: Dict[str, Any]
+    # Static cohorts the person belongs to, `None` for groups
+    static_cohort_ids: Optional[FrozenSet[int]] = None
+    # Version of the team's static cohorts when their memberships were read
+    static_cohorts_version: Optional[int] = None
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "properties": self.properties,
+                "static_cohort_ids": sorted(self.static_cohort_ids) if self.static_cohort_ids is not None else None,
+                "static_cohorts_version": self.static_cohorts_version,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "PropertiesSnapshot":
+        parsed = json.loads(data)
+        static_cohort_ids = parsed.get("static_cohort_ids")
+        return cls(
+            properties=parsed["properties"],
+            static_cohort_ids=frozenset(static_cohort_ids) if static_cohort_ids is not None else None,
+            static_cohorts_version=parsed.get("static_cohorts_version"),
+        )
+
+
+def person_snapshot_cache_key(team_id: int, distinct_id: str) -> str:
+    # distinct_ids are user input, so hash them to get a safe cache key
+    return f"flag_matching_person_{team_id}_{hashlib.sha1(distinct_id.encode('utf-8')).hexdigest()}"
+
+
+def group_snapshot_cache_key(team_id: int, group_type_index: int, group_key: str) -> str:
+    return f"flag_matching_group_{team_id}_{group_type_index}_{hashlib.sha1(group_key.encode('utf-8')).hexdigest()}"
+
+
+def static_cohorts_version_cache_key(team_id: int) -> str:
+    return f"flag_matching_static_cohorts_version_{team_id}"
+
+
+def _get_static_cohorts_version(team_id: int) -> Optional[int]:
+    try:
+        return cache.get(static_cohorts_version_cache_key(team_id))
+    except Exception:
+        # redis is unavailable
+        logger.exception("Redis is unavailable")
+        return None
+
+
+def _get_cached_snapshot(key: str) -> Optional[PropertiesSnapshot]:
+    with _local_cache_lock:
+        snapshot = _local_cache.get(key)
+    if snapshot is not None:
+        PROPERTY_SNAPSHOT_CACHE_HIT_COUNTER.labels(source="local").inc()
+        return snapshot
+
+    try:
+        data = cache.get(key)
+    except Exception:
+        # redis is unavailable
+        logger.exception("Redis is unavailable")
+        return None
+
+    if data is None:
+        return None
+
+    PROPERTY_SNAPSHOT_CACHE_HIT_COUNTER.labels(source="redis").inc()
+    snapshot = PropertiesSnapshot.from_json(data)
+    with _local_cache_lock:
+        _local_cache[key] = snapshot
+    return snapshot
+
+
+def _set_cached_snapshot(key: str, snapshot: PropertiesSnapshot) -> None:
+    with _local_cache_lock:
+        _local_cache[key] = snapshot
+    try:
+        cache.set(key, snapshot.to_json(), PROPERTY_SNAPSHOT_CACHE_TTL)
+    except Exception:
+        # redis is unavailable
+        logger.exception("Redis is unavailable")
+
+
+def _delete_cached_snapshots(keys: List[str]) -> None:
+    with _local_cache_lock:
+        for key in keys:
+            _local_cache.pop(key, None)
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        # redis is unavailable
+        logger.exception("Redis is unavailable")
+
+
+def get_person_snapshot(
+    team_id: int,
+    distinct_id: str,
+    include_static_cohorts: bool = False,
+    using_database: str = "default",
+    allow_database: bool = True,
+    timeout_ms: int = 300,
+) -> Optional[PropertiesSnapshot]:
+    """
+    Returns the person's properties (and static cohort memberships, if asked for), or `None` if the person doesn't
+    exist. Persons that don't exist aren't cached, as they're usually about to be ingested.
+    """
+    key = person_snapshot_cache_key(team_id, distinct_id)
+    snapshot = _get_cached_snapshot(key)
+    # Read before the memberships, so that a static cohort saved meanwhile invalidates them
+    static_cohorts_version = _get_static_cohorts_version(team_id) if include_static_cohorts else None
+    if snapshot is not None and (
+        not include_static_cohorts
+        or (snapshot.static_cohort_ids is not None and snapshot.static_cohorts_version == static_cohorts_version)
+    ):
+        return snapshot
+    if not allow_database:
+        return snapshot
+
+    PROPERTY_SNAPSHOT_CACHE_HIT_COUNTER.labels(source="database").inc()
+    with execute_with_timeout(timeout_ms, using_database):
+        person = (
+            Person.objects.using(using_database)
+            .filter(team_id=team_id, persondistinctid__distinct_id=distinct_id, persondistinctid__team_id=team_id)
+            .values_list("id", "properties")
+            .first()
+        )
+        if person is None:
+            return None
+
+        person_id, properties = person
+        static_cohort_ids = None
+        if include_static_cohorts:
+            static_cohort_ids = frozenset(
+                CohortPeople.objects.using(using_database)
+                .filter(person_id=person_id, cohort__team_id=team_id, cohort__is_static=True)
+                .values_list("cohort_id", flat=True)
+            )
+
+    snapshot = PropertiesSnapshot(
+        properties=properties or {},
+        static_cohort_ids=static_cohort_ids,
+        static_cohorts_version=static_cohorts_version if include_static_cohorts else None,
+    )
+    _set_cached_snapshot(key, snapshot)
+    return snapshot
+
+
+def get_group_snapshot(
+    team_id: int,
+    group_type_index: int,
+    group_key: str,
+    using_database: str = "default",
+    allow_database: bool = True,
+    timeout_ms: int = 300,
+) -> Optional[PropertiesSnapshot]:
+    key = group_snapshot_cache_key(team_id, group_type_index, group_key)
+    snapshot = _get_cached_snapshot(key)
+    if snapshot is not None or not allow_database:
+        return snapshot
+
+    PROPERTY_SNAPSHOT_CACHE_HIT_COUNTER.labels(source="database").inc()
+    with execute_with_timeout(timeout_ms, using_database):
+        group_properties = (
+            Group.objects.using(using_database)
+            .filter(team_id=team_id, group_type_index=group_type_index, group_key=group_key)
+            .values_list("group_properties", flat=True)
+            .first()
+        )
+    if group_properties is None:
+        return None
+
+    snapshot = PropertiesSnapshot(properties=group_properties or {})
+    _set_cached_snapshot(key, snapshot)
+    return snapshot
+
+
+@mutable_receiver([post_save, pre_delete], sender=Person)
+def invalidate_person_snapshot(sender, instance: Person, **kwargs):
+    if not settings.DECIDE_LOCAL_FLAG_EVALUATION_ENABLED:
+        return
+    distinct_ids = PersonDistinctId.objects.filter(person_id=instance.pk, team_id=instance.team_id).values_list(
+        "distinct_id", flat=True
+    )
+    keys = [person_snapshot_cache_key(instance.team_id, distinct_id) for distinct_id in distinct_ids]
+    if keys:
+        _delete_cached_snapshots(keys)
+
+
+@mutable_receiver([post_save, pre_delete], sender=Group)
+def invalidate_group_snapshot(sender, instance: Group, **kwargs):
+    if not settings.DECIDE_LOCAL_FLAG_EVALUATION_ENABLED:
+        return
+    _delete_cached_snapshots(
+        [group_snapshot_cache_key(instance.team_id, instance.group_type_index, instance.group_key)]
+    )
+
+
+@mutable_receiver(post_save, sender=Cohort)
+def invalidate_static_cohort_memberships(sender, instance: Cohort, **kwargs):
+    if not settings.DECIDE_LOCAL_FLAG_EVALUATION_ENABLED or not instance.is_static:
+        return
+    try:
+        # Kept as long as snapshots, so that the ones read before the bump expire before it does
+        cache.set(static_cohorts_version_cache_key(instance.team_id), time.time_ns(), PROPERTY_SNAPSHOT_CACHE_TTL)
+    except Exception:
+        # redis is unavailable
+        logger.exception("Redis is unavailable")
+
+
+def _json_equals(left: Any, right: Any) -> bool:
+    # jsonb equality: `true` is not `1`, and `"1"` is not `1`
+    if isinstance(left, bool) != isinstance(right, bool):
+        return False
+    return left == right
+
+
+def _json_text(value: Any) -> Optional[str]:
+    # What Postgres returns for `properties ->> 'key'`, for scalar values
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return json.dumps(value)
+    if isinstance(value, str):
+        return value
+    return None
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _match_exact(property_value: Any, value: Any) -> bool:
+    value_as_given = Property._parse_value(value)
+    if is_truthy_property_value(value_as_given):
+        truthy = value_as_given in (True, [True], "true", ["true"])
+        return _json_equals(property_value, truthy) or _json_equals(property_value, str(truthy).lower())
+
+    candidates = [value_as_given, Property._parse_value(value, convert_to_number=True)]
+    for candidate in candidates:
+        if isinstance(candidate, list):
+            if any(_json_equals(property_value, item) for item in candidate):
+                return True
+        elif _json_equals(property_value, candidate):
+            return True
+    return False
+
+
+def _match_operator(operator: str, property_value: Any, value: Any) -> Optional[bool]:
+    if operator == "exact":
+        return _match_exact(property_value, value)
+
+    if operator in ("icontains", "regex"):
+        text = _json_text(property_value)
+        if text is None or isinstance(value, (list, dict)):
+            return None
+        if operator == "icontains":
+            return str(value).lower() in text.lower()
+        return re.search(str(value), text) is not None
+
+    if operator in ("gt", "gte", "lt", "lte"):
+        # jsonb orders values of different types by type, and strings by collation, so only compare numbers locally
+        if not _is_number(property_value) or not _is_number(value):
+            return None
+        if operator == "gt":
+            return property_value > value
+        if operator == "gte":
+            return property_value >= value
+        if operator == "lt":
+            return property_value < value
+        return property_value <= value
+
+    return None
+
+
+def match_property_locally(
+    property: Property,
+    snapshot: PropertiesSnapshot,
+    is_group: bool,
+    override_property_values: Dict[str, Any],
+    cohorts_cache: Dict[int, Cohort],
+) -> Optional[bool]:
+    """Evaluates a single property like `property_to_Q` would, or returns `None` if we can't do so exactly."""
+    if property.type in CLICKHOUSE_ONLY_PROPERTY_TYPES:
+        return None
+
+    value = property._parse_value(property.value)
+    if property.type == "cohort":
+        cohort = cohorts_cache.get(int(cast(Any, value)))
+        if cohort is None:
+            return None
+        if cohort.is_static:
+            if snapshot.static_cohort_ids is None:
+                return None
+            return cohort.pk in snapshot.static_cohort_ids
+        return match_property_group_locally(
+            cohort.properties, snapshot, is_group, override_property_values, cohorts_cache
+        )
+
+    if property.key in override_property_values and property.operator != "is_not_set":
+        return match_property(property, override_property_values)
+
+    if (property.type == "group") != is_group:
+        return None
+
+    operator = property.operator or "exact"
+    has_key = property.key in snapshot.properties
+    property_value = snapshot.properties.get(property.key)
+
+    if operator == "is_set":
+        return has_key
+    if operator == "is_not_set":
+        return not has_key
+    if operator == "is_not":
+        if not has_key or property_value is None:
+            return True
+        if isinstance(value, list):
+            return not any(_json_equals(property_value, item) for item in value)
+        return not _json_equals(property_value, value)
+    if operator in ("regex", "not_regex") and not is_valid_regex(value):
+        return False
+
+    negated = operator.startswith("not_")
+    if negated:
+        operator = operator[4:]
+    if operator not in ("exact", "icontains", "regex", "gt", "gte", "lt", "lte"):
+        # e.g. date operators compare jsonb strings using the database collation
+        return None
+
+    if not has_key or property_value is None:
+        # the database requires the key to be set to a non-null value before comparing
+        return negated
+
+    result = _match_operator(operator, property_value, property.value)
+    if result is None:
+        return None
+    return not result if negated else result
+
+
+def match_property_group_locally(
+    property_group: PropertyGroup,
+    snapshot: PropertiesSnapshot,
+    is_group: bool,
+    override_property_values: Dict[str, Any],
+    cohorts_cache: Dict[int, Cohort],
+) -> Optional[bool]:
+    if not property_group or len(property_group.values) == 0:
+        return True
+
+    results = []
+    for item in property_group.values:
+        if isinstance(item, PropertyGroup):
+            result = match_property_group_locally(item, snapshot, is_group, override_property_values, cohorts_cache)
+        else:
+            result = match_property_locally(item, snapshot, is_group, override_property_values, cohorts_cache)
+            if result is not None and item.negation:
+                result = not result
+        if result is None:
+            return None
+        results.append(result)
+
+    if property_group.type == PropertyOperatorType.OR:
+        return any(results)
+    return all(results)
+
+
+def match_properties_locally(
+    properties: List[Property],
+    snapshot: Optional[PropertiesSnapshot],
+    is_group: bool,
+    override_property_values: Dict[str, Any],
+    cohorts_cache: Dict[int, Cohort],
+) -> Optional[bool]:
+    """
+    Returns whether all properties match the snapshot, or `None` if the database needs to decide.
+    A missing snapshot means the person or group doesn't exist, which never matches, same as in the database.
+    """
+    if snapshot is None:
+        result: Optional[bool] = False
+    else:
+        result = match_property_group_locally(
+            PropertyGroup(type=PropertyOperatorType.AND, values=properties),
+            snapshot,
+            is_group,
+            override_property_values,
+            cohorts_cache,
+        )
+
+    FLAG_LOCAL_EVALUATION_COUNTER.labels(evaluated_by="database" if result is None else "local").inc()
+    return result
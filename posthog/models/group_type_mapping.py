@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+
+from posthog.hogql.database.version import invalidate_hogql_database
+from posthog.models.signals import mutable_receiver
 
 
 # This table is responsible for mapping between group types for a Team/Project and event columns
@@ -19,3 +23,8 @@ class GroupTypeMapping(models.Model):
     # Used to display in UI
     name_singular: models.CharField = models.CharField(max_length=400, null=True, blank=True)
     name_plural: models.CharField = models.CharField(max_length=400, null=True, blank=True)
+
+
+@mutable_receiver([post_save, post_delete], sender=GroupTypeMapping)
+def invalidate_hogql_database_on_group_type_mapping_change(sender, instance, **kwargs):
+    invalidate_hogql_database(instance.team_id)
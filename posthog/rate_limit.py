@@ -161,6 +161,7 @@ class DecideRateThrottle(BaseThrottle):
     """
 
     def __init__(self, replenish_rate: float = 5, bucket_capacity=100) -> None:
+        self.bucket_capacity = bucket_capacity
         self.limiter = Limiter(
             rate=replenish_rate,
             capacity=bucket_capacity,
@@ -187,14 +188,30 @@ class DecideRateThrottle(BaseThrottle):
         except Exception:
             return None
 
-    def allow_request(self, request, view):
+    @staticmethod
+    def safely_get_distinct_id_count(request: Request) -> int:
+        """
+        Gets the number of distinct_ids of a batch request without throwing, so that each one counts as a request.
+        """
+        try:
+            from posthog.utils import load_data_from_request
+
+            distinct_ids = load_data_from_request(request).get("distinct_ids")
+            if isinstance(distinct_ids, list):
+                return max(len(set(str(distinct_id) for distinct_id in distinct_ids)), 1)
+        except Exception:
+            pass
+        return 1
+
+    def allow_request(self, request, view, num_tokens: int = 1):
 
         if not is_decide_rate_limit_enabled():
             return True
 
         try:
             bucket_key = self.get_bucket_key(request)
-            request_would_be_allowed = self.limiter.consume(bucket_key)
+            # A request costing more than the bucket holds would never be allowed, so it takes the whole bucket instead
+            request_would_be_allowed = self.limiter.consume(bucket_key, min(num_tokens, self.bucket_capacity))
 
             if not request_would_be_allowed:
                 DECIDE_RATE_LIMIT_EXCEEDED_COUNTER.labels(token=bucket_key).inc()
@@ -1,8 +1,10 @@
 from posthog.settings.base_variables import TEST
-from posthog.settings.utils import get_from_env
+from posthog.settings.utils import get_from_env, str_to_bool
 
 USE_PRECALCULATED_CH_COHORT_PEOPLE = not TEST
 CALCULATE_X_COHORTS_PARALLEL = get_from_env("CALCULATE_X_COHORTS_PARALLEL", 5, type_cast=int)
+# Upload static cohorts with a single Postgres query for all persons, instead of one per 1000 distinct IDs
+STATIC_COHORT_BULK_UPLOAD_ENABLED = get_from_env("STATIC_COHORT_BULK_UPLOAD_ENABLED", True, type_cast=str_to_bool)
 
 ACTION_EVENT_MAPPING_INTERVAL_SECONDS = get_from_env("ACTION_EVENT_MAPPING_INTERVAL_SECONDS", 300, type_cast=int)
 
@@ -25,6 +27,12 @@ COUNT_TILES_WITH_NO_FILTERS_HASH_INTERVAL_SECONDS = get_from_env(
 
 CACHED_RESULTS_TTL = 7 * 24 * 60 * 60  # how long to keep cached results for
 
+# Serve stale cached results right away, and refresh them in the background
+STALE_WHILE_REVALIDATE_ENABLED = get_from_env("STALE_WHILE_REVALIDATE_ENABLED", False, type_cast=str_to_bool)
+
+# Only query the buckets of trends series that changed since they were cached, for teams in STRICT_CACHING_TEAMS
+TRENDS_BUCKET_CACHE_ENABLED = get_from_env("TRENDS_BUCKET_CACHE_ENABLED", not TEST, type_cast=str_to_bool)
+
 # Schedule to run asynchronous data deletion on. Follows crontab syntax.
 # Use empty string to prevent this
 CLEAR_CLICKHOUSE_REMOVED_DATA_SCHEDULE_CRON = get_from_env(
@@ -43,6 +43,28 @@ DECIDE_SKIP_HASH_KEY_OVERRIDE_WRITES = get_from_env(
     "DECIDE_SKIP_HASH_KEY_OVERRIDE_WRITES", False, type_cast=str_to_bool
 )
 
+# Evaluate flag conditions in-process against cached person and group properties, instead of in Postgres
+DECIDE_LOCAL_FLAG_EVALUATION_ENABLED = get_from_env(
+    "DECIDE_LOCAL_FLAG_EVALUATION_ENABLED", False, type_cast=str_to_bool
+)
+
+# Maximum number of distinct_ids a single batch decide request can evaluate flags for
+DECIDE_BATCH_MAX_DISTINCT_IDS = get_from_env("DECIDE_BATCH_MAX_DISTINCT_IDS", 1000, type_cast=int)
+
+# Reuse the printed SQL of HogQL queries that only differ in their string constants
+HOGQL_COMPILED_QUERY_CACHE_ENABLED = get_from_env("HOGQL_COMPILED_QUERY_CACHE_ENABLED", True, type_cast=str_to_bool)
+
+# Calculate tiles of dashboards loaded with `refresh=true` concurrently, up to PARALLEL_DASHBOARD_ITEM_CACHE at a time
+DASHBOARD_PARALLEL_REFRESH_ENABLED = get_from_env("DASHBOARD_PARALLEL_REFRESH_ENABLED", not TEST, type_cast=str_to_bool)
+
+# Calculate the series of trends queries concurrently, up to this many at a time per query
+TRENDS_SERIES_MAX_WORKERS = get_from_env("TRENDS_SERIES_MAX_WORKERS", 1 if TEST else 4, type_cast=int)
+
+# Find the breakdown values of trends series in the same query as the series, instead of in a query of their own
+TRENDS_BREAKDOWN_SINGLE_QUERY_ENABLED = get_from_env(
+    "TRENDS_BREAKDOWN_SINGLE_QUERY_ENABLED", False, type_cast=str_to_bool
+)
+
 # Application definition
 
 INSTALLED_APPS = [
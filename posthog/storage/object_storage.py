@@ -1,5 +1,5 @@
 import abc
-from typing import Optional, Union, List, Dict
+from typing import IO, Optional, Union, List, Dict
 
 import structlog
 from boto3 import client
@@ -45,6 +45,13 @@ class ObjectStorageClient(metaclass=abc.ABCMeta):
     def write(self, bucket: str, key: str, content: Union[str, bytes], extras: Dict | None) -> None:
         pass
 
+    @abc.abstractmethod
+    def write_file(self, bucket: str, key: str, file: IO[bytes], extras: Dict | None) -> None:
+        """
+        Upload the contents of a file, in parts if it's large, without reading it into memory at once.
+        """
+        pass
+
     @abc.abstractmethod
     def copy_objects(self, bucket: str, source_prefix: str, target_prefix: str) -> int | None:
         """
@@ -75,6 +82,9 @@ class UnavailableStorage(ObjectStorageClient):
     def write(self, bucket: str, key: str, content: Union[str, bytes], extras: Dict | None) -> None:
         pass
 
+    def write_file(self, bucket: str, key: str, file: IO[bytes], extras: Dict | None) -> None:
+        pass
+
     def copy_objects(self, bucket: str, source_prefix: str, target_prefix: str) -> int | None:
         pass
 
@@ -153,6 +163,14 @@ class ObjectStorage(ObjectStorageClient):
             capture_exception(e)
             raise ObjectStorageError("write failed") from e
 
+    def write_file(self, bucket: str, key: str, file: IO[bytes], extras: Dict | None) -> None:
+        try:
+            self.aws_client.upload_fileobj(file, bucket, key, ExtraArgs=extras)
+        except Exception as e:
+            logger.error("object_storage.write_file_failed", bucket=bucket, file_name=key, error=e)
+            capture_exception(e)
+            raise ObjectStorageError("write failed") from e
+
     def copy_objects(self, bucket: str, source_prefix: str, target_prefix: str) -> int | None:
         try:
             source_objects = self.list_objects(bucket, source_prefix) or []
@@ -200,6 +218,12 @@ def write(file_name: str, content: Union[str, bytes], extras: Dict | None = None
     )
 
 
+def write_file(file_name: str, file: IO[bytes], extras: Dict | None = None) -> None:
+    return object_storage_client().write_file(
+        bucket=settings.OBJECT_STORAGE_BUCKET, key=file_name, file=file, extras=extras
+    )
+
+
 def tag(file_name: str, tags: Dict[str, str]) -> None:
     return object_storage_client().tag(bucket=settings.OBJECT_STORAGE_BUCKET, key=file_name, tags=tags)
 
@@ -1,3 +1,4 @@
+import io
 import uuid
 from unittest.mock import patch
 
@@ -10,7 +11,15 @@ from posthog.settings import (
     OBJECT_STORAGE_ENDPOINT,
     OBJECT_STORAGE_SECRET_ACCESS_KEY,
 )
-from posthog.storage.object_storage import health_check, read, write, get_presigned_url, list_objects, copy_objects
+from posthog.storage.object_storage import (
+    health_check,
+    read,
+    write,
+    write_file,
+    get_presigned_url,
+    list_objects,
+    copy_objects,
+)
 from posthog.test.base import APIBaseTest
 
 TEST_BUCKET = "test_storage_bucket"
@@ -53,6 +62,12 @@ class TestStorage(APIBaseTest):
             write(file_name, "my content".encode("utf-8"))
             self.assertEqual(read(file_name), "my content")
 
+    def test_write_file_and_read_works_with_known_content(self) -> None:
+        with self.settings(OBJECT_STORAGE_ENABLED=True):
+            file_name = f"{TEST_BUCKET}/test_write_file_and_read_works_with_known_content/{uuid.uuid4()}"
+            write_file(file_name, io.BytesIO(b"my content"))
+            self.assertEqual(read(file_name), "my content")
+
     def test_can_generate_presigned_url_for_existing_file(self) -> None:
         with self.settings(OBJECT_STORAGE_ENABLED=True):
             session_id = str(uuid.uuid4())
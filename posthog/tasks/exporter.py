@@ -36,7 +36,7 @@ EXPORT_TIMER = Histogram(
 # export_asset is used in chords/groups and so must not ignore its results
 @app.task(autoretry_for=(Exception,), max_retries=5, retry_backoff=True, acks_late=True, ignore_result=False)
 def export_asset(exported_asset_id: int, limit: Optional[int] = None) -> None:
-    from posthog.tasks.exports import csv_exporter, image_exporter
+    from posthog.tasks.exports import arrow_exporter, csv_exporter, image_exporter
 
     # if Celery is lagging then you can end up with an exported asset that has had a TTL added
     # and that TTL has passed, in the exporter we don't care about that.
@@ -50,6 +50,9 @@ def export_asset(exported_asset_id: int, limit: Optional[int] = None) -> None:
         max_limit = exported_asset.export_context.get("max_limit", 10000)
         csv_exporter.export_csv(exported_asset, limit=limit, max_limit=max_limit)
         EXPORT_QUEUED_COUNTER.labels(type="csv").inc()
+    elif exported_asset.export_format in arrow_exporter.COLUMNAR_EXPORT_FORMATS:
+        arrow_exporter.export_arrow(exported_asset)
+        EXPORT_QUEUED_COUNTER.labels(type=exported_asset.file_ext).inc()
     else:
         image_exporter.export_image(exported_asset)
         EXPORT_QUEUED_COUNTER.labels(type="image").inc()
@@ -0,0 +1,103 @@
+import tempfile
+from typing import IO, TYPE_CHECKING, Callable, List, Optional
+
+import structlog
+from sentry_sdk import capture_exception, push_scope
+
+from posthog.hogql.query import stream_hogql_query_as_arrow
+from posthog.models.exported_asset import ExportedAsset, save_content_from_file
+from .csv_exporter import EXPORT_PROGRESS_INTERVAL_ROWS, _save_exported_rows, can_stream_query, stream_query_results
+from ..exporter import EXPORT_FAILED_COUNTER, EXPORT_ASSET_UNKNOWN_COUNTER, EXPORT_SUCCEEDED_COUNTER, EXPORT_TIMER
+
+if TYPE_CHECKING:
+    import pyarrow
+
+logger = structlog.get_logger(__name__)
+
+# HOW DOES THIS WORK
+# HogQL, events and persons queries are read from ClickHouse in the ArrowStream format, as record batches of columns.
+# These are written as they arrive into a Parquet file or an Arrow IPC stream, without converting any values into
+# Python objects, which is then uploaded to object storage. Other exports only support CSV.
+
+COLUMNAR_EXPORT_FORMATS = [ExportedAsset.ExportFormat.PARQUET, ExportedAsset.ExportFormat.ARROW]
+
+
+def write_record_batches(
+    reader: "pyarrow.RecordBatchReader",
+    file: IO[bytes],
+    export_format: str,
+    names: List[str],
+    columns: Optional[List[str]] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Writes record batches to `file` as Parquet or as an Arrow IPC stream, depending on `export_format`. The columns
+    of the batches are called `names`. With `columns`, only those are written, in that order. Returns the number of
+    written rows, and calls `on_progress` with it every EXPORT_PROGRESS_INTERVAL_ROWS rows.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if len(names) != len(reader.schema):
+        names = reader.schema.names
+    # Unknown columns are left out, as there's no type to write them with
+    indexes = [names.index(column) for column in columns if column in names] if columns else list(range(len(names)))
+    schema = pa.schema([reader.schema.field(index).with_name(names[index]) for index in indexes])
+
+    if export_format == ExportedAsset.ExportFormat.PARQUET:
+        writer = pq.ParquetWriter(file, schema)
+    elif export_format == ExportedAsset.ExportFormat.ARROW:
+        writer = pa.ipc.new_stream(file, schema)
+    else:
+        raise NotImplementedError(f"Export to format {export_format} is not supported")
+
+    written_rows = reported_rows = 0
+    with writer:
+        for batch in reader:
+            table = pa.Table.from_arrays([batch.column(index) for index in indexes], schema=schema)
+            writer.write_table(table)
+            written_rows += batch.num_rows
+            if on_progress is not None and written_rows - reported_rows >= EXPORT_PROGRESS_INTERVAL_ROWS:
+                reported_rows = written_rows
+                on_progress(written_rows)
+    return written_rows
+
+
+def _export_query_to_file(exported_asset: ExportedAsset, query: dict, columns: List[str]) -> None:
+    team = exported_asset.team
+    with stream_query_results(team, query, stream=stream_hogql_query_as_arrow, columns=columns) as (names, reader):
+        with tempfile.TemporaryFile() as file:
+            exported_rows = write_record_batches(
+                reader,
+                file,
+                exported_asset.export_format,
+                names,
+                columns=columns,
+                on_progress=lambda rows: _save_exported_rows(exported_asset, rows),
+            )
+            save_content_from_file(exported_asset, file)
+    _save_exported_rows(exported_asset, exported_rows)
+
+
+def export_arrow(exported_asset: ExportedAsset) -> None:
+    export_type = exported_asset.file_ext
+    resource = exported_asset.export_context or {}
+
+    try:
+        source = resource.get("source")
+        if not source or not can_stream_query(source):
+            EXPORT_ASSET_UNKNOWN_COUNTER.labels(type=export_type).inc()
+            raise NotImplementedError(f"Export to format {exported_asset.export_format} is only supported for queries")
+
+        with EXPORT_TIMER.labels(type=export_type).time():
+            _export_query_to_file(exported_asset, source, resource.get("columns", []))
+        EXPORT_SUCCEEDED_COUNTER.labels(type=export_type).inc()
+    except Exception as e:
+        with push_scope() as scope:
+            scope.set_tag("celery_task", "arrow_export")
+            scope.set_tag("team_id", str(exported_asset.team.id))
+            capture_exception(e)
+
+        logger.error("arrow_exporter.failed", exception=e, exc_info=True)
+        EXPORT_FAILED_COUNTER.labels(type=export_type).inc()
+        raise e
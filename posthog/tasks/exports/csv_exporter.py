@@ -1,5 +1,11 @@
+import csv
 import datetime
-from typing import Any, Dict, List, Optional, Tuple
+import io
+import json
+import re
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlunparse
 
 import requests
@@ -8,14 +14,46 @@ from django.http import QueryDict
 from sentry_sdk import capture_exception, push_scope
 
 from posthog.api.query import process_query
+from posthog.constants import INSIGHT_LIFECYCLE, INSIGHT_TRENDS
+from posthog.hogql import ast
+from posthog.hogql.constants import HogQLGlobalSettings
+from posthog.hogql.parser import parse_expr, parse_select
+from posthog.hogql.property import has_aggregation
+from posthog.hogql.query import stream_hogql_query
+from posthog.hogql_queries.events_query_runner import SELECT_STAR_FROM_EVENTS_FIELDS, EventsQueryRunner
+from posthog.hogql_queries.legacy_compatibility.filter_to_query import filter_to_query
+from posthog.hogql_queries.persons_query_runner import PERSON_FULL_TUPLE, PersonsQueryRunner
 from posthog.jwt import PosthogJwtAudience, encode_jwt
-from posthog.models.exported_asset import ExportedAsset, save_content
+from posthog.models.exported_asset import ExportedAsset, save_content, save_content_from_file
+from posthog.models.filters.filter import Filter
+from posthog.models.team import Team
+from posthog.schema import HogQLQuery
 from posthog.utils import absolute_uri
 from .ordered_csv_renderer import OrderedCsvRenderer
 from ..exporter import EXPORT_FAILED_COUNTER, EXPORT_ASSET_UNKNOWN_COUNTER, EXPORT_SUCCEEDED_COUNTER, EXPORT_TIMER
 
 logger = structlog.get_logger(__name__)
 
+# Exported rows between saving the progress of streamed exports
+EXPORT_PROGRESS_INTERVAL_ROWS = 10_000
+# Streamed exports read many more rows than queries in the app, and may take longer
+EXPORT_MAX_EXECUTION_TIME = 600
+
+# API paths of persons and insights, which are exported through their query runners instead of the API
+PERSONS_PATH_PATTERN = re.compile(r"^/?api/(?:projects/[^/]+/persons|person)/?$")
+COHORT_PERSONS_PATH_PATTERN = re.compile(r"^/?api/(?:cohort|projects/[^/]+/cohorts)/(?P<cohort_id>\d+)/persons/?$")
+TRENDS_INSIGHT_PATH_PATTERN = re.compile(r"^/?api/projects/[^/]+/insights/trend/?$")
+
+# Columns of persons exported from the persons API when no columns are requested, like in the CSVs of the API
+PERSONS_EXPORT_COLUMNS = ["id", "email", "created_at", "properties", *(f"distinct_ids.{index}" for index in range(10))]
+# Fields of the `person` column of events queries, as expanded by the query runner, and what they're selected as
+EVENTS_PERSON_FIELDS = {
+    "uuid": ["person", "id"],
+    "created_at": ["person", "created_at"],
+    "properties": ["person", "properties"],
+    "distinct_id": ["distinct_id"],
+}
+
 
 # SUPPORTED CSV TYPES
 
@@ -40,6 +78,10 @@ logger = structlog.get_logger(__name__)
 # 3. We save the response to a chunk in object storage and then load the `next` page of results
 # 4. Repeat until exhausted or limit reached
 # 5. We save the final blob output and update the ExportedAsset
+#
+# HogQL, events and persons queries are instead streamed from ClickHouse into a CSV file, without a limit on the number
+# of rows, which is then uploaded to object storage. See `_export_query_to_csv`. The same goes for persons requested
+# through the API, while trends and lifecycle insights are calculated by their query runners.
 
 
 def add_query_params(url: str, params: Dict[str, str]) -> str:
@@ -68,6 +110,10 @@ def _convert_response_to_csv_data(data: Any) -> List[Any]:
     if isinstance(data.get("results"), list):
         results = data.get("results")
 
+        # insight query runners like
+        if len(results) > 0 and isinstance(results[0], dict) and isinstance(results[0].get("data"), list):
+            return _convert_response_to_csv_data({"result": results})
+
         # query like
         if len(results) > 0 and (isinstance(results[0], list) or isinstance(results[0], tuple)) and "types" in data:
             # e.g. {'columns': ['count()'], 'hasMore': False, 'results': [[1775]], 'types': ['UInt64']}
@@ -171,10 +217,20 @@ def _export_to_csv(exported_asset: ExportedAsset, limit: int = 1000, max_limit:
 
     all_csv_rows: List[Any] = []
 
-    if resource.get("source"):
+    query = resource.get("source")
+    if not query and resource.get("path"):
+        path_query = _path_to_query(exported_asset.team, resource["path"])
+        if path_query is not None:
+            query, default_columns = path_query
+            columns = columns or default_columns
+
+    if query and can_stream_query(query):
+        _export_query_to_csv(exported_asset, query, columns)
+        return
+
+    if query:
         from posthog.hogql.constants import MAX_SELECT_RETURNED_ROWS
 
-        query = resource.get("source")
         query_response = process_query(
             team=exported_asset.team, query_json=query, default_limit=MAX_SELECT_RETURNED_ROWS
         )
@@ -216,7 +272,7 @@ def _export_to_csv(exported_asset: ExportedAsset, limit: int = 1000, max_limit:
 
             csv_rows = _convert_response_to_csv_data(data)
 
-            all_csv_rows = all_csv_rows + csv_rows
+            all_csv_rows.extend(csv_rows)
 
             if not data.get("next") or not csv_rows:
                 break
@@ -240,6 +296,248 @@ def _export_to_csv(exported_asset: ExportedAsset, limit: int = 1000, max_limit:
     save_content(exported_asset, rendered_csv_content)
 
 
+def _path_to_query(team: Team, path: str) -> Optional[Tuple[Dict, List[str]]]:
+    """
+    The query, and the default export columns, of an API path of persons or of a trends or lifecycle insight. None for
+    other paths, which are exported by calling the API.
+    """
+    parsed = urlparse(path)
+    params = dict(parse_qsl(parsed.query, keep_blank_values=True))
+    cohort_match = COHORT_PERSONS_PATH_PATTERN.match(parsed.path)
+    try:
+        if cohort_match or PERSONS_PATH_PATTERN.match(parsed.path):
+            # A lookup of a single person, rather than a list
+            if params.get("distinct_id"):
+                return None
+            properties = json.loads(params["properties"]) if params.get("properties") else []
+            if not isinstance(properties, list) or any(
+                not isinstance(property, dict) or property.get("type") not in ("person", "cohort")
+                for property in properties
+            ):
+                return None
+            if cohort_match:
+                properties.append({"type": "cohort", "key": "id", "value": int(cohort_match.group("cohort_id"))})
+            query: Dict[str, Any] = {"kind": "PersonsQuery", "select": ["id", "created_at"], "properties": properties}
+            if params.get("search"):
+                query["search"] = params["search"]
+            # Validate the query here, so that filters it doesn't support are exported through the API instead
+            PersonsQueryRunner(query, team)
+            return query, PERSONS_EXPORT_COLUMNS
+
+        if TRENDS_INSIGHT_PATH_PATTERN.match(parsed.path):
+            filter = Filter(data=params, team=team)
+            if filter.insight not in (INSIGHT_TRENDS, INSIGHT_LIFECYCLE):
+                return None
+            return filter_to_query(filter.to_dict()).model_dump(exclude_none=True), []
+    except Exception as e:
+        logger.warning("csv_exporter.path_not_converted_to_query", path=path, exception=e)
+    return None
+
+
+def can_stream_query(query: Dict) -> bool:
+    if query.get("kind") == "HogQLQuery":
+        return not query.get("explain")
+    return query.get("kind") in ("EventsQuery", "PersonsQuery")
+
+
+def _field_chain(chain: List[str], fields: Dict[str, List[str]]) -> Optional[List[str]]:
+    # Only JSON fields have nested fields
+    if chain[0] not in fields or (len(chain) > 1 and chain[0] != "properties"):
+        return None
+    return [*fields[chain[0]], *chain[1:]]
+
+
+def _select_columns(select_query: ast.SelectQuery, columns: List[Tuple[str, Optional[ast.Expr]]]) -> List[str]:
+    """Selects the given columns that are known, grouping by them like the query runners do. Returns their names."""
+    known_columns = [(name, expr) for name, expr in columns if expr is not None]
+    exprs = [expr for _, expr in known_columns]
+    # A query needs at least one column, even if none of the requested ones are known
+    select_query.select = exprs or [ast.Constant(value=None)]
+    if select_query.group_by is not None:
+        select_query.group_by = [expr for expr in exprs if not has_aggregation(expr)]
+    return [name for name, _ in known_columns]
+
+
+def _select_events_query_columns(
+    query_runner: EventsQueryRunner, select_query: ast.SelectQuery, columns: List[str]
+) -> List[str]:
+    """
+    Selects the columns to export from an events query, and returns their names. The `*` and `person` columns are
+    expanded by the query runner after querying, so instead their fields that are exported are selected directly,
+    e.g. `*.properties.$current_url` or `person.properties.email`. Without either, the query is left as is.
+    """
+    select = query_runner.select_input_raw()
+    person_columns = [column for column in select if column.split("--")[0].strip() == "person"]
+    if "*" not in select and not person_columns:
+        return select
+    if not columns:
+        for column in select:
+            if column == "*":
+                columns.extend(f"*.{field}" for field in SELECT_STAR_FROM_EVENTS_FIELDS)
+            elif column in person_columns:
+                columns.extend(f"{column}.{field}" for field in EVENTS_PERSON_FIELDS)
+            else:
+                columns.append(column)
+
+    star_fields = {field: [field] for field in SELECT_STAR_FROM_EVENTS_FIELDS}
+    exprs_by_column = dict(zip(select, select_query.select))
+    selected_columns: List[Tuple[str, Optional[ast.Expr]]] = []
+    for column in columns:
+        chain: Optional[List[str]] = None
+        if column in exprs_by_column and column != "*" and column not in person_columns:
+            selected_columns.append((column, exprs_by_column[column]))
+            continue
+        if "*" in select and column.startswith("*."):
+            chain = _field_chain(column[2:].split("."), star_fields)
+        for person_column in person_columns:
+            if column.startswith(f"{person_column}."):
+                chain = _field_chain(column[len(person_column) + 1 :].split("."), EVENTS_PERSON_FIELDS)
+        selected_columns.append((column, ast.Field(chain=chain) if chain else None))
+    return _select_columns(select_query, selected_columns)
+
+
+def _select_persons_query_columns(
+    query_runner: PersonsQueryRunner, select_query: ast.SelectQuery, columns: List[str]
+) -> List[str]:
+    """
+    Like `_select_events_query_columns`, for persons queries. The fields of the `person` column, and those returned by
+    the persons API, e.g. `properties.email` or `distinct_ids.0`, are selected directly.
+    """
+    select = query_runner.input_columns()
+    if "person" not in select and all(column in select for column in columns):
+        return select
+    if not columns:
+        for column in select:
+            if column == "person":
+                columns.extend(f"person.{field}" for field in PERSON_FULL_TUPLE)
+            elif column != "person.$delete":
+                columns.append(column)
+
+    person_fields = {field: [field] for field in PERSON_FULL_TUPLE}
+    person_fields.update({"uuid": ["id"], "email": ["properties", "email"]})
+    exprs_by_column = dict(zip(select, select_query.select))
+    selected_columns: List[Tuple[str, Optional[ast.Expr]]] = []
+    for column in columns:
+        if column in exprs_by_column and column not in ("person", "person.$delete"):
+            selected_columns.append((column, exprs_by_column[column]))
+            continue
+        chain = column.split(".")
+        if chain[0] == "person" and "person" in select and len(chain) > 1:
+            chain = chain[1:]
+        if chain[0] == "distinct_ids" and len(chain) == 2 and chain[1].isdigit():
+            # Arrays are indexed from 1
+            index = ast.Constant(value=int(chain[1]) + 1)
+            distinct_ids = ast.Field(chain=["export_distinct_ids", "distinct_ids"])
+            selected_columns.append((column, ast.ArrayAccess(array=distinct_ids, property=index)))
+        else:
+            field_chain = _field_chain(chain, person_fields)
+            selected_columns.append((column, ast.Field(chain=field_chain) if field_chain else None))
+
+    if any(isinstance(expr, ast.ArrayAccess) for _, expr in selected_columns):
+        # The distinct IDs of each person, in no particular order
+        select_query.select_from.next_join = ast.JoinExpr(
+            join_type="LEFT JOIN",
+            table=parse_select(
+                "SELECT person_id, groupArray(distinct_id) AS distinct_ids FROM person_distinct_ids GROUP BY person_id"
+            ),
+            alias="export_distinct_ids",
+            constraint=ast.JoinConstraint(expr=parse_expr("export_distinct_ids.person_id = persons.id")),
+        )
+    return _select_columns(select_query, selected_columns)
+
+
+@contextmanager
+def stream_query_results(
+    team: Team, query: Dict, stream: Callable = stream_hogql_query, columns: Optional[List[str]] = None
+) -> Iterator[Tuple[List[str], Any]]:
+    """
+    Streams all results of a HogQL, events or persons query, for which `can_stream_query` holds. Yields the names of
+    the columns, and what `stream` yields, e.g. the `StreamedQueryResult` of `stream_hogql_query`.
+
+    Events and persons queries return the export `columns`, or all of their own columns if there are none, with the
+    columns the query runners expand after querying replaced by their fields.
+    """
+    settings = HogQLGlobalSettings(max_execution_time=EXPORT_MAX_EXECUTION_TIME)
+    if query["kind"] == "HogQLQuery":
+        hogql_query = HogQLQuery.model_validate(query)
+        placeholders = (
+            {key: ast.Constant(value=value) for key, value in hogql_query.values.items()}
+            if hogql_query.values
+            else None
+        )
+        with stream(
+            hogql_query.query,
+            team,
+            query_type="HogQLQuery",
+            filters=hogql_query.filters,
+            placeholders=placeholders,
+            modifiers=hogql_query.modifiers,
+            settings=settings,
+        ) as (columns, result):
+            yield columns, result
+    else:
+        query_runner: Union[EventsQueryRunner, PersonsQueryRunner]
+        if query["kind"] == "EventsQuery":
+            query_runner = EventsQueryRunner(query, team)
+            select_query = query_runner.to_query()
+            # Named like in the query runner's responses, which export columns refer to
+            names = _select_events_query_columns(query_runner, select_query, list(columns or []))
+        else:
+            query_runner = PersonsQueryRunner(query, team)
+            select_query = query_runner.to_query()
+            names = _select_persons_query_columns(query_runner, select_query, list(columns or []))
+        # Export all matching rows, unless the query itself is limited
+        limit = query_runner.query.limit
+        select_query.limit = ast.Constant(value=limit) if limit is not None else None
+        with stream(select_query, team, query_type=query["kind"], settings=settings) as (_, result):
+            yield names, result
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _export_query_to_csv(exported_asset: ExportedAsset, query: Dict, columns: List[str]) -> None:
+    """
+    Streams the results of a query from ClickHouse into a temporary CSV file, and uploads it. Memory use doesn't
+    depend on the number of rows. Progress is saved on the asset every EXPORT_PROGRESS_INTERVAL_ROWS rows.
+    """
+    results = stream_query_results(exported_asset.team, query, columns=columns)
+    with results as (query_columns, result), tempfile.TemporaryFile() as file:
+        # Only the requested columns, in the requested order. Unknown columns are left empty.
+        header = columns or query_columns
+        column_indexes = {column: index for index, column in enumerate(query_columns)}
+        indexes = [column_indexes.get(column) for column in header]
+
+        text_file = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        writer = csv.writer(text_file)
+        writer.writerow(header)
+
+        exported_rows = reported_rows = 0
+        for block in result:
+            writer.writerows(
+                [_csv_value(row[index]) if index is not None else None for index in indexes] for row in block
+            )
+            exported_rows += len(block)
+            if exported_rows - reported_rows >= EXPORT_PROGRESS_INTERVAL_ROWS:
+                reported_rows = exported_rows
+                _save_exported_rows(exported_asset, exported_rows)
+
+        text_file.flush()
+        # Hand the file back, so that closing the text wrapper doesn't close it
+        text_file.detach()
+
+        save_content_from_file(exported_asset, file)
+        _save_exported_rows(exported_asset, exported_rows)
+
+
+def _save_exported_rows(exported_asset: ExportedAsset, exported_rows: int) -> None:
+    exported_asset.exported_rows = exported_rows
+    exported_asset.save(update_fields=["exported_rows"])
+
+
 def get_limit_param_key(path: str) -> str:
     query = QueryDict(path)
     breakdown = query.get("breakdown", None)
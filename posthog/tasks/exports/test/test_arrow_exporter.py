@@ -0,0 +1,98 @@
+import io
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from dateutil.relativedelta import relativedelta
+from django.utils.timezone import now
+
+from posthog.models import ExportedAsset
+from posthog.models.utils import UUIDT
+from posthog.storage import object_storage
+from posthog.tasks.exports import arrow_exporter
+from posthog.test.base import APIBaseTest, _create_event, flush_persons_and_events
+
+TEST_PREFIX = "Test-Exports"
+
+
+class TestArrowExporter(APIBaseTest):
+    def _create_events(self, count: int) -> str:
+        random_uuid = str(UUIDT())
+        for i in range(count):
+            _create_event(
+                event="$pageview",
+                distinct_id=random_uuid,
+                team=self.team,
+                timestamp=now() - relativedelta(hours=1),
+                properties={"prop": i},
+            )
+        flush_persons_and_events()
+        return random_uuid
+
+    @patch("posthog.models.exported_asset.UUIDT")
+    def test_exports_hogql_query_to_parquet(self, mocked_uuidt) -> None:
+        random_uuid = self._create_events(15)
+        exported_asset = ExportedAsset.objects.create(
+            team=self.team,
+            export_format=ExportedAsset.ExportFormat.PARQUET,
+            export_context={
+                "source": {
+                    "kind": "HogQLQuery",
+                    "query": f"select event, toInt(properties.prop) from events where distinct_id = '{random_uuid}'",
+                }
+            },
+        )
+        mocked_uuidt.return_value = "a-guid"
+
+        with self.settings(OBJECT_STORAGE_ENABLED=True, OBJECT_STORAGE_EXPORTS_FOLDER=TEST_PREFIX):
+            arrow_exporter.export_arrow(exported_asset)
+
+            assert (
+                exported_asset.content_location
+                == f"{TEST_PREFIX}/parquet/team-{self.team.id}/task-{exported_asset.id}/a-guid"
+            )
+            table = pq.read_table(io.BytesIO(object_storage.read_bytes(exported_asset.content_location) or b""))
+
+        assert table.column_names == ["event", "toInt(properties.prop)"]
+        assert sorted(table.column("toInt(properties.prop)").to_pylist()) == list(range(15))
+        assert exported_asset.filename == "export.parquet"
+        assert exported_asset.exported_rows == 15
+
+    @patch("posthog.tasks.exports.csv_exporter.EXPORT_PROGRESS_INTERVAL_ROWS", 10)
+    def test_exports_events_query_to_arrow(self) -> None:
+        random_uuid = self._create_events(15)
+        exported_asset = ExportedAsset.objects.create(
+            team=self.team,
+            export_format=ExportedAsset.ExportFormat.ARROW,
+            export_context={
+                "source": {
+                    "kind": "EventsQuery",
+                    "select": ["event", "properties.prop", "distinct_id"],
+                    "where": [f"distinct_id = '{random_uuid}'"],
+                    "orderBy": ["toInt(properties.prop)"],
+                },
+                "columns": ["properties.prop", "event", "unknown"],
+            },
+        )
+
+        with self.settings(OBJECT_STORAGE_ENABLED=False), patch(
+            "posthog.tasks.exports.arrow_exporter._save_exported_rows", wraps=arrow_exporter._save_exported_rows
+        ) as save_exported_rows:
+            arrow_exporter.export_arrow(exported_asset)
+
+        table = pa.ipc.open_stream(bytes(exported_asset.content)).read_all()
+        assert table.column_names == ["properties.prop", "event"]
+        assert table.column("properties.prop").to_pylist() == [str(i) for i in range(15)]
+        assert exported_asset.filename == "export.arrows"
+        assert save_exported_rows.call_args_list[-1].args[1] == 15
+
+    def test_only_exports_queries(self) -> None:
+        exported_asset = ExportedAsset.objects.create(
+            team=self.team,
+            export_format=ExportedAsset.ExportFormat.PARQUET,
+            export_context={"path": f"/api/projects/{self.team.id}/events"},
+        )
+
+        with pytest.raises(NotImplementedError):
+            arrow_exporter.export_arrow(exported_asset)
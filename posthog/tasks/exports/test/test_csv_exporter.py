@@ -1,4 +1,5 @@
 from typing import Any, Dict, Optional
+from urllib.parse import urlencode
 from unittest.mock import MagicMock, Mock, patch, ANY
 
 import pytest
@@ -20,7 +21,7 @@ from posthog.storage import object_storage
 from posthog.storage.object_storage import ObjectStorageError
 from posthog.tasks.exports import csv_exporter
 from posthog.tasks.exports.csv_exporter import UnexpectedEmptyJsonResponse, add_query_params
-from posthog.test.base import APIBaseTest, _create_event, flush_persons_and_events
+from posthog.test.base import APIBaseTest, _create_event, _create_person, flush_persons_and_events
 from posthog.utils import absolute_uri
 
 TEST_PREFIX = "Test-Exports"
@@ -225,7 +226,7 @@ class TestCSVExporter(APIBaseTest):
     def test_csv_exporter_limits_breakdown_insights_correctly(
         self, mocked_request, mocked_object_storage_write, mocked_uuidt
     ) -> None:
-        path = "api/projects/1/insights/trend/?insight=TRENDS&breakdown=email&date_from=-7d"
+        path = "api/projects/1/insights/funnel/?insight=FUNNELS&breakdown=email&date_from=-7d"
         exported_asset = self._create_asset({"path": path})
         mock_response = Mock()
         mock_response.status_code = 200
@@ -314,13 +315,58 @@ class TestCSVExporter(APIBaseTest):
                 == f"{TEST_PREFIX}/csv/team-{self.team.id}/task-{exported_asset.id}/a-guid"
             )
 
+            # HogQL queries are streamed, and aren't limited to MAX_SELECT_RETURNED_ROWS
             content = object_storage.read(exported_asset.content_location)
-            assert (
-                content
-                == "event\r\n$pageview\r\n$pageview\r\n$pageview\r\n$pageview\r\n$pageview\r\n$pageview\r\n$pageview\r\n$pageview\r\n$pageview\r\n$pageview\r\n"
-            )
+            assert content == "event\r\n" + "$pageview\r\n" * 15
 
             assert exported_asset.content is None
+            assert exported_asset.exported_rows == 15
+
+    @patch("posthog.tasks.exports.csv_exporter.EXPORT_PROGRESS_INTERVAL_ROWS", 10)
+    @patch("posthog.clickhouse.client.execute.STREAM_EXECUTE_BLOCK_SIZE", 5)
+    @patch("posthog.models.exported_asset.UUIDT")
+    def test_csv_exporter_streams_events_query(self, mocked_uuidt) -> None:
+        random_uuid = str(UUIDT())
+        for i in range(15):
+            _create_event(
+                event="$pageview",
+                distinct_id=random_uuid,
+                team=self.team,
+                timestamp=now() - relativedelta(hours=1),
+                properties={"prop": i},
+            )
+        flush_persons_and_events()
+
+        exported_asset = ExportedAsset(
+            team=self.team,
+            export_format=ExportedAsset.ExportFormat.CSV,
+            export_context={
+                "source": {
+                    "kind": "EventsQuery",
+                    "select": ["event", "properties.prop", "distinct_id"],
+                    "where": [f"distinct_id = '{random_uuid}'"],
+                    "orderBy": ["toInt(properties.prop)"],
+                },
+                "columns": ["properties.prop", "event", "unknown"],
+            },
+        )
+        exported_asset.save()
+        mocked_uuidt.return_value = "a-guid"
+
+        with self.settings(OBJECT_STORAGE_ENABLED=True, OBJECT_STORAGE_EXPORTS_FOLDER="Test-Exports"), patch(
+            "posthog.tasks.exports.csv_exporter._save_exported_rows", wraps=csv_exporter._save_exported_rows
+        ) as save_exported_rows:
+            csv_exporter.export_csv(exported_asset)
+
+            content = object_storage.read(exported_asset.content_location)
+            lines = (content or "").split("\r\n")
+            self.assertEqual(lines[0], "properties.prop,event,unknown")
+            self.assertEqual(lines[1:16], [f"{i},$pageview," for i in range(15)])
+            self.assertEqual(lines[16], "")
+
+        # Progress after the first 10 rows, and once done
+        self.assertEqual([call.args[1] for call in save_exported_rows.call_args_list], [10, 15])
+        self.assertEqual(exported_asset.exported_rows, 15)
 
     @patch("posthog.hogql.constants.MAX_SELECT_RETURNED_ROWS", 10)
     @patch("posthog.models.exported_asset.UUIDT")
@@ -350,17 +396,113 @@ class TestCSVExporter(APIBaseTest):
             csv_exporter.export_csv(exported_asset)
             content = object_storage.read(exported_asset.content_location)
             lines = (content or "").split("\r\n")
-            self.assertEqual(len(lines), 12)
+            # Events queries selecting `*` are streamed too, and aren't limited to MAX_SELECT_RETURNED_ROWS
+            self.assertEqual(len(lines), 17)
             self.assertEqual(
                 lines[0],
-                "event,*.uuid,*.event,*.properties.prop,*.timestamp,*.team_id,*.distinct_id,*.elements_chain,*.created_at",
+                "event,*.uuid,*.event,*.properties,*.timestamp,*.team_id,*.distinct_id,*.elements_chain,*.created_at",
             )
-            self.assertEqual(lines[11], "")
+            self.assertEqual(lines[16], "")
             first_row = lines[1].split(",")
             self.assertEqual(first_row[0], "$pageview")
             self.assertEqual(first_row[2], "$pageview")
             self.assertEqual(first_row[5], str(self.team.pk))
 
+    @patch("posthog.models.exported_asset.UUIDT")
+    def test_csv_exporter_streams_fields_of_star_and_person_columns(self, mocked_uuidt) -> None:
+        random_uuid = str(UUIDT())
+        _create_person(distinct_ids=[random_uuid], team=self.team, properties={"email": "test@posthog.com"})
+        for i in range(3):
+            _create_event(
+                event="$pageview",
+                distinct_id=random_uuid,
+                team=self.team,
+                timestamp=now() - relativedelta(hours=1),
+                properties={"prop": i},
+            )
+        flush_persons_and_events()
+
+        exported_asset = ExportedAsset(
+            team=self.team,
+            export_format=ExportedAsset.ExportFormat.CSV,
+            export_context={
+                "source": {
+                    "kind": "EventsQuery",
+                    "select": ["*", "person", "event"],
+                    "where": [f"distinct_id = '{random_uuid}'"],
+                    "orderBy": ["toInt(properties.prop)"],
+                },
+                "columns": ["*.properties.prop", "person.properties.email", "person.distinct_id", "event", "*"],
+            },
+        )
+        exported_asset.save()
+        mocked_uuidt.return_value = "a-guid"
+
+        with self.settings(OBJECT_STORAGE_ENABLED=True, OBJECT_STORAGE_EXPORTS_FOLDER="Test-Exports"):
+            csv_exporter.export_csv(exported_asset)
+            content = object_storage.read(exported_asset.content_location)
+
+        self.assertEqual(
+            (content or "").split("\r\n"),
+            [
+                "*.properties.prop,person.properties.email,person.distinct_id,event,*",
+                *[f"{i},test@posthog.com,{random_uuid},$pageview," for i in range(3)],
+                "",
+            ],
+        )
+
+    @patch("posthog.tasks.exports.csv_exporter.requests.request")
+    @patch("posthog.models.exported_asset.UUIDT")
+    def test_csv_exporter_streams_persons_from_persons_path(self, mocked_uuidt, mocked_request) -> None:
+        for i in range(3):
+            _create_person(distinct_ids=[f"user-{i}"], team=self.team, properties={"email": f"user-{i}@posthog.com"})
+        _create_person(distinct_ids=["other"], team=self.team, properties={"email": "other@example.com"})
+        flush_persons_and_events()
+
+        properties = '[{"key": "email", "value": "@posthog.com", "operator": "icontains", "type": "person"}]'
+        exported_asset = self._create_asset(
+            {
+                "path": f"/api/projects/{self.team.id}/persons?{urlencode({'properties': properties})}",
+                "columns": ["distinct_ids.0", "properties.email", "unknown"],
+            }
+        )
+        mocked_uuidt.return_value = "a-guid"
+
+        with self.settings(OBJECT_STORAGE_ENABLED=True, OBJECT_STORAGE_EXPORTS_FOLDER="Test-Exports"):
+            csv_exporter.export_csv(exported_asset)
+            content = object_storage.read(exported_asset.content_location)
+
+        mocked_request.assert_not_called()
+        lines = (content or "").split("\r\n")
+        self.assertEqual(lines[0], "distinct_ids.0,properties.email,unknown")
+        self.assertEqual(sorted(lines[1:4]), [f"user-{i},user-{i}@posthog.com," for i in range(3)])
+        self.assertEqual(lines[4], "")
+
+    @patch("posthog.tasks.exports.csv_exporter.requests.request")
+    @patch("posthog.models.exported_asset.UUIDT")
+    def test_csv_exporter_calculates_trends_from_insight_path(self, mocked_uuidt, mocked_request) -> None:
+        _create_event(event="$pageview", distinct_id="user", team=self.team, timestamp=now() - relativedelta(days=1))
+        flush_persons_and_events()
+
+        events = '[{"id": "$pageview", "type": "events", "order": 0}]'
+        exported_asset = self._create_asset(
+            {
+                "path": f"api/projects/{self.team.id}/insights/trend/?"
+                + urlencode({"insight": "TRENDS", "events": events, "date_from": "-7d"})
+            }
+        )
+        mocked_uuidt.return_value = "a-guid"
+
+        with self.settings(OBJECT_STORAGE_ENABLED=True, OBJECT_STORAGE_EXPORTS_FOLDER="Test-Exports"):
+            csv_exporter.export_csv(exported_asset)
+            content = object_storage.read(exported_asset.content_location)
+
+        mocked_request.assert_not_called()
+        lines = (content or "").split("\r\n")
+        self.assertTrue(lines[0].startswith("series,"))
+        self.assertTrue(lines[1].startswith("$pageview,"))
+        self.assertEqual(sum(float(value) for value in lines[1].split(",")[1:]), 1)
+
     def _split_to_dict(self, url: str) -> Dict[str, Any]:
         first_split_parts = url.split("?")
         assert len(first_split_parts) == 2
@@ -14,6 +14,7 @@ from unittest.mock import patch
 from uuid import uuid4
 
 import aiohttp
+import pyarrow as pa
 import pytest
 import pytest_asyncio
 from django.conf import settings
@@ -33,7 +34,9 @@ from posthog.temporal.workflows.batch_exports import (
     get_data_interval,
     get_results_iterator,
     get_rows_count,
+    iter_batch_records,
     json_dumps_bytes,
+    prepare_record_batch,
 )
 from posthog.temporal.workflows.clickhouse import ClickHouseClient
 
@@ -743,6 +746,89 @@ def test_batch_export_temporary_file_write_records_to_tsv(records):
         assert be_file.records_since_last_reset == 0
 
 
+def make_record_batch():
+    """A record batch with the types ClickHouse sends for the exported fields."""
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array([b"uuid-1", b"uuid-2"], pa.binary()),
+            pa.array([1, 1], pa.int64()),
+            pa.array(
+                [dt.datetime(2023, 4, 20, 14, 30, 0, 123), dt.datetime(2023, 4, 20, 14, 30)],
+                pa.timestamp("us", tz="UTC"),
+            ),
+            pa.array([None, dt.datetime(2023, 4, 20, 14, 31)], pa.timestamp("us", tz="UTC")),
+            pa.array(['{"$ip": "127.0.0.1", "$set": {"a": "\u00e9"}, "b": "\\n"}'.encode("utf-8"), b""], pa.binary()),
+            pa.array([b'text="a"', b""], pa.binary()),
+        ],
+        names=["uuid", "team_id", "timestamp", "inserted_at", "properties", "elements_chain"],
+    )
+
+
+def test_prepare_record_batch():
+    """Test strings are decoded and timestamps formatted like isoformat, for the whole batch."""
+    batch = prepare_record_batch(make_record_batch())
+
+    assert batch.to_pylist() == [
+        {
+            "uuid": "uuid-1",
+            "team_id": 1,
+            "timestamp": dt.datetime(2023, 4, 20, 14, 30, 0, 123, tzinfo=dt.timezone.utc).isoformat(),
+            "inserted_at": None,
+            "properties": '{"$ip": "127.0.0.1", "$set": {"a": "\u00e9"}, "b": "\\n"}',
+            "elements_chain": 'text="a"',
+        },
+        {
+            "uuid": "uuid-2",
+            "team_id": 1,
+            "timestamp": dt.datetime(2023, 4, 20, 14, 30, tzinfo=dt.timezone.utc).isoformat(),
+            "inserted_at": dt.datetime(2023, 4, 20, 14, 31, tzinfo=dt.timezone.utc).isoformat(),
+            "properties": "",
+            "elements_chain": "",
+        },
+    ]
+
+    record = next(iter_batch_records(batch))
+    assert record["ip"] == "127.0.0.1"
+    assert record["set"] == {"a": "\u00e9"}
+    assert record["elements"] == json.dumps('text="a"')
+
+
+def test_batch_export_temporary_file_write_record_batch_to_jsonl():
+    """Test JSONL written from the columns of a record batch matches the records of the batch."""
+    batch = prepare_record_batch(make_record_batch())
+    fieldnames = ["uuid", "timestamp", "inserted_at", "properties", "team_id"]
+
+    with BatchExportTemporaryFile() as be_file:
+        be_file.write_record_batch_to_jsonl(batch, fieldnames=fieldnames, json_fieldnames=("properties",))
+
+        assert be_file.records_total == 2
+        assert be_file.records_since_last_reset == 2
+
+        be_file.seek(0)
+        lines = be_file.readlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {key: record[key] for key in fieldnames} for record in iter_batch_records(batch)
+    ]
+
+
+def test_batch_export_temporary_file_write_columns_to_tsv():
+    """Test TSV written from columns matches TSV written from the records."""
+    columns = [["record-1", "record-2"], ['{"a": "b\tc"}', None], [1, 2]]
+    records = [{"id": id, "json": value, "int": i} for id, value, i in zip(*columns)]
+
+    with BatchExportTemporaryFile(mode="w+") as be_file, BatchExportTemporaryFile(mode="w+") as records_file:
+        be_file.write_columns_to_tsv(columns)
+        records_file.write_records_to_tsv(records)
+
+        assert be_file.records_total == 2
+        assert be_file.bytes_total == records_file.bytes_total
+
+        be_file.seek(0)
+        records_file.seek(0)
+        assert be_file.read() == records_file.read()
+
+
 def test_kafka_logging_handler_produces_to_kafka(caplog):
     """Test a mocked call to Kafka produce from the KafkaLoggingHandler."""
     logger_name = "test-logger"
@@ -10,9 +10,12 @@ import queue
 import tempfile
 import typing
 import uuid
+from json.encoder import encode_basestring_ascii
 from string import Template
 
 import brotli
+import pyarrow as pa
+import pyarrow.compute as pc
 from asgiref.sync import sync_to_async
 from temporalio import activity, workflow
 
@@ -109,18 +112,23 @@ toString(distinct_id) as distinct_id,
 toString(person_id) as person_id,
 person_properties,
 -- Autocapture fields
-elements_chain
+elements_chain,
+-- Extracted by ClickHouse, so that exports can pass the properties through without parsing them
+JSONExtractString(properties, '$ip') as ip,
+JSONExtractRaw(properties, '$set') as `set`,
+JSONExtractRaw(properties, '$set_once') as set_once
 """
 
 
-def get_results_iterator(
+def get_record_batches(
     client,
     team_id: int,
     interval_start: str,
     interval_end: str,
     exclude_events: collections.abc.Iterable[str] | None = None,
     include_events: collections.abc.Iterable[str] | None = None,
-) -> typing.Generator[dict[str, typing.Any], None, None]:
+) -> typing.Generator[pa.RecordBatch, None, None]:
+    """Iterate over the events to export as record batches, prepared with `prepare_record_batch`."""
     data_interval_start_ch = dt.datetime.fromisoformat(interval_start).strftime("%Y-%m-%d %H:%M:%S")
     data_interval_end_ch = dt.datetime.fromisoformat(interval_end).strftime("%Y-%m-%d %H:%M:%S")
 
@@ -156,16 +164,66 @@ def get_results_iterator(
             "include_events": events_to_include_tuple,
         },
     ):
+        yield prepare_record_batch(batch)
+
+
+def get_results_iterator(
+    client,
+    team_id: int,
+    interval_start: str,
+    interval_end: str,
+    exclude_events: collections.abc.Iterable[str] | None = None,
+    include_events: collections.abc.Iterable[str] | None = None,
+) -> typing.Generator[dict[str, typing.Any], None, None]:
+    for batch in get_record_batches(client, team_id, interval_start, interval_end, exclude_events, include_events):
         yield from iter_batch_records(batch)
 
 
-def iter_batch_records(batch) -> typing.Generator[dict[str, typing.Any], None, None]:
+def prepare_record_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Convert the columns of a record batch from ClickHouse into what we export, for all rows at once.
+
+    ClickHouse sends strings as binary columns, which are decoded, and timestamps are formatted as strings
+    with `isoformat_timestamps`. Other columns are left as they are.
+
+    Args:
+        batch: A record batch of rows, as returned by ClickHouse.
+    """
+    columns = []
+    for column in batch.columns:
+        if pa.types.is_binary(column.type) or pa.types.is_large_binary(column.type):
+            column = column.cast(pa.string())
+        elif pa.types.is_timestamp(column.type):
+            column = isoformat_timestamps(column)
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def isoformat_timestamps(column: pa.Array) -> pa.Array:
+    """Format an array of timestamps like `dt.datetime.isoformat` would format each of them.
+
+    We only export timestamps in UTC, which have their offset appended like by `isoformat`. As with `isoformat`,
+    microseconds are left out when they are zero.
+    """
+    timezone = column.type.tz
+    if timezone is not None and timezone != "UTC":
+        raise ValueError(f"Unsupported timezone: '{timezone}'")
+
+    # Formatting the UTC timestamps as naive ones doesn't need a timezone database
+    naive = column.cast(pa.timestamp("us", tz=timezone)).view(pa.timestamp("us"))
+    formatted = pc.strftime(naive, format="%Y-%m-%dT%H:%M:%S")
+    formatted = pc.replace_substring_regex(formatted, pattern=r"\.000000$", replacement="")
+    if timezone is not None:
+        formatted = pc.binary_join_element_wise(formatted, "+00:00", "")
+    return formatted
+
+
+def iter_batch_records(batch: pa.RecordBatch) -> typing.Generator[dict[str, typing.Any], None, None]:
     """Iterate over records of a batch.
 
     During iteration, we yield dictionaries with all fields used by PostHog BatchExports.
 
     Args:
-        batch: A record batch of rows.
+        batch: A record batch of rows, prepared with `prepare_record_batch`.
     """
     for record in batch.to_pylist():
         properties = record.get("properties")
@@ -175,17 +233,17 @@ def iter_batch_records(batch) -> typing.Generator[dict[str, typing.Any], None, N
         # This is not backwards compatible, as elements should contain a parsed array.
         # However, parsing elements_chain is a mess, so we json.dump to at least be compatible with
         # schemas that use JSON-like types.
-        elements = json.dumps(record.get("elements_chain").decode())
+        elements = json.dumps(record.get("elements_chain"))
 
         record = {
-            "created_at": record.get("created_at").isoformat(),
-            "distinct_id": record.get("distinct_id").decode(),
+            "created_at": record.get("created_at"),
+            "distinct_id": record.get("distinct_id"),
             "elements": elements,
-            "elements_chain": record.get("elements_chain").decode(),
-            "event": record.get("event").decode(),
-            "inserted_at": record.get("inserted_at").isoformat() if record.get("inserted_at") else None,
+            "elements_chain": record.get("elements_chain"),
+            "event": record.get("event"),
+            "inserted_at": record.get("inserted_at"),
             "ip": properties.get("$ip", None) if properties else None,
-            "person_id": record.get("person_id").decode(),
+            "person_id": record.get("person_id"),
             "person_properties": json.loads(person_properties) if person_properties else None,
             "set": properties.get("$set", None) if properties else None,
             "set_once": properties.get("$set_once", None) if properties else None,
@@ -193,13 +251,30 @@ def iter_batch_records(batch) -> typing.Generator[dict[str, typing.Any], None, N
             # Kept for backwards compatibility, but not exported anymore.
             "site_url": "",
             "team_id": record.get("team_id"),
-            "timestamp": record.get("timestamp").isoformat(),
-            "uuid": record.get("uuid").decode(),
+            "timestamp": record.get("timestamp"),
+            "uuid": record.get("uuid"),
         }
 
         yield record
 
 
+def json_column(column: pa.Array) -> list[str]:
+    """Serialize every value of a column to JSON, like `json.dumps` would."""
+    values = column.to_pylist()
+    if pa.types.is_string(column.type):
+        return [encode_basestring_ascii(value) if value is not None else "null" for value in values]
+    return [json.dumps(value) for value in values]
+
+
+def raw_json_column(column: pa.Array) -> list[str | None]:
+    """Return a column of JSON documents as it is, with None for empty and null documents."""
+    # JSON only allows line breaks as whitespace between tokens, and JSONL doesn't allow them at all
+    return [
+        value.replace("\n", " ").replace("\r", " ") if value and value != "null" else None
+        for value in column.to_pylist()
+    ]
+
+
 def get_data_interval(interval: str, data_interval_end: str | None) -> tuple[dt.datetime, dt.datetime]:
     """Return the start and end of an export's data interval.
 
@@ -370,6 +445,61 @@ class BatchExportTemporaryFile:
 
         return result
 
+    def write_record_batch_to_jsonl(
+        self,
+        batch: pa.RecordBatch,
+        fieldnames: collections.abc.Sequence[str],
+        json_fieldnames: collections.abc.Container[str] = (),
+    ):
+        """Write the given columns of a record batch to a temporary file as JSONL.
+
+        Lines are written from whole columns, without building a record for each row. The columns in
+        `json_fieldnames` hold JSON documents, which are written as they are instead of as strings.
+        """
+        if batch.num_rows == 0:
+            return 0
+
+        columns = []
+        for name in fieldnames:
+            column = batch.column(name)
+            if name in json_fieldnames:
+                values: list = [value or "null" for value in raw_json_column(column)]
+            else:
+                values = json_column(column)
+            key = f"{encode_basestring_ascii(name)}: "
+            columns.append([key + value for value in values])
+
+        jsonl_dump = "".join(f"{{{', '.join(row)}}}\n" for row in zip(*columns))
+        result = self.write(jsonl_dump)
+
+        self.records_total += batch.num_rows
+        self.records_since_last_reset += batch.num_rows
+
+        return result
+
+    def write_columns_to_tsv(
+        self,
+        columns: collections.abc.Sequence[collections.abc.Sequence[typing.Any]],
+        quotechar: str = '"',
+        escapechar: str = "\\",
+        quoting=csv.QUOTE_NONE,
+    ):
+        """Write rows to a temporary file as TSV, given as the lists of values of each column."""
+        if len(columns) == 0 or len(columns[0]) == 0:
+            return
+
+        writer = csv.writer(
+            self,
+            delimiter="\t",
+            quotechar=quotechar,
+            escapechar=escapechar,
+            quoting=quoting,
+        )
+        writer.writerows(zip(*columns))
+
+        self.records_total += len(columns[0])
+        self.records_since_last_reset += len(columns[0])
+
     def write_records_to_csv(
         self,
         records,
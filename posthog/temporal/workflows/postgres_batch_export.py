@@ -1,9 +1,12 @@
 import contextlib
 import datetime as dt
 import json
+import typing
 from dataclasses import dataclass
+from json.encoder import encode_basestring_ascii
 
 import psycopg2
+import pyarrow as pa
 from django.conf import settings
 from psycopg2 import sql
 from temporalio import activity, exceptions, workflow
@@ -18,8 +21,9 @@ from posthog.temporal.workflows.batch_exports import (
     create_export_run,
     get_batch_exports_logger,
     get_data_interval,
-    get_results_iterator,
+    get_record_batches,
     get_rows_count,
+    raw_json_column,
     update_export_run_status,
 )
 from posthog.temporal.workflows.clickhouse import get_client
@@ -66,6 +70,33 @@ def copy_tsv_to_postgres(tsv_file, postgres_connection, schema: str, table_name:
         )
 
 
+def get_postgres_columns(batch: pa.RecordBatch, schema_columns: list[str]) -> list[list[typing.Any]]:
+    """Return the values of each of the schema_columns for a record batch, as written to the TSV copied to Postgres.
+
+    The JSONB columns are written as JSON documents. Properties and the $set and $set_once documents extracted by
+    ClickHouse are passed through without parsing them.
+    """
+    values = {
+        "uuid": batch.column("uuid").to_pylist(),
+        "event": batch.column("event").to_pylist(),
+        "properties": raw_json_column(batch.column("properties")),
+        # elements is exported as a JSON string of the JSON string of elements_chain, for backwards compatibility
+        "elements": [
+            encode_basestring_ascii(encode_basestring_ascii(elements_chain))
+            for elements_chain in batch.column("elements_chain").to_pylist()
+        ],
+        "set": raw_json_column(batch.column("set")),
+        "set_once": raw_json_column(batch.column("set_once")),
+        "distinct_id": batch.column("distinct_id").to_pylist(),
+        "team_id": batch.column("team_id").to_pylist(),
+        "ip": [ip or None for ip in batch.column("ip").to_pylist()],
+        # Kept for backwards compatibility, but not exported anymore.
+        "site_url": [""] * batch.num_rows,
+        "timestamp": batch.column("timestamp").to_pylist(),
+    }
+    return [values[column] for column in schema_columns]
+
+
 @dataclass
 class PostgresInsertInputs:
     """Inputs for Postgres."""
@@ -118,7 +149,7 @@ async def insert_into_postgres_activity(inputs: PostgresInsertInputs):
 
         logger.info("BatchExporting %s rows to Postgres", count)
 
-        results_iterator = get_results_iterator(
+        record_batches = get_record_batches(
             client=client,
             team_id=inputs.team_id,
             interval_start=inputs.data_interval_start,
@@ -128,7 +159,7 @@ async def insert_into_postgres_activity(inputs: PostgresInsertInputs):
         )
         with postgres_connection(inputs) as connection:
             with connection.cursor() as cursor:
-                result = cursor.execute(
+                cursor.execute(
                     sql.SQL(
                         """
                         CREATE TABLE IF NOT EXISTS {} (
@@ -161,16 +192,11 @@ async def insert_into_postgres_activity(inputs: PostgresInsertInputs):
             "site_url",
             "timestamp",
         ]
-        json_columns = ("properties", "elements", "set", "set_once")
 
         with BatchExportTemporaryFile() as pg_file:
             with postgres_connection(inputs) as connection:
-                for result in results_iterator:
-                    row = {
-                        key: json.dumps(result[key]) if key in json_columns and result[key] is not None else result[key]
-                        for key in schema_columns
-                    }
-                    pg_file.write_records_to_tsv([row], fieldnames=schema_columns)
+                for batch in record_batches:
+                    pg_file.write_columns_to_tsv(get_postgres_columns(batch, schema_columns))
 
                     if pg_file.tell() > settings.BATCH_EXPORT_POSTGRES_UPLOAD_CHUNK_SIZE_BYTES:
                         logger.info(
@@ -21,13 +21,28 @@ from posthog.temporal.workflows.batch_exports import (
     create_export_run,
     get_batch_exports_logger,
     get_data_interval,
-    get_results_iterator,
+    get_record_batches,
     get_rows_count,
     update_export_run_status,
 )
 from posthog.temporal.workflows.clickhouse import get_client
 
 
+# Fields of the events written to S3, in this order
+EXPORTED_FIELDS = [
+    "created_at",
+    "distinct_id",
+    "elements_chain",
+    "event",
+    "inserted_at",
+    "person_id",
+    "person_properties",
+    "properties",
+    "timestamp",
+    "uuid",
+]
+
+
 def get_allowed_template_variables(inputs) -> dict[str, str]:
     """Derive from inputs a dictionary of supported template variables for the S3 key prefix."""
     export_datetime = dt.datetime.fromisoformat(inputs.data_interval_end)
@@ -372,7 +387,7 @@ async def insert_into_s3_activity(inputs: S3InsertInputs):
         # ClickHouse, write them to a local file, and then upload the file to S3
         # when it reaches 50MB in size.
 
-        results_iterator = get_results_iterator(
+        record_batches = get_record_batches(
             client=client,
             team_id=inputs.team_id,
             interval_start=interval_start,
@@ -381,7 +396,7 @@ async def insert_into_s3_activity(inputs: S3InsertInputs):
             include_events=inputs.include_events,
         )
 
-        result = None
+        last_batch = None
         last_uploaded_part_timestamp = None
 
         async def worker_shutdown_handler():
@@ -396,21 +411,14 @@ async def insert_into_s3_activity(inputs: S3InsertInputs):
 
         async with s3_upload as s3_upload:
             with BatchExportTemporaryFile(compression=inputs.compression) as local_results_file:
-                for result in results_iterator:
-                    record = {
-                        "created_at": result["created_at"],
-                        "distinct_id": result["distinct_id"],
-                        "elements_chain": result["elements_chain"],
-                        "event": result["event"],
-                        "inserted_at": result["inserted_at"],
-                        "person_id": result["person_id"],
-                        "person_properties": result["person_properties"],
-                        "properties": result["properties"],
-                        "timestamp": result["timestamp"],
-                        "uuid": result["uuid"],
-                    }
-
-                    local_results_file.write_records_to_jsonl([record])
+                for batch in record_batches:
+                    if batch.num_rows == 0:
+                        continue
+                    last_batch = batch
+
+                    local_results_file.write_record_batch_to_jsonl(
+                        batch, fieldnames=EXPORTED_FIELDS, json_fieldnames=("person_properties", "properties")
+                    )
 
                     if local_results_file.tell() > settings.BATCH_EXPORT_S3_UPLOAD_CHUNK_SIZE_BYTES:
                         logger.info(
@@ -422,12 +430,12 @@ async def insert_into_s3_activity(inputs: S3InsertInputs):
 
                         await s3_upload.upload_part(local_results_file)
 
-                        last_uploaded_part_timestamp = result["inserted_at"]
+                        last_uploaded_part_timestamp = batch.column("inserted_at")[-1].as_py()
                         activity.heartbeat(last_uploaded_part_timestamp, s3_upload.to_state())
 
                         local_results_file.reset()
 
-                if local_results_file.tell() > 0 and result is not None:
+                if local_results_file.tell() > 0 and last_batch is not None:
                     logger.info(
                         "Uploading last part %s containing %s records with size %s bytes to S3",
                         s3_upload.part_number + 1,
@@ -437,7 +445,7 @@ async def insert_into_s3_activity(inputs: S3InsertInputs):
 
                     await s3_upload.upload_part(local_results_file)
 
-                    last_uploaded_part_timestamp = result["inserted_at"]
+                    last_uploaded_part_timestamp = last_batch.column("inserted_at")[-1].as_py()
                     activity.heartbeat(last_uploaded_part_timestamp, s3_upload.to_state())
 
             await s3_upload.complete()
@@ -24,6 +24,7 @@ from posthog.clickhouse.client import sync_execute
 from posthog.clickhouse.client.connection import ch_pool
 from posthog.clickhouse.plugin_log_entries import TRUNCATE_PLUGIN_LOG_ENTRIES_TABLE_SQL
 from posthog.cloud_utils import TEST_clear_cloud_cache, TEST_clear_instance_license_cache, is_cloud
+from posthog.hogql.printer import TEST_clear_compiled_query_cache
 from posthog.models import Dashboard, DashboardTile, Insight, Organization, Team, User
 from posthog.models.cohort.sql import TRUNCATE_COHORTPEOPLE_TABLE_SQL
 from posthog.models.event.sql import DISTRIBUTED_EVENTS_TABLE_SQL, DROP_EVENTS_TABLE_SQL, EVENTS_TABLE_SQL
@@ -167,6 +168,9 @@ class TestMixin:
         if not self.CLASS_DATA_LEVEL_SETUP:
             _setup_test_data(self)
 
+        # Compiled queries would outlive the materialized columns and property definitions of earlier tests
+        TEST_clear_compiled_query_cache()
+
     def tearDown(self):
         if len(persons_cache_tests) > 0:
             persons_cache_tests.clear()
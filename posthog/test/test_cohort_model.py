@@ -1,8 +1,11 @@
+from unittest.mock import patch
+
 import pytest
 
 from posthog.client import sync_execute
 from posthog.models import Cohort, Person, Team
 from posthog.models.cohort.sql import GET_COHORTPEOPLE_BY_COHORT_ID
+from posthog.models.cohort.util import get_static_cohort_size, insert_static_cohort
 from posthog.test.base import BaseTest
 
 
@@ -33,6 +36,48 @@ class TestCohort(BaseTest):
         self.assertEqual(cohort.people.count(), 2)
         self.assertEqual(cohort.is_calculating, False)
 
+    def test_insert_by_distinct_id_in_bulk_and_in_batches(self):
+        Person.objects.create(team=self.team, distinct_ids=["000", "001"])
+        Person.objects.create(team=self.team, distinct_ids=["123"])
+        Person.objects.create(team=self.team, distinct_ids=['with "quotes", and a comma'])
+        team2 = Team.objects.create(organization=self.organization)
+        Person.objects.create(team=team2, distinct_ids=["456"])
+        items = ["a header or something", "123", "000", "001", "456", 'with "quotes", and a comma', "123"]
+
+        for bulk_upload_enabled in (True, False):
+            cohort = Cohort.objects.create(team=self.team, groups=[], is_static=True)
+            with self.settings(STATIC_COHORT_BULK_UPLOAD_ENABLED=bulk_upload_enabled), patch(
+                "posthog.models.cohort.cohort.STATIC_COHORT_UPLOAD_BATCH_SIZE", 2
+            ):
+                cohort.insert_users_by_list(items)
+                cohort.insert_users_by_list(items)
+
+            cohort.refresh_from_db()
+            self.assertEqual(cohort.people.count(), 3)
+            self.assertEqual(get_static_cohort_size(cohort), 3)
+            self.assertEqual(cohort.count, 3)
+            self.assertEqual(cohort.errors_calculating, 0)
+
+    def test_insert_by_distinct_id_in_bulk_updates_count_after_each_batch(self):
+        for distinct_id in ["000", "123", "456"]:
+            Person.objects.create(team=self.team, distinct_ids=[distinct_id])
+        cohort = Cohort.objects.create(team=self.team, groups=[], is_static=True)
+
+        counts_before_batches = []
+
+        def insert_batch(*args, **kwargs):
+            counts_before_batches.append(Cohort.objects.get(pk=cohort.pk).count)
+            insert_static_cohort(*args, **kwargs)
+
+        with self.settings(STATIC_COHORT_BULK_UPLOAD_ENABLED=True), patch(
+            "posthog.models.cohort.cohort.STATIC_COHORT_UPLOAD_BATCH_SIZE", 2
+        ), patch("posthog.models.cohort.util.insert_static_cohort", side_effect=insert_batch):
+            cohort.insert_users_by_list(["000", "123", "456"])
+
+        self.assertEqual(counts_before_batches, [None, 2])
+        cohort.refresh_from_db()
+        self.assertEqual(cohort.count, 3)
+
     @pytest.mark.ee
     def test_calculating_cohort_clickhouse(self):
         cohort = Cohort.objects.create(
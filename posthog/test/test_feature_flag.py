@@ -4,12 +4,13 @@ from unittest.mock import patch
 
 from django.core.cache import cache
 from django.db import IntegrityError, connection
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from django.utils import timezone
 import pytest
 
 from posthog.models import Cohort, FeatureFlag, GroupTypeMapping, Person
 from posthog.models.feature_flag import get_feature_flags_for_team_in_cache
+from posthog.models.feature_flag.flag_bundle import get_feature_flag_bundle
 from posthog.models.feature_flag.flag_matching import (
     FeatureFlagHashKeyOverride,
     FeatureFlagMatch,
@@ -20,8 +21,15 @@ from posthog.models.feature_flag.flag_matching import (
     get_feature_flag_hash_key_overrides,
     set_feature_flag_hash_key_overrides,
 )
+from posthog.models.feature_flag.local_evaluation import (
+    PropertiesSnapshot,
+    _local_cache,
+    match_properties_locally,
+    person_snapshot_cache_key,
+)
 from posthog.models.group import Group
 from posthog.models.organization import Organization
+from posthog.models.property import Property
 from posthog.models.team import Team
 from posthog.models.user import User
 from posthog.test.base import BaseTest, QueryMatchingTest, snapshot_postgres_queries, snapshot_postgres_queries_context
@@ -477,6 +485,85 @@ class TestFeatureFlagCohortExpansion(BaseTest):
         )
 
 
+class TestFeatureFlagBundle(BaseTest):
+    def setUp(self):
+        cache.clear()
+        return super().setUp()
+
+    def create_feature_flag(self, key="beta-feature", **kwargs):
+        return FeatureFlag.objects.create(team=self.team, name="Beta feature", key=key, created_by=self.user, **kwargs)
+
+    def test_bundle_is_reused_until_flags_change(self):
+        flag = self.create_feature_flag(
+            filters={
+                "groups": [
+                    {"properties": [], "rollout_percentage": 100},
+                    {"properties": [{"key": "email", "value": "tim@posthog.com"}], "variant": "second-variant"},
+                ],
+                "multivariate": {
+                    "variants": [
+                        {"key": "first-variant", "rollout_percentage": 25},
+                        {"key": "second-variant", "rollout_percentage": 75},
+                    ]
+                },
+            }
+        )
+
+        bundle, cache_hit = get_feature_flag_bundle(self.team.pk)
+        self.assertTrue(cache_hit)
+        with self.assertNumQueries(0):
+            self.assertIs(get_feature_flag_bundle(self.team.pk)[0], bundle)
+
+        compiled = bundle.get(bundle.feature_flags[0])
+        self.assertEqual([index for index, _ in compiled.sorted_conditions], [1, 0])
+        self.assertEqual(compiled.sorted_conditions[0][1].properties[0].key, "email")
+        self.assertEqual(
+            [tuple(variant) for variant in compiled.variant_lookup_table],
+            [(0, 0.25, "first-variant"), (0.25, 1, "second-variant")],
+        )
+
+        flag.key = "new-key"
+        flag.save()
+
+        new_bundle, _ = get_feature_flag_bundle(self.team.pk)
+        self.assertIsNot(new_bundle, bundle)
+        self.assertEqual([flag.key for flag in new_bundle.feature_flags], ["new-key"])
+
+    def test_bundle_is_built_from_database_when_cache_is_empty(self):
+        self.create_feature_flag(filters={"groups": [{"properties": [], "rollout_percentage": 100}]})
+        cache.clear()
+
+        bundle, cache_hit = get_feature_flag_bundle(self.team.pk)
+        self.assertFalse(cache_hit)
+        self.assertEqual([flag.key for flag in bundle.feature_flags], ["beta-feature"])
+
+        # The versioned flags written on the miss are picked up from now on
+        self.assertTrue(get_feature_flag_bundle(self.team.pk)[1])
+
+    def test_unversioned_cached_flags_are_served_without_the_database(self):
+        self.create_feature_flag(filters={"groups": [{"properties": [], "rollout_percentage": 100}]})
+        cache.delete(f"team_feature_flags_version_{self.team.pk}")
+
+        with self.assertNumQueries(0):
+            bundle, cache_hit = get_feature_flag_bundle(self.team.pk)
+        self.assertTrue(cache_hit)
+        self.assertIsNone(bundle.version)
+        self.assertEqual([flag.key for flag in bundle.feature_flags], ["beta-feature"])
+        self.assertIsNot(get_feature_flag_bundle(self.team.pk)[0], bundle)
+
+    def test_invalid_flag_does_not_affect_other_flags(self):
+        self.create_feature_flag(filters={"groups": [{"properties": [], "rollout_percentage": 100}]})
+        self.create_feature_flag(
+            key="invalid",
+            filters={"groups": [{"properties": [{"key": "email", "type": "not-a-type"}], "rollout_percentage": 100}]},
+        )
+
+        flags, _, _, errors = get_all_feature_flags(self.team.pk, "example_id")
+        self.assertEqual(flags["beta-feature"], True)
+        self.assertNotIn("invalid", flags)
+        self.assertTrue(errors)
+
+
 class TestModelCache(BaseTest):
     def setUp(self):
         cache.clear()
@@ -2677,6 +2764,161 @@ class TestFeatureFlagMatcher(BaseTest, QueryMatchingTest):
         return FeatureFlag.objects.create(team=self.team, name="Beta feature", key=key, created_by=self.user, **kwargs)
 
 
+@override_settings(DECIDE_LOCAL_FLAG_EVALUATION_ENABLED=True)
+class TestFeatureFlagLocalEvaluation(BaseTest, QueryMatchingTest):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        _local_cache.clear()
+
+    def create_feature_flag(self, key="beta-feature", properties=None, **kwargs):
+        return FeatureFlag.objects.create(
+            team=self.team,
+            name="Beta feature",
+            key=key,
+            created_by=self.user,
+            filters={"groups": [{"properties": properties or [], "rollout_percentage": None}]},
+            **kwargs,
+        )
+
+    def _match(self, feature_flag: FeatureFlag, distinct_id: str = "example_id") -> bool:
+        return FeatureFlagMatcher([feature_flag], distinct_id).get_match(feature_flag).match
+
+    def test_matches_like_the_database(self):
+        Person.objects.create(
+            team=self.team,
+            distinct_ids=["example_id"],
+            properties={"email": "tim@posthog.com", "age": 30, "plan": "Scale", "beta": True, "nothing": None},
+        )
+        cases = [
+            ({"key": "email", "value": "tim@posthog.com", "operator": "exact", "type": "person"}, True),
+            ({"key": "plan", "value": "scale", "operator": "exact", "type": "person"}, False),
+            ({"key": "age", "value": "30", "operator": "exact", "type": "person"}, True),
+            ({"key": "beta", "value": ["true"], "operator": "exact", "type": "person"}, True),
+            ({"key": "email", "value": "POSTHOG", "operator": "icontains", "type": "person"}, True),
+            ({"key": "email", "value": "posthog", "operator": "not_icontains", "type": "person"}, False),
+            ({"key": "missing", "value": "posthog", "operator": "not_icontains", "type": "person"}, True),
+            ({"key": "email", "value": r"^tim@", "operator": "regex", "type": "person"}, True),
+            ({"key": "email", "value": "(invalid", "operator": "regex", "type": "person"}, False),
+            ({"key": "age", "value": 25, "operator": "gt", "type": "person"}, True),
+            ({"key": "age", "value": 30, "operator": "lt", "type": "person"}, False),
+            ({"key": "plan", "value": "Free", "operator": "is_not", "type": "person"}, True),
+            ({"key": "missing", "value": "Free", "operator": "is_not", "type": "person"}, True),
+            ({"key": "nothing", "operator": "is_set", "type": "person"}, True),
+            ({"key": "missing", "operator": "is_not_set", "type": "person"}, True),
+            ({"key": "nothing", "value": "x", "operator": "exact", "type": "person"}, False),
+        ]
+        for index, (property, expected) in enumerate(cases):
+            with self.subTest(property=property):
+                feature_flag = self.create_feature_flag(key=f"flag-{index}", properties=[property])
+                with override_settings(DECIDE_LOCAL_FLAG_EVALUATION_ENABLED=False):
+                    self.assertEqual(self._match(feature_flag), expected)
+                self.assertEqual(self._match(feature_flag), expected)
+
+    def test_snapshot_is_cached_across_requests(self):
+        Person.objects.create(team=self.team, distinct_ids=["example_id"], properties={"email": "tim@posthog.com"})
+        feature_flag = self.create_feature_flag(
+            properties=[{"key": "email", "value": "tim@posthog.com", "operator": "exact", "type": "person"}]
+        )
+
+        self.assertTrue(self._match(feature_flag))
+        with self.assertNumQueries(0):
+            self.assertTrue(self._match(feature_flag))
+
+    def test_snapshot_is_invalidated_on_person_updates(self):
+        person = Person.objects.create(
+            team=self.team, distinct_ids=["example_id"], properties={"email": "tim@posthog.com"}
+        )
+        feature_flag = self.create_feature_flag(
+            properties=[{"key": "email", "value": "tim@posthog.com", "operator": "exact", "type": "person"}]
+        )
+        self.assertTrue(self._match(feature_flag))
+
+        person.properties = {"email": "someone@else.com"}
+        person.save()
+
+        self.assertFalse(self._match(feature_flag))
+
+    def test_unknown_person_does_not_match(self):
+        feature_flag = self.create_feature_flag(
+            properties=[{"key": "email", "operator": "is_not_set", "type": "person"}]
+        )
+        self.assertFalse(self._match(feature_flag, "not_ingested_yet"))
+
+    def test_static_cohorts_are_evaluated_locally(self):
+        Person.objects.create(team=self.team, distinct_ids=["example_id"])
+        Person.objects.create(team=self.team, distinct_ids=["another_id"])
+        cohort = Cohort.objects.create(team=self.team, groups=[], is_static=True, last_calculation=timezone.now())
+        cohort.insert_users_by_list(["example_id"])
+        feature_flag = self.create_feature_flag(properties=[{"key": "id", "value": cohort.pk, "type": "cohort"}])
+
+        self.assertTrue(self._match(feature_flag, "example_id"))
+        self.assertFalse(self._match(feature_flag, "another_id"))
+
+    def test_static_cohort_memberships_are_invalidated_on_upload(self):
+        Person.objects.create(team=self.team, distinct_ids=["example_id"])
+        cohort = Cohort.objects.create(team=self.team, groups=[], is_static=True, last_calculation=timezone.now())
+        feature_flag = self.create_feature_flag(properties=[{"key": "id", "value": cohort.pk, "type": "cohort"}])
+        self.assertFalse(self._match(feature_flag))
+
+        cohort.insert_users_by_list(["example_id"])
+
+        self.assertTrue(self._match(feature_flag))
+
+    def test_snapshots_are_not_invalidated_when_disabled(self):
+        person = Person.objects.create(
+            team=self.team, distinct_ids=["example_id"], properties={"email": "tim@posthog.com"}
+        )
+        feature_flag = self.create_feature_flag(
+            properties=[{"key": "email", "value": "tim@posthog.com", "operator": "exact", "type": "person"}]
+        )
+        self.assertTrue(self._match(feature_flag))
+
+        with override_settings(DECIDE_LOCAL_FLAG_EVALUATION_ENABLED=False):
+            person.save()
+
+        self.assertIn(person_snapshot_cache_key(self.team.pk, "example_id"), _local_cache)
+
+    @patch("posthog.models.feature_flag.flag_matching.FeatureFlagMatcher._condition_matches")
+    def test_falls_back_to_the_database_for_date_operators(self, condition_matches):
+        condition_matches.return_value = True
+        Person.objects.create(team=self.team, distinct_ids=["example_id"], properties={"joined": "2023-01-01"})
+        local_flag = self.create_feature_flag(
+            key="local", properties=[{"key": "joined", "operator": "is_set", "type": "person"}]
+        )
+        date_flag = self.create_feature_flag(
+            key="date",
+            properties=[{"key": "joined", "value": "2023-06-01", "operator": "is_date_before", "type": "person"}],
+        )
+
+        self.assertTrue(self._match(local_flag))
+        condition_matches.assert_not_called()
+        self.assertTrue(self._match(date_flag))
+        condition_matches.assert_called_once()
+
+    def test_group_properties(self):
+        GroupTypeMapping.objects.create(team=self.team, group_type="organization", group_type_index=0)
+        Group.objects.create(
+            team=self.team, group_type_index=0, group_key="posthog", group_properties={"plan": "scale"}, version=0
+        )
+        feature_flag = self.create_feature_flag(
+            properties=[{"key": "plan", "value": "scale", "operator": "exact", "type": "group", "group_type_index": 0}],
+            aggregation_group_type_index=0,
+        )
+
+        matcher = FeatureFlagMatcher([feature_flag], "example_id", {"organization": "posthog"})
+        self.assertTrue(matcher.get_match(feature_flag).match)
+        matcher = FeatureFlagMatcher([feature_flag], "example_id", {"organization": "other"})
+        self.assertFalse(matcher.get_match(feature_flag).match)
+
+    def test_overrides_take_precedence(self):
+        snapshot = PropertiesSnapshot(properties={"email": "tim@posthog.com"})
+        properties = [Property(key="email", value="other@posthog.com", type="person")]
+
+        self.assertFalse(match_properties_locally(properties, snapshot, False, {}, {}))
+        self.assertTrue(match_properties_locally(properties, snapshot, False, {"email": "other@posthog.com"}, {}))
+
+
 class TestFeatureFlagHashKeyOverrides(BaseTest, QueryMatchingTest):
     person: Person
 
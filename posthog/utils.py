@@ -926,6 +926,19 @@ def get_safe_cache(cache_key: str):
     return None
 
 
+def get_safe_cache_many(cache_keys: List[str]) -> Dict[str, Any]:
+    """Reads many keys in a single round trip. Keys that aren't cached are left out."""
+    try:
+        return cache.get_many(cache_keys)
+    except Exception:  # one of the values is probably corrupted, read them one by one to delete it
+        cached_results = {}
+        for cache_key in cache_keys:
+            cached_result = get_safe_cache(cache_key)
+            if cached_result is not None:
+                cached_results[cache_key] = cached_result
+        return cached_results
+
+
 def is_anonymous_id(distinct_id: str) -> bool:
     # Our anonymous ids are _not_ uuids, but a random collection of strings
     return bool(re.match(ANONYMOUS_REGEX, distinct_id))
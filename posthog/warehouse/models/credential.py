@@ -1,6 +1,9 @@
 from posthog.models.utils import UUIDModel, CreatedMetaFields, sane_repr
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from posthog.models.team import Team
+from posthog.models.signals import mutable_receiver
+from posthog.hogql.database.version import invalidate_hogql_database
 from encrypted_fields.fields import EncryptedTextField
 
 
@@ -10,3 +13,8 @@ class DataWarehouseCredential(CreatedMetaFields, UUIDModel):
     team: models.ForeignKey = models.ForeignKey(Team, on_delete=models.CASCADE)
 
     __repr__ = sane_repr("access_key")
+
+
+@mutable_receiver([post_save, post_delete], sender=DataWarehouseCredential)
+def invalidate_hogql_database_on_credential_change(sender, instance, **kwargs):
+    invalidate_hogql_database(instance.team_id)
@@ -1,6 +1,9 @@
 from posthog.models.utils import UUIDModel, CreatedMetaFields, DeletedMetaFields
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from posthog.models.team import Team
+from posthog.models.signals import mutable_receiver
+from posthog.hogql.database.version import invalidate_hogql_database
 
 from posthog.hogql.database.models import SavedQuery
 from posthog.hogql.database.database import Database
@@ -93,3 +96,8 @@ class DataWarehouseSavedQuery(CreatedMetaFields, UUIDModel, DeletedMetaFields):
             query=self.query["query"],
             fields=fields,
         )
+
+
+@mutable_receiver([post_save, post_delete], sender=DataWarehouseSavedQuery)
+def invalidate_hogql_database_on_saved_query_change(sender, instance, **kwargs):
+    invalidate_hogql_database(instance.team_id)
@@ -1,7 +1,10 @@
 from posthog.models.utils import UUIDModel, CreatedMetaFields, sane_repr, DeletedMetaFields
 from posthog.errors import wrap_query_error
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from posthog.models.team import Team
+from posthog.models.signals import mutable_receiver
+from posthog.hogql.database.version import invalidate_hogql_database
 from posthog.client import sync_execute
 from .credential import DataWarehouseCredential
 from posthog.hogql.database.models import (
@@ -120,3 +123,8 @@ class DataWarehouseTable(CreatedMetaFields, UUIDModel, DeletedMetaFields):
             if key in err.message:
                 raise Exception(value)
         raise Exception("Could not get columns")
+
+
+@mutable_receiver([post_save, post_delete], sender=DataWarehouseTable)
+def invalidate_hogql_database_on_table_change(sender, instance, **kwargs):
+    invalidate_hogql_database(instance.team_id)
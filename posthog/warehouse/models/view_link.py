@@ -1,6 +1,9 @@
 from posthog.models.utils import UUIDModel, CreatedMetaFields, DeletedMetaFields
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from posthog.models.team import Team
+from posthog.models.signals import mutable_receiver
+from posthog.hogql.database.version import invalidate_hogql_database
 from .datawarehouse_saved_query import DataWarehouseSavedQuery
 from typing import Dict, Any
 from posthog.hogql.errors import HogQLException
@@ -41,3 +44,8 @@ class DataWarehouseViewLink(CreatedMetaFields, UUIDModel, DeletedMetaFields):
             return join_expr
 
         return _join_function
+
+
+@mutable_receiver([post_save, post_delete], sender=DataWarehouseViewLink)
+def invalidate_hogql_database_on_view_link_change(sender, instance, **kwargs):
+    invalidate_hogql_database(instance.team_id)